@@ -0,0 +1,147 @@
+"""
+Time kujira commands end to end against a local fake Jira server.
+
+    python -m benchmarks.bench_commands [--issues N] [--latency-ms MS]
+                                        [--repeat N] [--output PATH]
+
+The server (tests/fake_jira.py) is seeded with synthetic issues, users, epics
+and sprints and answers every request after the given latency.  Commands run
+in this process, the way the daemon would run them, with the connection warm
+and one untimed warm-up run each.  Results go to a JSON file so runs can be
+compared across releases.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from tests.fake_jira import FakeJira
+
+import kujira
+from kujira import kujira as api
+from kujira.cli import main as cli_main
+
+
+def reset_status(fake, key, status="Backlog"):
+    def setup():
+        fake.issues[key]["fields"]["status"] = {"name": status}
+
+    return setup
+
+
+def make_cases(fake):
+    """(name, argv, setup) for every command we track."""
+    return [
+        ("mine", ["mine", "--refresh"], None),
+        ("mine (result cache)", ["mine"], None),
+        ("mine --full", ["mine", "--full"], None),
+        ("ls", ["ls", "In Progress", "--refresh"], None),
+        ("board", ["board", "--refresh"], None),
+        ("get-issue", ["get-issue", "DS-10"], None),
+        ("get-all-users", ["get-all-users", "--refresh"], None),
+        ("epics-for-project", ["epics-for-project", "DS"], None),
+        ("advance", ["advance", "DS-11"], reset_status(fake, "DS-11")),
+        ("move", ["move", "DS-12", "Done"], reset_status(fake, "DS-12")),
+    ]
+
+
+def run_cli(argv):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        try:
+            cli_main.main(args=argv, prog_name="kujira", standalone_mode=False)
+        except SystemExit:
+            pass
+    return out.getvalue()
+
+
+def time_case(fake, argv, setup, repeat):
+    timings = []
+    requests = []
+    transferred = []
+    for run in range(repeat + 1):
+        if setup:
+            setup()
+        del fake.requests[:]
+        start = time.perf_counter()
+        run_cli(argv)
+        elapsed = time.perf_counter() - start
+        if run == 0:
+            continue  # warm-up
+        timings.append(elapsed)
+        requests.append(len(fake.requests))
+        transferred.append(sum(r["bytes"] for r in fake.requests))
+    timings.sort()
+    return {
+        "runs": repeat,
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "min_ms": timings[0] * 1000,
+        "per_second": repeat / sum(timings),
+        "requests": statistics.median(requests),
+        "bytes": statistics.median(transferred),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--epics", type=int, default=20)
+    parser.add_argument("--sprints", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("commands", nargs="*", help="Only run these cases.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home, FakeJira() as fake:
+        fake.seed(
+            issues=args.issues, users=args.users, epics=args.epics, sprints=args.sprints
+        )
+        fake.write_config(home)
+        os.environ["HOME"] = home
+        fake.latency = args.latency_ms / 1000
+
+        results = []
+        for name, argv, setup in make_cases(fake):
+            if args.commands and name not in args.commands:
+                continue
+            api._workflow = None
+            api._results = None
+            result = time_case(fake, argv, setup, args.repeat)
+            results.append(dict(command=name, argv=argv, **result))
+            print(
+                f"{name:<20} {result['median_ms']:9.1f} ms  "
+                f"p95 {result['p95_ms']:9.1f} ms  "
+                f"{result['requests']:5.0f} requests  "
+                f"{result['bytes'] / 1024:8.1f} KiB"
+            )
+
+    report = {
+        "kujira_version": kujira.__version__,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": {
+            "issues": args.issues,
+            "users": args.users,
+            "epics": args.epics,
+            "sprints": args.sprints,
+            "latency_ms": args.latency_ms,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
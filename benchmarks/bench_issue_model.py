@@ -0,0 +1,77 @@
+"""
+Per-issue cost of turning search results into IssueModels.
+
+    python -m benchmarks.bench_issue_model [--issues N]
+
+"resource" is the old path: a jira Issue Resource per row, then
+IssueModel.from_api with dateutil and permalink().  "json" is
+IssueModel.from_json on the raw search response.
+"""
+import argparse
+import time
+
+import dateutil.parser
+from jira.resources import Issue
+
+from kujira.models.issue import IssueModel
+
+SERVER_URL = "https://empire.atlassian.net"
+
+
+def make_raw_issues(n):
+    return [
+        {
+            "key": f"DS-{i}",
+            "fields": {
+                "project": {"id": "10000", "key": "DS"},
+                "issuetype": {"name": "Task"},
+                "assignee": {"accountId": "5b10ac8d82e05b22cc7d4ef5"},
+                "reporter": {"accountId": "5b10a2844c20165700ede21g"},
+                "summary": f"Issue number {i}: your lack of faith",
+                "description": "I find your lack of faith disturbing.",
+                "priority": {"name": "Medium"},
+                "updated": "2019-05-29T10:11:12.345+0000",
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def via_resource(raw_issues):
+    models = []
+    for raw in raw_issues:
+        issue = Issue({"server": SERVER_URL}, None, raw=raw)
+        model = IssueModel.from_api(issue, None)
+        # what from_api cost before the fast timestamp parse
+        model.updated_at = dateutil.parser.parse(issue.fields.updated)
+        models.append(model)
+    return models
+
+
+def via_json(raw_issues):
+    return [IssueModel.from_json(raw, server_url=SERVER_URL) for raw in raw_issues]
+
+
+def per_issue_us(convert, raw_issues, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(raw_issues)
+        best = min(best, time.perf_counter() - start)
+    return best / len(raw_issues) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, default=20000)
+    args = parser.parse_args()
+
+    raw_issues = make_raw_issues(args.issues)
+    before = per_issue_us(via_resource, raw_issues)
+    after = per_issue_us(via_json, raw_issues)
+    print(f"resource + from_api  {before:8.2f} us/issue")
+    print(f"from_json            {after:8.2f} us/issue  ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Time how long the kujira console script takes to start.
+
+    python -m benchmarks.bench_startup [--repeat N]
+
+Each case runs in a fresh interpreter, the way a shell prompt would call it,
+and also reports whether the heavy API modules were imported.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("jira", "yaml", "dateutil")
+
+CASES = {
+    "import kujira.cli": "import kujira.cli",
+    "kujira --help": "from kujira.daemon import run; run(['--help'])",
+    "kujira current": "from kujira.daemon import run; run(['current'])",
+}
+
+REPORT_IMPORTS = """
+import atexit, sys
+atexit.register(
+    lambda: sys.stderr.write(
+        "heavy:" + ",".join(m for m in {heavy!r} if m in sys.modules) + "\\n"
+    )
+)
+"""
+
+
+def time_case(code, repeat, env):
+    timings = []
+    heavy = ""
+    for _ in range(repeat):
+        script = REPORT_IMPORTS.format(heavy=HEAVY_MODULES) + code
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        timings.append(time.perf_counter() - start)
+        heavy = proc.stderr.rsplit("heavy:", 1)[-1].strip()
+    return timings, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.makedirs(os.path.join(home, ".jira"))
+        with open(os.path.join(home, ".jira", "current_issue"), "w") as f:
+            f.write("DS-1610 | Your lack of faith (2019-05-29)\n")
+        env = dict(os.environ, HOME=home, KUJIRA_NO_DAEMON="1")
+        baseline, _ = time_case("pass", args.repeat, env)
+        print(f"{'python startup':<20} {statistics.median(baseline) * 1000:8.1f} ms")
+        for name, code in CASES.items():
+            timings, heavy = time_case(code, args.repeat, env)
+            median_ms = statistics.median(timings) * 1000
+            print(f"{name:<20} {median_ms:8.1f} ms  heavy imports: {heavy or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Asyncio layer over the Jira connection.
+
+Requests go through the jira client's own requests session, so they share its
+authentication and connection pool; they run on a thread pool whose size is
+the concurrency limit.  The retrieval functions in kujira.kujira are thin
+synchronous wrappers that drive these async generators with iterate_sync.
+"""
+import asyncio
+import heapq
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+DEFAULT_CONCURRENCY = 4
+PAGE_SIZE = 50
+USER_PAGE_SIZE = 1000
+READ_AHEAD_PAGES = 8
+
+ORDER_BY = re.compile(r"\s*\border\s+by\b.*$", re.IGNORECASE | re.DOTALL)
+
+
+def search_page(conn, query, startAt, **search_kwargs):
+    """One page of search results as (issues, total).
+
+    With ``json_result=True`` the issues are the raw JSON dicts from the
+    response rather than jira Resources.
+    """
+    page = conn.search_issues(
+        query, startAt=startAt, maxResults=PAGE_SIZE, **search_kwargs
+    )
+    if isinstance(page, dict):
+        return page["issues"], page.get("total")
+    return page, getattr(page, "total", None)
+
+
+def issue_key(issue):
+    return issue["key"] if isinstance(issue, dict) else issue.key
+
+
+def issue_project(key):
+    return key.rpartition("-")[0]
+
+
+def keyset_query(query, last_key=None, finished_projects=()):
+    """``query`` ordered by key, restricted to the issues after ``last_key``.
+
+    Key comparisons only make sense within a project, so issues in other
+    projects are let through unless their project was already scanned.
+    """
+    where = ORDER_BY.sub("", query).strip()
+    if last_key is not None:
+        project = issue_project(last_key)
+        scanned = ", ".join(f'"{p}"' for p in sorted({*finished_projects, project}))
+        after = (
+            f'((project = "{project}" AND key > "{last_key}") '
+            f"OR project not in ({scanned}))"
+        )
+        where = f"({where}) AND {after}" if where else after
+    return f"{where} ORDER BY key ASC"
+
+
+class AsyncJira:
+    def __init__(self, conn, concurrency=DEFAULT_CONCURRENCY):
+        self.conn = conn
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def close(self):
+        # Don't wait for requests nobody will read any more.
+        self._executor.shutdown(wait=False)
+
+    async def call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(method, *args, **kwargs)
+        )
+
+    async def search_issues(self, query, max_pages=READ_AHEAD_PAGES, **search_kwargs):
+        """Every issue matching ``query``, in order.
+
+        The first page gives the total; the remaining pages are then requested
+        concurrently, keeping at most ``max_pages`` in flight or unread.
+        """
+        first_page, total = await self.call(
+            search_page, self.conn, query, 0, **search_kwargs
+        )
+        for issue in first_page:
+            yield issue
+        if not isinstance(total, int):
+            # Without a total we can't plan ahead, so page sequentially.
+            startAt, page = PAGE_SIZE, first_page
+            while len(page) == PAGE_SIZE:
+                page, _ = await self.call(
+                    search_page, self.conn, query, startAt, **search_kwargs
+                )
+                for issue in page:
+                    yield issue
+                startAt += PAGE_SIZE
+            return
+
+        starts = iter(range(PAGE_SIZE, total, PAGE_SIZE))
+
+        def fetch(startAt):
+            return asyncio.ensure_future(
+                self.call(search_page, self.conn, query, startAt, **search_kwargs)
+            )
+
+        pending = deque(fetch(startAt) for startAt in islice(starts, max_pages))
+        try:
+            while pending:
+                page, _ = await pending.popleft()
+                for startAt in islice(starts, 1):
+                    pending.append(fetch(startAt))
+                for issue in page:
+                    yield issue
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def search_issues_by_token(self, query, json_result=False, **search_kwargs):
+        """Every issue matching ``query``, following nextPageToken (Jira Cloud)."""
+        from jira.resources import Issue
+
+        token = None
+        while True:
+            page = await self.call(
+                self.conn.enhanced_search_issues,
+                query,
+                nextPageToken=token,
+                maxResults=PAGE_SIZE,
+                json_result=True,
+                **search_kwargs,
+            )
+            for raw in page.get("issues", []):
+                if json_result:
+                    yield raw
+                else:
+                    yield Issue(self.conn._options, self.conn._session, raw=raw)
+            token = page.get("nextPageToken")
+            if page.get("isLast") or not token:
+                return
+
+    async def search_issues_by_key(self, query, **search_kwargs):
+        """Every issue matching ``query`` in key order, paging by ``key > last``.
+
+        Every page is the first page of a narrower query, so deep scans cost
+        the same per page and issues changing mid-scan can't shift the pages.
+        """
+        last_key, finished_projects = None, set()
+        while True:
+            jql = keyset_query(query, last_key, finished_projects)
+            page, _ = await self.call(search_page, self.conn, jql, 0, **search_kwargs)
+            for issue in page:
+                yield issue
+            if len(page) < PAGE_SIZE:
+                return
+            for issue in page:
+                key = issue_key(issue)
+                if last_key and issue_project(key) != issue_project(last_key):
+                    finished_projects.add(issue_project(last_key))
+                last_key = key
+
+    async def users(self, query="%"):
+        """Every user matching ``query``, fetching the next page while yielding."""
+
+        def fetch(startAt):
+            return asyncio.ensure_future(
+                self.call(
+                    self.conn.search_users,
+                    query,
+                    startAt=startAt,
+                    maxResults=USER_PAGE_SIZE,
+                )
+            )
+
+        startAt = 0
+        next_page = fetch(startAt)
+        try:
+            while True:
+                users = await next_page
+                if len(users) == 0:
+                    return
+                startAt += USER_PAGE_SIZE
+                next_page = fetch(startAt)
+                for user in users:
+                    yield user
+        finally:
+            next_page.cancel()
+            await asyncio.gather(next_page, return_exceptions=True)
+
+    async def epics(self, project_name, **search_kwargs):
+        query = f'issuetype="Epic" AND project="{project_name}"'
+        search = self.search_issues
+        if getattr(self.conn, "_is_cloud", False) is True:
+            search = self.search_issues_by_token
+        async for epic in search(query, **search_kwargs):
+            yield epic
+
+    def _search_keys(self, keys, extra, **search_kwargs):
+        from jira import JIRAError
+
+        try:
+            result = self.conn.search_issues(
+                f"key in ({', '.join(keys)}){extra}",
+                maxResults=len(keys),
+                validate_query=False,
+                **search_kwargs,
+            )
+        except JIRAError as e:
+            if e.status_code != 400:
+                raise
+            if len(keys) == 1:
+                return []
+            # Cloud ignores validate_query, so one deleted or moved key fails
+            # the whole search; look the keys up one by one instead.
+            return [
+                issue
+                for key in keys
+                for issue in self._search_keys([key], extra, **search_kwargs)
+            ]
+        return result["issues"] if isinstance(result, dict) else list(result)
+
+    async def issues_by_keys(self, keys, where=None, **search_kwargs):
+        """The issues with the given keys, one ``key in (...)`` search per page.
+
+        ``where`` is extra JQL the issues must also match.  Keys that don't
+        exist are skipped rather than failing the search: the server is asked
+        not to validate them, and where it does anyway (Cloud) a failed page
+        is retried one key at a time.
+        """
+        keys = sorted(keys)
+        chunks = [keys[i : i + PAGE_SIZE] for i in range(0, len(keys), PAGE_SIZE)]
+        extra = f" AND {where}" if where else ""
+        searches = [
+            asyncio.ensure_future(
+                self.call(self._search_keys, chunk, extra, **search_kwargs)
+            )
+            for chunk in chunks
+        ]
+        try:
+            for search in searches:
+                for issue in await search:
+                    yield issue
+        finally:
+            for search in searches:
+                search.cancel()
+            await asyncio.gather(*searches, return_exceptions=True)
+
+
+_DONE = object()
+
+
+async def _produce(stream, queue):
+    try:
+        async for item in stream:
+            await queue.put(item)
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        await stream.aclose()
+    await queue.put(_DONE)
+
+
+async def merge_sorted(streams, key, on_finished=None):
+    """Merge async streams already sorted by ``key``, reading them concurrently.
+
+    Each stream is read ahead into its own queue, so a slow stream only holds
+    up the merge when its next item is the one needed.  ``on_finished(i)`` is
+    called once every item of stream ``i`` was yielded.
+    """
+    queues = [asyncio.Queue(maxsize=2 * PAGE_SIZE) for _ in streams]
+    producers = [
+        asyncio.ensure_future(_produce(stream, queue))
+        for stream, queue in zip(streams, queues)
+    ]
+    heap = []
+
+    async def advance(i):
+        item = await queues[i].get()
+        if isinstance(item, Exception):
+            raise item
+        if item is _DONE:
+            if on_finished:
+                on_finished(i)
+            return
+        heapq.heappush(heap, (key(item), i, item))
+
+    try:
+        await asyncio.gather(*(advance(i) for i in range(len(streams))))
+        while heap:
+            _, i, item = heapq.heappop(heap)
+            yield item
+            await advance(i)
+    finally:
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+
+
+def iterate_sync(async_iterable):
+    """Drive an async iterable from synchronous code on a private event loop.
+
+    Work already handed to the thread pool keeps running between items, so
+    read-ahead still overlaps with whatever the caller does with each item.
+    """
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, "aclose"):
+            loop.run_until_complete(iterator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -1,52 +1,240 @@
 # -*- coding: utf-8 -*-
 
-"""Console script for kujira."""
+"""Console script for kujira.
+
+The API stack (jira, yaml, dateutil) is slow to import, so commands import
+what they need when they run; ``kujira --help`` and ``kujira current`` never
+load it.
+"""
+import os
+import sys
+
 import click
 
-from kujira.kujira import (
-    advance_issue,
-    create_new_issue,
-    edit_issue,
-    get_all_epics,
-    get_conn,
-    get_issue_by_key,
-    get_issues_for_status,
-    get_open_issues,
-    get_printable_issue,
-    get_printable_issue_brief,
-    get_users,
-    print_issue_fields,
-    read_config,
-    transition_issue,
-)
-from kujira.models.user import UserModel
+from kujira.current import read_current_issue
+from kujira.daemon import DEFAULT_CACHE_TTL, DEFAULT_SOCKET_PATH
+from kujira.export import DEFAULT_EXPORT_FIELDS, EXPORT_FORMATS
+from kujira.paging import PAGING_MODES
+from kujira.users import DEFAULT_USERS_TTL
+
+
+def cached_options(command):
+    command = click.option(
+        "--max-age",
+        type=int,
+        default=None,
+        help="Seconds the mirror may lag before falling back to the server.",
+    )(command)
+    return click.option(
+        "--cached", is_flag=True, help="Answer from the local mirror (see sync)."
+    )(command)
+
+
+def refresh_option(command):
+    return click.option(
+        "--refresh",
+        is_flag=True,
+        help="Ask the server now instead of printing a cached result.",
+    )(command)
+
+
+def all_servers_option(command):
+    return click.option(
+        "--all-servers",
+        is_flag=True,
+        help="Ask every server profile at once and merge the results.",
+    )(command)
+
+
+def queue_option(command):
+    return click.option(
+        "--queue/--now",
+        "queued",
+        default=None,
+        help="Queue the change and return, or apply it now "
+        "(default: the write_behind setting).",
+    )(command)
+
+
+def write_behind(config, queued):
+    return config.write_behind if queued is None else queued
+
+
+def enqueue(config, issue_key, kind, payload=None):
+    from kujira.outbox import Outbox, flush_in_background
+
+    outbox = Outbox()
+    try:
+        outbox.enqueue(config.profile, issue_key, kind, payload)
+    finally:
+        outbox.close()
+    flush_in_background(outbox.path)
+    click.echo(f"Queued {kind} of {issue_key} (see kujira queue status)")
+
+
+def echo_all_servers(query):
+    from kujira.kujira import (
+        BRIEF_FIELDS,
+        format_issue_brief,
+        get_issue_models,
+        read_all_configs,
+    )
+    from kujira.servers import profile_name, search_all_servers
+
+    issues = search_all_servers(read_all_configs(), query, fields=BRIEF_FIELDS)
+    for config, raw in issues:
+        for issue_model in get_issue_models([raw], config.server_url):
+            click.echo(f"{profile_name(config)}: {format_issue_brief(issue_model)}")
+
+
+def use_profile(ctx, profile):
+    from kujira.kujira import read_config, set_profile
+
+    previous = set_profile(profile)
+    ctx.call_on_close(lambda: set_profile(previous))
+    try:
+        read_config()
+    except LookupError as e:
+        raise click.ClickException(str(e))
+
+
+def forget_fetched_issues():
+    """Don't carry issues over to the next command run in this process (daemon)."""
+    api = sys.modules.get("kujira.kujira")
+    if api is not None:
+        api.clear_issues()
+
+
+def get_fresh_mirror(config, max_age):
+    from kujira.mirror import IssueMirror
+
+    if max_age is None:
+        max_age = config.mirror_max_age
+    mirror = IssueMirror(config.mirror_path)
+    age = mirror.age(config.sync_projects)
+    if age is None or age > max_age:
+        click.echo("Mirror is stale, asking the server instead", err=True)
+        mirror.close()
+        return None
+    return mirror
+
+
+def start_trace(ctx, table, json_path, profile_path):
+    from kujira.trace import Tracer
+
+    tracer = Tracer(profile=profile_path is not None).install()
+
+    def finish():
+        tracer.uninstall()
+        if table:
+            tracer.print_table(click.get_text_stream("stderr"))
+        if json_path:
+            tracer.write_json(json_path)
+        if profile_path:
+            tracer.write_profile(profile_path)
+
+    ctx.call_on_close(finish)
 
 
 @click.group()
-def main(args=None):
+@click.option(
+    "--trace", is_flag=True, help="Summarize HTTP requests and API calls on exit."
+)
+@click.option(
+    "--trace-json",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the trace, with every request, to this JSON file.",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Save a cProfile of the command to this file.",
+)
+@click.option(
+    "--server",
+    "server_profile",
+    metavar="NAME",
+    envvar="KUJIRA_SERVER",
+    help="Use the [Jira:NAME] server profile from the config.",
+)
+@click.pass_context
+def main(ctx, trace, trace_json, profile, server_profile):
     """Console script for kujira."""
+    ctx.call_on_close(forget_fetched_issues)
+    if server_profile:
+        use_profile(ctx, server_profile)
+    if trace or trace_json or profile:
+        start_trace(ctx, trace, trace_json, profile)
     return 0
 
 
+@main.command()
+@click.option("--key", "key_only", is_flag=True, help="Print only the issue key.")
+def current(key_only):
+    """Print the current issue without touching the network."""
+    current_issue = read_current_issue()
+    if current_issue is None:
+        return
+    if key_only:
+        current_issue = current_issue.split(" | ", 1)[0]
+    click.echo(current_issue)
+
+
 @main.command()
 def explore():
+    from kujira.kujira import get_conn, read_config
+
     config = read_config()
     conn = get_conn(config)
     breakpoint()
 
 
 @main.command()
-def mine():
+@click.option("--full", is_flag=True, help="Print every field, with epic tags.")
+@cached_options
+@refresh_option
+@all_servers_option
+def mine(full, cached, max_age, refresh, all_servers):
+    from kujira.kujira import (
+        FULL_FIELDS,
+        OPEN_ISSUES_QUERY,
+        format_issue_brief,
+        get_cached_results,
+        get_conn,
+        get_issue_models,
+        get_open_issues,
+        get_printable_issues,
+        read_config,
+    )
+
+    if all_servers:
+        if full or cached:
+            raise click.UsageError("--all-servers lists brief issues from the servers")
+        echo_all_servers(OPEN_ISSUES_QUERY)
+        return
     config = read_config()
-    conn = get_conn(config)
-    for issue in get_open_issues(conn):
-        issue_msg = get_printable_issue_brief(issue)
-        click.echo(issue_msg)
+    mirror = cached and get_fresh_mirror(config, max_age)
+    if mirror:
+        raw_issues = mirror.open_issues(config.account_id)
+    elif full:
+        conn = get_conn(config)
+        issues = get_open_issues(conn, fields=FULL_FIELDS)
+        for issue_model in get_printable_issues(issues, conn):
+            click.echo(issue_model)
+        return
+    else:
+        raw_issues = get_cached_results(
+            config, "mine", OPEN_ISSUES_QUERY, refresh=refresh
+        )
+    for issue_model in get_issue_models(raw_issues, config.server_url):
+        click.echo(format_issue_brief(issue_model))
 
 
 @main.command()
 @click.argument("issue_key", type=str)
 def fix_issue(issue_key):
+    from kujira.kujira import get_conn, get_issue_by_key, read_config, transition_issue
+
     config = read_config()
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
@@ -59,16 +247,47 @@ def fix_issue(issue_key):
 
 @main.command()
 @click.argument("issue_key", type=str)
-def get_issue(issue_key):
+@cached_options
+@click.option("--names", is_flag=True, help="Show people by display name.")
+def get_issue(issue_key, cached, max_age, names):
+    from kujira.kujira import (
+        get_conn,
+        get_epic_key,
+        get_epic_tag,
+        get_issue_by_key,
+        get_printable_issue,
+        get_user_directory,
+        issue_from_raw,
+        read_config,
+    )
+    from kujira.models.issue import IssueModel
+
     config = read_config()
-    conn = get_conn(config)
-    issue = get_issue_by_key(conn, issue_key)
-    print(get_printable_issue(issue, conn))
+    mirror = cached and get_fresh_mirror(config, max_age)
+    raw = mirror and mirror.issue(issue_key)
+    if raw:
+        issue = issue_from_raw(raw, config.server_url)
+        epic_raw = mirror.issue(get_epic_key(issue) or "")
+        epic_tag = None
+        if epic_raw:
+            epic_tag = get_epic_tag(issue_from_raw(epic_raw, config.server_url))
+        issue_model = IssueModel.from_api(issue, epic_tag)
+    else:
+        conn = get_conn(config)
+        issue = get_issue_by_key(conn, issue_key)
+        issue_model = get_printable_issue(issue, conn)
+    if names:
+        directory = get_user_directory(config)
+        issue_model.assignee = directory.display_name(issue_model.assignee)
+        issue_model.reporter = directory.display_name(issue_model.reporter)
+    print(issue_model)
 
 
 @main.command()
 @click.argument("issue_key", type=str)
 def inspect(issue_key):
+    from kujira.kujira import get_conn, get_issue_by_key, read_config
+
     config = read_config()
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
@@ -78,6 +297,13 @@ def inspect(issue_key):
 @main.command()
 @click.argument("issue_key", type=str)
 def print_fields_for(issue_key):
+    from kujira.kujira import (
+        get_conn,
+        get_issue_by_key,
+        print_issue_fields,
+        read_config,
+    )
+
     config = read_config()
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
@@ -86,57 +312,135 @@ def print_fields_for(issue_key):
 
 @main.command()
 @click.argument("issue_key", type=str)
-def edit(issue_key):
+@queue_option
+def edit(issue_key, queued):
+    from kujira.kujira import edit_issue, get_conn, get_issue_edits, read_config
+
     config = read_config()
     conn = get_conn(config)
+    if write_behind(config, queued):
+        _, updates = get_issue_edits(conn, issue_key)
+        if updates:
+            enqueue(config, issue_key, "edit", {"fields": updates})
+        return
     edit_issue(conn, issue_key)
 
 
 @main.command()
 @click.argument("issue_key", type=str)
-def advance(issue_key):
+@queue_option
+def advance(issue_key, queued):
+    from kujira.kujira import advance_issue, get_conn, get_issue_by_key, read_config
+
     config = read_config()
+    if write_behind(config, queued):
+        enqueue(config, issue_key, "advance")
+        return
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
+    status = issue.fields.status.name
     result = advance_issue(conn, issue)
     if not result:
-        msg = f"Failed to transition, issue still {issue.fields.status.name}"
+        msg = f"Failed to transition, issue still {status}"
     else:
-        msg = f"Transitioned from {issue.fields.status.name} to {result}"
+        msg = f"Transitioned from {status} to {result}"
     click.echo(msg)
 
 
 @main.command()
 @click.argument("issue_key", type=str)
-def rm(issue_key):
+@click.argument("status", type=str)
+def move(issue_key, status):
+    """Transition an issue to STATUS by the shortest known path."""
+    from kujira.kujira import get_conn, get_issue_by_key, move_issue, read_config
+
     config = read_config()
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
+    start = issue.fields.status.name
+    transitions_made = move_issue(conn, issue, status)
+    if transitions_made is None:
+        msg = f"Could not reach {status}, issue is {issue.fields.status.name}"
+    elif not transitions_made:
+        msg = f"Issue is already {status}"
+    else:
+        msg = f"Moved from {start} to {status} via {', '.join(transitions_made)}"
+    click.echo(msg)
+
+
+@main.command()
+@click.argument("issue_key", type=str)
+@queue_option
+def rm(issue_key, queued):
+    from kujira.kujira import evict_results, get_conn, get_issue_by_key, read_config
+
+    config = read_config()
+    if write_behind(config, queued):
+        enqueue(config, issue_key, "rm")
+        return
+    conn = get_conn(config)
+    issue = get_issue_by_key(conn, issue_key)
     issue.delete()
+    evict_results([issue_key], ())
 
 
 @main.command()
 @click.argument("project_name", type=str)
-def epics_for_project(project_name):
+@cached_options
+def epics_for_project(project_name, cached, max_age):
+    from kujira.kujira import get_all_epics, get_conn, read_config
+
     config = read_config()
+    mirror = cached and get_fresh_mirror(config, max_age)
+    if mirror:
+        for raw in mirror.epics(project_name):
+            click.echo(f"{raw['fields']['summary']} ({raw['key']})")
+        return
     conn = get_conn(config)
     for e in get_all_epics(conn, project_name):
         click.echo(f"{e.fields.summary} ({e.key})")
 
 
 @main.command()
-def get_all_users():
+@click.option("--refresh", is_flag=True, help="Rebuild the local user directory.")
+def get_all_users(refresh):
+    from kujira.kujira import get_user_directory, read_config
+
     config = read_config()
-    conn = get_conn(config)
-    for user in get_users(conn):
-        click.echo(UserModel.from_API(user))
+    ttl = 0 if refresh else DEFAULT_USERS_TTL
+    for user in get_user_directory(config, ttl=ttl).users:
+        click.echo(user)
+
+
+@main.command()
+@click.argument("query", type=str)
+def user(query):
+    """Look up users by account id, email, name or display-name prefix."""
+    from kujira.kujira import get_user_directory, read_config
+
+    directory = get_user_directory(read_config())
+    user = directory.get(query)
+    for match in [user] if user else directory.find(query):
+        click.echo(f"{match.account_id} {match}")
 
 
 @main.command()
 @click.argument("issue_key", type=str)
 @click.argument("epic_key", type=str)
-def add_epic_to_issue(issue_key, epic_key):
+@queue_option
+def add_epic_to_issue(issue_key, epic_key, queued):
+    from kujira.kujira import (
+        EPIC_FIELD,
+        evict_results,
+        get_conn,
+        get_issue_by_key,
+        read_config,
+    )
+
     config = read_config()
+    if write_behind(config, queued):
+        enqueue(config, issue_key, "epic", {"epic_key": epic_key})
+        return
     conn = get_conn(config)
     issue = get_issue_by_key(conn, issue_key)
     try:
@@ -146,6 +450,7 @@ def add_epic_to_issue(issue_key, epic_key):
     try:
 
         issue.update(fields={"parent": {"id": epic_issue.id}})
+        evict_results([issue_key], ("parent", "epic link", EPIC_FIELD))
         # associate_epic_to_issue(conn, issue, epic_issue)
         # issue = get_issue_by_key(conn, issue_key)
         # confirmed_epic_key = issue.fields.customfield_10910
@@ -157,6 +462,8 @@ def add_epic_to_issue(issue_key, epic_key):
 
 @main.command()
 def new():
+    from kujira.kujira import create_new_issue, get_conn, read_config
+
     config = read_config()
     conn = get_conn(config)
     new_issue = create_new_issue(conn, config)
@@ -164,14 +471,399 @@ def new():
 
 
 @main.command()
-@click.argument("status", type=str)
-def ls(status):
+@click.argument("statuses", metavar="STATUS...", nargs=-1, required=True)
+@click.option("--full", is_flag=True, help="Print every field, with epic tags.")
+@cached_options
+@refresh_option
+@all_servers_option
+def ls(statuses, full, cached, max_age, refresh, all_servers):
+    """List my issues in any of the STATUSes, from one search."""
+    from kujira.kujira import (
+        FULL_FIELDS,
+        format_issue_brief,
+        get_cached_results,
+        get_conn,
+        get_issue_models,
+        get_issues_for_status,
+        get_printable_issues,
+        read_config,
+        status_query,
+    )
+
+    if all_servers:
+        if full or cached:
+            raise click.UsageError("--all-servers lists brief issues from the servers")
+        echo_all_servers(status_query(*statuses))
+        return
+    config = read_config()
+    mirror = cached and get_fresh_mirror(config, max_age)
+    if mirror:
+        raw_issues = mirror.issues_for_status(config.account_id, *statuses)
+    elif full:
+        conn = get_conn(config)
+        issues = get_issues_for_status(conn, *statuses, fields=FULL_FIELDS)
+        for issue_model in get_printable_issues(issues, conn):
+            click.echo(issue_model)
+        return
+    else:
+        raw_issues = get_cached_results(
+            config, "ls", status_query(*statuses), refresh=refresh
+        )
+    for issue_model in get_issue_models(raw_issues, config.server_url):
+        click.echo(format_issue_brief(issue_model))
+
+
+@main.command()
+@click.option(
+    "--status",
+    "-s",
+    "statuses",
+    multiple=True,
+    help="A column to show; repeat for more (default: board_statuses).",
+)
+@cached_options
+@refresh_option
+def board(statuses, cached, max_age, refresh):
+    """Show my issues grouped by status, from one search."""
+    from kujira.kujira import (
+        BOARD_FIELDS,
+        DEFAULT_BOARD_STATUSES,
+        format_issue_brief,
+        get_cached_results,
+        get_issue_models,
+        group_by_status,
+        read_config,
+        status_query,
+    )
+
+    config = read_config()
+    statuses = statuses or config.board_statuses or DEFAULT_BOARD_STATUSES
+    mirror = cached and get_fresh_mirror(config, max_age)
+    if mirror:
+        raw_issues = mirror.issues_for_status(config.account_id, *statuses)
+    else:
+        raw_issues = get_cached_results(
+            config, "board", status_query(*statuses), BOARD_FIELDS, refresh=refresh
+        )
+    for status, raws in group_by_status(raw_issues, statuses).items():
+        click.echo(f"{status} ({len(raws)})")
+        for issue_model in get_issue_models(raws, config.server_url):
+            click.echo(f"  {format_issue_brief(issue_model)}")
+
+
+@main.command()
+@click.option("--mine", is_flag=True, help="Only issues assigned to me.")
+@click.option("--refresh", is_flag=True, help="Ask the server for the sprint again.")
+def sprint(mine, refresh):
+    """List the issues in the current sprint."""
+    from kujira.kujira import (
+        format_issue_brief,
+        get_conn,
+        get_current_sprint,
+        get_issue_models,
+        get_sprint_issues,
+        read_config,
+    )
+
+    config = read_config()
+    conn = get_conn(config)
+    try:
+        current_sprint = get_current_sprint(conn, config, refresh=refresh)
+    except LookupError as e:
+        raise click.ClickException(str(e))
+    if current_sprint is None:
+        click.echo("No active sprint", err=True)
+        return
+    click.echo(current_sprint.name)
+    raw_issues = get_sprint_issues(conn, current_sprint, json_result=True, mine=mine)
+    for issue_model in get_issue_models(raw_issues, config.server_url):
+        click.echo(format_issue_brief(issue_model))
+
+
+@main.command()
+@click.argument("jql", required=False)
+@click.option("--interval", type=float, default=10, help="Seconds between polls.")
+@click.option(
+    "--max-interval",
+    type=float,
+    default=300,
+    help="Longest wait between polls while nothing changes.",
+)
+def watch(jql, interval, max_interval):
+    """Follow JQL (default: my open issues), printing changes as they happen."""
+    from kujira.kujira import OPEN_ISSUES_QUERY, get_conn, read_config
+    from kujira.watch import watch as watch_issues
+
     config = read_config()
     conn = get_conn(config)
-    for issue in get_issues_for_status(conn, status):
-        printable_issue = get_printable_issue_brief(issue)
-        if printable_issue is not None:
-            click.echo(printable_issue)
+    try:
+        watch_issues(conn, jql or OPEN_ISSUES_QUERY, interval, max_interval, click.echo)
+    except KeyboardInterrupt:
+        pass
+
+
+@main.command()
+@click.argument("phrase")
+@click.option("--project", "-p", default=None, help="Only issues in this project.")
+@click.option("--limit", "-n", type=int, default=20, help="Most results to show.")
+@click.option(
+    "--fts",
+    "raw_query",
+    is_flag=True,
+    help="Read PHRASE as an FTS5 query (AND, OR, NEAR, prefix*).",
+)
+def grep(phrase, project, limit, raw_query):
+    """Search synced issues' summaries, descriptions and comments offline."""
+    import sqlite3
+
+    from kujira.kujira import read_config
+    from kujira.mirror import IssueMirror
+
+    config = read_config()
+    mirror = IssueMirror(config.mirror_path)
+    try:
+        for raw, snippet in mirror.search(phrase, project, limit, raw_query):
+            fields = raw["fields"]
+            status = (fields.get("status") or {}).get("name")
+            click.echo(f"{raw['key']} | {fields.get('summary')} [{status}]")
+            click.echo(f"    {' '.join(snippet.split())}")
+    except (RuntimeError, sqlite3.OperationalError) as e:
+        raise click.ClickException(str(e))
+    finally:
+        mirror.close()
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on.")
+@click.option("--port", type=int, default=8765, help="Port to listen on.")
+@click.option(
+    "--secret",
+    envvar="KUJIRA_WEBHOOK_SECRET",
+    default=None,
+    help="Webhook secret; unsigned requests are rejected when set.",
+)
+def listen(host, port, secret):
+    """Receive Jira webhooks and apply them to the local caches."""
+    from kujira.kujira import read_config, server_path
+    from kujira.listen import WebhookServer
+    from kujira.sprints import DEFAULT_SPRINTS_PATH
+
+    config = read_config()
+    server = WebhookServer(
+        (host, port),
+        mirror_path=config.mirror_path,
+        sprints_path=server_path(DEFAULT_SPRINTS_PATH, config.server_url),
+        projects=config.sync_projects,
+        secret=secret,
+        on_event=click.echo,
+    )
+    click.echo(f"Listening on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@main.command()
+@click.option("--full", is_flag=True, help="Reload everything instead of catching up.")
+def sync(full):
+    from kujira.kujira import get_conn, read_config
+    from kujira.mirror import IssueMirror
+
+    config = read_config()
+    conn = get_conn(config)
+    mirror = IssueMirror(config.mirror_path)
+    for project in config.sync_projects:
+        count = mirror.sync(conn, project, full=full)
+        click.echo(f"{project}: {count} issues synced")
+
+
+@main.command()
+@click.argument("jql", type=str)
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="ndjson")
+@click.option(
+    "--fields",
+    default=",".join(DEFAULT_EXPORT_FIELDS),
+    help="Comma-separated fields to fetch and write.",
+)
+@click.option("--output", "-o", default="-", help="File to write, - for stdout.")
+@click.option(
+    "--paging",
+    type=click.Choice(PAGING_MODES),
+    default=None,
+    help="How to walk the results; keyset stays consistent on huge scans and "
+    "keeps memory flat (token, the Cloud default, remembers every key).",
+)
+@click.option(
+    "--shard-by",
+    type=click.Choice(("created", "key")),
+    default=None,
+    help="Split the scan into ranges fetched concurrently, merged by key.",
+)
+@click.option("--shard-size", type=int, default=None, help="Issues per shard.")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Remember finished shards here so a rerun can resume.",
+)
+@all_servers_option
+@click.option(
+    "--merge-by",
+    type=click.Choice(("created", "updated")),
+    default="created",
+    help="With --all-servers, the order issues are merged (and written) in.",
+)
+def export(
+    jql,
+    fmt,
+    fields,
+    output,
+    paging,
+    shard_by,
+    shard_size,
+    checkpoint,
+    all_servers,
+    merge_by,
+):
+    """Stream every issue matching JQL as NDJSON or CSV."""
+    from kujira.export import export_issues
+    from kujira.kujira import (
+        check_paging,
+        get_conn,
+        get_issues,
+        read_all_configs,
+        read_config,
+        split_config_list,
+    )
+
+    fields = split_config_list(fields)
+    if all_servers:
+        if paging or shard_by or checkpoint:
+            raise click.UsageError(
+                "--all-servers can't be combined with --paging or sharding"
+            )
+        from kujira.servers import profile_name, search_all_servers
+
+        issues = search_all_servers(read_all_configs(), jql, merge_by, fields)
+        raw_issues = ({"server": profile_name(config), **raw} for config, raw in issues)
+        with click.open_file(output, "w") as out:
+            count = export_issues(raw_issues, out, fmt, fields, with_server=True)
+        click.echo(f"Exported {count} issues", err=True)
+        return
+    if checkpoint and output == "-":
+        raise click.UsageError("--checkpoint needs an --output file to resume")
+    config = read_config()
+    conn = get_conn(config)
+    if paging:
+        try:
+            check_paging(conn, paging)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+    if shard_by or checkpoint:
+        from kujira.scan import DEFAULT_SHARD_SIZE, ScanCheckpoint, scan_issues
+
+        progress = checkpoint and ScanCheckpoint(checkpoint, jql, deferred=True)
+        raw_issues = scan_issues(
+            conn,
+            jql,
+            by=shard_by or "created",
+            shard_size=shard_size or DEFAULT_SHARD_SIZE,
+            checkpoint=progress,
+            fields=fields,
+            json_result=True,
+        )
+    else:
+        progress = None
+        raw_issues = get_issues(
+            conn, jql, fields=fields, read_ahead=True, json_result=True, paging=paging
+        )
+    if not progress:
+        with click.open_file(output, "w") as out:
+            count = export_issues(raw_issues, out, fmt, fields)
+        click.echo(f"Exported {count} issues", err=True)
+        return
+    # Resume after the last rows the checkpoint saw flushed, dropping anything
+    # written after them; shards only count as finished once flushed too.
+    resuming = progress.output is not None and os.path.exists(output)
+    if resuming:
+        os.truncate(output, progress.output["offset"])
+    else:
+        progress.finished.clear()
+        progress.output = None
+    with open(output, "a" if resuming else "w", newline="") as out:
+        count = export_issues(
+            progress.track(raw_issues),
+            out,
+            fmt,
+            fields,
+            header=not resuming,
+            on_flush=lambda: progress.commit(out.tell()),
+        )
+    click.echo(f"Exported {count} issues", err=True)
+
+
+@main.group()
+def queue():
+    """Changes recorded by --queue (or write_behind) and not applied yet."""
+
+
+@queue.command("status")
+def queue_status():
+    """List pending and failed operations."""
+    from kujira.outbox import Outbox, describe
+
+    outbox = Outbox()
+    try:
+        operations = outbox.operations()
+    finally:
+        outbox.close()
+    if not operations:
+        click.echo("Nothing queued")
+    for operation in operations:
+        click.echo(describe(operation))
+
+
+@queue.command("flush")
+@click.option("--retry-failed", is_flag=True, help="Queue failed operations again.")
+def queue_flush(retry_failed):
+    """Apply queued operations now."""
+    from kujira.outbox import Outbox, flush
+
+    outbox = Outbox()
+    try:
+        if retry_failed:
+            outbox.retry_failed()
+    finally:
+        outbox.close()
+    for operation, outcome in flush(outbox.path):
+        if isinstance(outcome, Exception):
+            click.echo(
+                f"{operation.kind} of {operation.issue_key}: {outcome}", err=True
+            )
+        else:
+            click.echo(outcome)
+
+
+@main.command()
+@click.option("--socket", "socket_path", default=DEFAULT_SOCKET_PATH)
+@click.option(
+    "--cache-ttl",
+    type=int,
+    default=DEFAULT_CACHE_TTL,
+    help="Seconds before in-memory caches are dropped.",
+)
+def daemon(socket_path, cache_ttl):
+    """Serve kujira commands from a warm connection over a Unix socket."""
+    from kujira.daemon import serve
+
+    click.echo(f"kujira daemon listening on {socket_path}", err=True)
+    try:
+        serve(socket_path, cache_ttl)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
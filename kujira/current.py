@@ -0,0 +1,21 @@
+"""
+The issue being worked on, kept in a one-line file for shell prompts.
+
+Reading it must stay cheap, so this module only uses the standard library.
+"""
+import os
+
+CURRENT_ISSUE_PATH = "~/.jira/current_issue"
+
+
+def read_current_issue(path=CURRENT_ISSUE_PATH):
+    try:
+        with open(os.path.expanduser(path)) as f:
+            return f.readline().rstrip("\n")
+    except FileNotFoundError:
+        return None
+
+
+def write_current_issue(line, path=CURRENT_ISSUE_PATH):
+    with open(os.path.expanduser(path), "w") as f:
+        f.write(line + "\n")
@@ -0,0 +1,215 @@
+"""
+Optional resident kujira process.
+
+``kujira daemon`` keeps one authenticated Jira connection (and the in-process
+caches in kujira.kujira) warm and runs CLI commands sent to it over a Unix
+socket.  ``run`` is the console entry point: it hands the command line to the
+daemon when one is listening and otherwise runs the command directly.
+
+This module only imports the standard library at load time, so the front end
+stays cheap when the daemon does the work.
+
+Wire format: the client sends one JSON line ``{"argv": [...]}``; the daemon
+answers with JSON lines ``{"out": text}``, ``{"err": text}`` and finally
+``{"exit": code}``.
+"""
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+
+DEFAULT_SOCKET_PATH = "~/.jira/kujira.sock"
+DEFAULT_CACHE_TTL = 10 * 60
+
+# These need the user's terminal (an editor or a debugger) or working directory,
+# are the daemon, run until interrupted, or are cheaper to run here than to send
+# over the socket.
+LOCAL_ONLY_COMMANDS = {
+    "add-epic-to-issue",
+    "current",
+    "daemon",
+    "edit",
+    "explore",
+    "export",
+    "inspect",
+    "listen",
+    "new",
+    "watch",
+}
+
+# Tracing should measure this process and write files relative to its directory.
+LOCAL_ONLY_OPTIONS = {"--trace", "--trace-json", "--profile"}
+
+# Global options whose value is the next argument, unless given as --opt=value.
+VALUE_OPTIONS = {"--trace-json", "--profile", "--server"}
+
+
+class _StreamWriter(io.TextIOBase):
+    def __init__(self, wfile, name):
+        self.wfile = wfile
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if isinstance(text, bytes):
+            text = text.decode("utf-8", "replace")
+        if text:
+            _send(self.wfile, {self.name: text})
+        return len(text)
+
+
+def _send(wfile, message):
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+    wfile.flush()
+
+
+def run_command(command, argv, stdout, stderr):
+    """Run a click command the way standalone mode would, returning the exit code."""
+    import click
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            command.main(args=argv, prog_name="kujira", standalone_mode=False)
+        except click.exceptions.Exit as e:
+            return e.exit_code
+        except click.ClickException as e:
+            e.show(file=stderr)
+            return e.exit_code
+        except click.exceptions.Abort:
+            print("Aborted!", file=stderr)
+            return 1
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc(file=stderr)
+            return 1
+    return 0
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        self.server.expire_caches()
+        exit_code = run_command(
+            self.server.command,
+            request["argv"],
+            _StreamWriter(self.wfile, "out"),
+            _StreamWriter(self.wfile, "err"),
+        )
+        _send(self.wfile, {"exit": exit_code})
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Handles one command at a time; commands share sys.stdout while they run."""
+
+    def __init__(self, socket_path, command, cache_ttl=DEFAULT_CACHE_TTL):
+        self.socket_path = os.path.expanduser(socket_path)
+        self.command = command
+        self.cache_ttl = cache_ttl
+        self.caches_loaded_at = time.monotonic()
+        _remove_stale_socket(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, CommandHandler)
+        finally:
+            os.umask(old_umask)
+
+    def expire_caches(self):
+        if time.monotonic() - self.caches_loaded_at < self.cache_ttl:
+            return
+        from kujira.kujira import clear_caches
+
+        clear_caches()
+        self.caches_loaded_at = time.monotonic()
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+
+
+def _remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"A kujira daemon is already listening on {socket_path}")
+
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, cache_ttl=DEFAULT_CACHE_TTL):
+    from kujira.cli import main
+
+    with DaemonServer(socket_path, main, cache_ttl) as server:
+        server.serve_forever()
+
+
+def call_daemon(argv, socket_path=DEFAULT_SOCKET_PATH):
+    """Run ``argv`` in the daemon; returns the exit code, or None if none is running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.path.expanduser(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        _send(stream, {"argv": list(argv)})
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+            elif "err" in message:
+                sys.stderr.write(message["err"])
+            elif "exit" in message:
+                sys.stdout.flush()
+                return message["exit"]
+    # The daemon went away mid-command; don't rerun it, it may have mutated.
+    print("Lost connection to the kujira daemon", file=sys.stderr)
+    return 1
+
+
+def _command_name(argv):
+    args = iter(argv)
+    for arg in args:
+        if arg in VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _with_client_server(argv):
+    """Send the client's KUJIRA_SERVER along; the daemon has its own environment."""
+    server = os.environ.get("KUJIRA_SERVER")
+    has_server = any(arg.split("=", 1)[0] == "--server" for arg in argv)
+    if not server or has_server:
+        return list(argv)
+    return ["--server", server] + list(argv)
+
+
+def _wants_local(argv):
+    return any(arg.split("=", 1)[0] in LOCAL_ONLY_OPTIONS for arg in argv)
+
+
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    exit_code = None
+    command_name = _command_name(argv)
+    use_daemon = not os.environ.get("KUJIRA_NO_DAEMON") and not _wants_local(argv)
+    if use_daemon and command_name and command_name not in LOCAL_ONLY_COMMANDS:
+        exit_code = call_daemon(_with_client_server(argv))
+    if exit_code is None:
+        from kujira.cli import main
+
+        main(args=argv, prog_name="kujira")
+    sys.exit(exit_code)
@@ -0,0 +1,136 @@
+"""
+Stream search results out as NDJSON or CSV.
+
+Issues are written as they arrive from get_issues and flushed every
+``chunk_size`` rows, so memory stays flat however many issues match.  The one
+exception is token paging (the Cloud default), which remembers every key to
+drop repeats; ``--paging keyset`` keeps a Cloud export flat too.
+"""
+import csv
+import json
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 50
+DEFAULT_EXPORT_FIELDS = (
+    "summary",
+    "status",
+    "issuetype",
+    "priority",
+    "assignee",
+    "reporter",
+    "created",
+    "updated",
+)
+
+
+def flatten_field(value):
+    """A CSV-friendly string for a field from the search JSON."""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "; ".join(flatten_field(item) for item in value)
+    if isinstance(value, dict):
+        for attr in ("key", "name", "displayName", "value", "accountId", "id"):
+            if attr in value:
+                return str(value[attr])
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def _write_chunks(lines, out, chunk_size, on_flush=None):
+    """Write ``lines`` a chunk at a time.
+
+    ``on_flush()`` runs after each flush, and once more when ``lines`` runs out.
+    """
+    count = 0
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            out.write("".join(chunk))
+            out.flush()
+            count += len(chunk)
+            chunk = []
+            if on_flush:
+                on_flush()
+    if chunk:
+        out.write("".join(chunk))
+        out.flush()
+        count += len(chunk)
+    if on_flush:
+        on_flush()
+    return count
+
+
+def export_ndjson(
+    raw_issues, out, chunk_size=EXPORT_CHUNK_SIZE, with_server=False, on_flush=None
+):
+    def lines():
+        for raw in raw_issues:
+            issue = {"key": raw["key"], "fields": raw.get("fields", {})}
+            if with_server:
+                issue = {"server": raw["server"], **issue}
+            yield json.dumps(issue) + "\n"
+
+    return _write_chunks(lines(), out, chunk_size, on_flush)
+
+
+class _Line:
+    """File-like target for csv.writer that hands back the last row."""
+
+    def write(self, text):
+        self.text = text
+
+
+def export_csv(
+    raw_issues,
+    out,
+    fields,
+    chunk_size=EXPORT_CHUNK_SIZE,
+    with_server=False,
+    header=True,
+    on_flush=None,
+):
+    line = _Line()
+    writer = csv.writer(line, lineterminator="\n")
+    server_column = ("server",) if with_server else ()
+    if header:
+        writer.writerow(server_column + ("key",) + tuple(fields))
+        out.write(line.text)
+
+    def rows():
+        for raw in raw_issues:
+            issue_fields = raw.get("fields", {})
+            writer.writerow(
+                ([raw["server"]] if with_server else [])
+                + [raw["key"]]
+                + [flatten_field(issue_fields.get(field)) for field in fields]
+            )
+            yield line.text
+
+    return _write_chunks(rows(), out, chunk_size, on_flush)
+
+
+def export_issues(
+    raw_issues,
+    out,
+    fmt,
+    fields,
+    chunk_size=EXPORT_CHUNK_SIZE,
+    with_server=False,
+    header=True,
+    on_flush=None,
+):
+    """Write ``raw_issues`` to ``out`` in ``fmt``; returns how many were written.
+
+    ``with_server`` adds each issue's "server" (a profile name) to the output.
+    ``header=False`` leaves out the CSV header, for appending to an export.
+    ``on_flush()`` is called each time written rows are flushed to ``out``.
+    """
+    if fmt == "ndjson":
+        return export_ndjson(raw_issues, out, chunk_size, with_server, on_flush)
+    if fmt == "csv":
+        return export_csv(
+            raw_issues, out, fields, chunk_size, with_server, header, on_flush
+        )
+    raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
@@ -3,17 +3,72 @@
 """Main module."""
 import configparser
 import os
+import re
 import sys
+import threading
+import time
 from collections import namedtuple
-
-from jira import JIRA
-
+from concurrent.futures import Future
+from itertools import islice
+from urllib.parse import urlsplit
+
+from jira import JIRA, JIRAError
+from jira.resources import Issue
+
+from kujira.aio import (
+    DEFAULT_CONCURRENCY,
+    PAGE_SIZE,
+    READ_AHEAD_PAGES,
+    AsyncJira,
+    issue_key,
+    iterate_sync,
+    search_page,
+)
+from kujira.current import write_current_issue
 from kujira.edit import edit
-from kujira.models.issue import IssueModel, get_updates, make_new_issue_template
+from kujira.mirror import DEFAULT_MAX_AGE, DEFAULT_MIRROR_PATH
+from kujira.models.issue import (
+    IssueModel,
+    get_field,
+    get_updates,
+    make_new_issue_template,
+)
+from kujira.models.user import UserModel
+from kujira.paging import PAGING_MODES
+from kujira.ratelimit import DEFAULT_MAX_RATE, DEFAULT_RATE, RateLimiter
+from kujira.ratelimit import install as install_rate_limiter
+from kujira.results import (
+    DEFAULT_MAX_STALE,
+    DEFAULT_RESULT_TTL,
+    ResultCache,
+    refresh_in_background,
+    server_key,
+)
+from kujira.sprints import DEFAULT_SPRINTS_PATH, SprintCache, pick_current_sprint
+from kujira.users import DEFAULT_USERS_PATH, DEFAULT_USERS_TTL, UserDirectory
+from kujira.workflow import WorkflowCache
 
 Config = namedtuple(
     "Config",
-    "user api_key server_url default_project default_issue_type default_priority account_id",
+    "user api_key server_url default_project default_issue_type default_priority "
+    "account_id sync_projects mirror_path mirror_max_age concurrency "
+    "rate_limit max_rate_limit sprint_board sprint_name_contains sprint_excludes "
+    "result_ttls profile write_behind board_statuses",
+    defaults=(
+        (),
+        DEFAULT_MIRROR_PATH,
+        DEFAULT_MAX_AGE,
+        DEFAULT_CONCURRENCY,
+        DEFAULT_RATE,
+        DEFAULT_MAX_RATE,
+        None,
+        "",
+        (),
+        {},
+        None,
+        False,
+        (),
+    ),
 )
 
 ISSUE_TYPES = (
@@ -29,52 +84,336 @@ ISSUE_TYPES = (
 )
 
 
-def read_config(config_path="~/.jira/config.ini"):
+def split_config_list(value):
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def split_config_mapping(value):
+    """'mine=30, ls=120' -> {'mine': 30, 'ls': 120}"""
+    pairs = (item.partition("=") for item in split_config_list(value))
+    return {name.strip(): int(seconds) for name, _, seconds in pairs}
+
+
+def server_path(path, server_url):
+    """``path`` with the server's host in its name, so servers get separate caches.
+
+    ~/.jira/users.json -> ~/.jira/users.jira.example.com.json
+    """
+    if path == ":memory:":
+        return path
+    parts = urlsplit(server_url)
+    name = re.sub(r"[^\w.-]+", "_", parts.netloc + parts.path).strip("_")
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}{extension}"
+
+
+DEFAULT_CONFIG_PATH = "~/.jira/config.ini"
+PROFILE_PREFIX = "Jira:"
+
+# The server profile read_config uses when none is named (kujira --server).
+_profile = None
+
+
+def set_profile(profile):
+    """Make read_config() use [Jira:profile] by default; returns the previous one."""
+    global _profile
+    previous, _profile = _profile, profile
+    return previous
+
+
+def _profile_section(cfg, profile):
+    """[Jira:profile] on top of [Jira], as one section."""
+    name = PROFILE_PREFIX + profile
+    if not cfg.has_section(name):
+        raise LookupError(f"No [{name}] section in the kujira config")
+    merged = {}
+    for section in ("Jira", name):
+        if cfg.has_section(section):
+            for option in cfg.options(section):
+                merged[option] = cfg.get(section, option, raw=True)
+    cfg.read_dict({name: merged})
+    return cfg[name]
+
+
+def read_config(config_path=DEFAULT_CONFIG_PATH, profile=None):
+    """Settings from [Jira], or from a [Jira:NAME] server profile.
+
+    A profile falls back to [Jira] for anything it doesn't set.
+    """
     cfg = configparser.ConfigParser()
     cfg.read(os.path.expanduser(config_path))
+    return _config_from(cfg, profile or _profile)
+
+
+def _config_from(cfg, profile):
+    section = _profile_section(cfg, profile) if profile else cfg["Jira"]
     return Config(
-        user=cfg["Jira"]["user"],
-        api_key=cfg["Jira"]["api_key"],
-        server_url=cfg["Jira"]["server_url"],
-        default_project=cfg["Jira"]["default_project"],
-        default_issue_type=cfg["Jira"]["default_issue_type"],
-        default_priority=cfg["Jira"]["default_priority"],
-        account_id=cfg["Jira"]["account_id"],
+        user=section["user"],
+        api_key=section["api_key"],
+        server_url=section["server_url"],
+        default_project=section["default_project"],
+        default_issue_type=section["default_issue_type"],
+        default_priority=section["default_priority"],
+        account_id=section["account_id"],
+        sync_projects=split_config_list(
+            section.get("sync_projects", section["default_project"])
+        ),
+        mirror_path=server_path(
+            section.get("mirror_path", DEFAULT_MIRROR_PATH), section["server_url"]
+        ),
+        mirror_max_age=section.getint("mirror_max_age", DEFAULT_MAX_AGE),
+        concurrency=section.getint("concurrency", DEFAULT_CONCURRENCY),
+        rate_limit=section.getfloat("rate_limit", DEFAULT_RATE),
+        max_rate_limit=section.getfloat("max_rate_limit", DEFAULT_MAX_RATE),
+        sprint_board=section.getint("sprint_board", None),
+        sprint_name_contains=section.get("sprint_name_contains", ""),
+        sprint_excludes=split_config_list(section.get("sprint_excludes", "")),
+        result_ttls=split_config_mapping(section.get("result_ttls", "")),
+        profile=profile,
+        write_behind=section.getboolean("write_behind", False),
+        board_statuses=split_config_list(section.get("board_statuses", "")),
     )
 
 
+def read_all_configs(config_path=DEFAULT_CONFIG_PATH):
+    """One Config per server: [Jira] (if present) and every [Jira:NAME]."""
+    cfg = configparser.ConfigParser()
+    cfg.read(os.path.expanduser(config_path))
+    profiles = [None] if cfg.has_section("Jira") else []
+    profiles += [
+        section[len(PROFILE_PREFIX) :]
+        for section in cfg.sections()
+        if section.startswith(PROFILE_PREFIX)
+    ]
+    return [_config_from(cfg, profile) for profile in profiles]
+
+
+# Connections by (server, user, api key); long-lived processes reuse them.
+_conns = {}
+
+# How many requests the retrieval functions keep in flight at once, by the
+# connection they use; connections not made by get_conn use the default.
+_concurrency = {}
+
+# One rate limiter per server, shared by every connection and thread using it.
+_limiters = {}
+
+# get_conn is called from worker threads (server fan-out, outbox flushes).
+# _conns_lock guards the dicts above; each connection is made under its own
+# lock so a slow server doesn't hold up connecting to the others.
+_conns_lock = threading.Lock()
+_connecting = {}
+
+
 def get_conn(config):
-    config = read_config()
-    options = {"server": config.server_url}
+    conn_key = (config.server_url, config.user, config.api_key)
+    with _conns_lock:
+        if conn_key in _conns:
+            return _conns[conn_key]
+        connecting = _connecting.setdefault(conn_key, threading.Lock())
+    with connecting:
+        with _conns_lock:
+            if conn_key in _conns:
+                return _conns[conn_key]
+            limiter = _get_rate_limiter(config)
+        conn = _connect(config, limiter)
+        with _conns_lock:
+            _conns[conn_key] = conn
+            _concurrency[conn] = config.concurrency
+        return conn
+
+
+def _connect(config, limiter):
+    # Retries are left to the rate limiter, which honours Retry-After;
+    # the session's own retries would multiply its attempts.
+    conn = JIRA(
+        options={"server": config.server_url},
+        basic_auth=(config.user, config.api_key),
+        get_server_info=False,
+        max_retries=0,
+    )
+    install_rate_limiter(
+        conn._session,
+        config.server_url,
+        limiter,
+        pool_size=max(10, config.concurrency),
+    )
+    # What JIRA() would have asked on connect, now through the limiter.
+    server_info = conn.server_info()
+    conn._version = tuple(server_info["versionNumbers"])
+    conn.deploymentType = server_info.get("deploymentType")
+    return conn
+
+
+def get_rate_limiter(config):
+    with _conns_lock:
+        return _get_rate_limiter(config)
 
-    return JIRA(options, basic_auth=(config.user, config.api_key))
 
+def _get_rate_limiter(config):
+    if config.server_url not in _limiters:
+        _limiters[config.server_url] = RateLimiter(
+            config.rate_limit, config.max_rate_limit
+        )
+    return _limiters[config.server_url]
+
+
+def clear_caches():
+    """Forget cached lookups so a long-running process sees fresh data."""
+    _epic_tags.clear()
+    clear_issues()
+
+
+# Fields each kind of listing needs; pass one of these as get_issues(fields=...)
+BRIEF_FIELDS = ("summary", "updated")
+EPIC_LIST_FIELDS = ("summary",)
 
-def get_issues(conn, query):
-    maxResults = 50
+
+def iterate_async(conn, make_iterable, concurrency=None):
+    """Yield from ``make_iterable(client)`` for a short-lived AsyncJira client."""
+    client = AsyncJira(
+        conn, concurrency or _concurrency.get(conn, DEFAULT_CONCURRENCY)
+    )
+    try:
+        yield from iterate_sync(make_iterable(client))
+    finally:
+        client.close()
+
+
+def get_issues(
+    conn, query, fields=None, read_ahead=False, json_result=False, paging=None
+):
+    """Yield every issue matching ``query``.
+
+    ``fields`` limits the payload to the named fields; None asks for all of them.
+    ``json_result`` yields raw JSON dicts instead of jira Issue Resources.
+
+    ``paging`` is one of PAGING_MODES: "offset" pages with startAt (and is the
+    only mode ``read_ahead`` can plan ahead for), "token" follows Jira Cloud's
+    nextPageToken, and "keyset" asks for ``key > last`` ordered by key, so
+    results come back in key order whatever ``query`` asks for.  The default
+    is "token" on Cloud and "offset" elsewhere.
+
+    Token paging drops repeats (issues that moved between pages mid-scan), so
+    it keeps every key it has yielded and its memory grows with the result.
+    Keyset paging can't repeat an issue and keeps memory flat on any scan.
+    """
+    search_kwargs = {}
+    if fields is not None:
+        search_kwargs["fields"] = ",".join(fields)
+    if json_result:
+        search_kwargs["json_result"] = True
+    if paging is None:
+        paging = "token" if is_cloud(conn) else "offset"
+    check_paging(conn, paging)
+    if paging == "token":
+        issues = iterate_async(
+            conn,
+            lambda client: client.search_issues_by_token(query, **search_kwargs),
+        )
+        yield from unique_by_key(issues)
+        return
+    if paging == "keyset":
+        # Every page starts after the last key, so nothing comes back twice.
+        yield from iterate_async(
+            conn, lambda client: client.search_issues_by_key(query, **search_kwargs)
+        )
+        return
+    if read_ahead:
+        yield from get_issues_read_ahead(conn, query, **search_kwargs)
+        return
     startAt = 0
-    issues = conn.search_issues(query, startAt=startAt, maxResults=maxResults)
+    issues, _ = search_page(conn, query, startAt, **search_kwargs)
     while len(issues) > 0:
         for issue in issues:
             yield issue
-        startAt += maxResults
-        issues = conn.search_issues(query, startAt=startAt, maxResults=maxResults)
+        startAt += PAGE_SIZE
+        issues, _ = search_page(conn, query, startAt, **search_kwargs)
+
+
+def is_cloud(conn):
+    return getattr(conn, "_is_cloud", False) is True
+
+
+def check_paging(conn, paging):
+    """Raise ValueError unless ``conn`` can page a search the ``paging`` way."""
+    if paging not in PAGING_MODES:
+        raise ValueError(f"Unknown paging mode {paging!r}")
+    if paging == "token" and not is_cloud(conn):
+        raise ValueError("Token paging needs Jira Cloud; use offset or keyset")
+
+
+def unique_by_key(issues):
+    """Drop every issue whose key was already yielded.
+
+    An issue can come back any number of pages later when its sort position
+    changes mid-scan, so this remembers every key (a few bytes per issue).
+    """
+    seen = set()
+    for issue in issues:
+        key = issue_key(issue)
+        if key not in seen:
+            seen.add(key)
+            yield issue
+
+
+def get_issues_read_ahead(
+    conn, query, max_workers=None, max_pages=READ_AHEAD_PAGES, **search_kwargs
+):
+    """Yield issues in order while later pages are fetched concurrently.
+
+    At most ``max_pages`` pages are requested or held at once; see
+    AsyncJira.search_issues.
+    """
+    yield from iterate_async(
+        conn,
+        lambda client: client.search_issues(query, max_pages, **search_kwargs),
+        concurrency=max_workers,
+    )
 
 
 def get_users(conn, query="%"):
-    maxResults = 1000
-    startAt = 0
-    users = conn.search_users(query, startAt=startAt, maxResults=maxResults)
-    while len(users) > 0:
-        for user in users:
-            yield user
-        startAt += maxResults
-        users = conn.search_users(query, startAt=startAt, maxResults=maxResults)
+    yield from iterate_async(conn, lambda client: client.users(query))
+
 
+def get_user_directory(config, path=DEFAULT_USERS_PATH, ttl=DEFAULT_USERS_TTL):
+    """The server's on-disk user directory, rebuilt from it once it is stale."""
+    path = server_path(path, config.server_url)
+    directory = UserDirectory.load(path)
+    if directory is None or directory.is_stale(ttl):
+        conn = get_conn(config)
+        directory = UserDirectory(UserModel.from_API(user) for user in get_users(conn))
+        directory.save(path)
+    return directory
 
-def get_open_issues(conn):
+
+def assignee_field(config, assignee):
+    """The create_issue ``assignee`` for what was written in an issue template.
+
+    The template starts out with our own account id; anything else is looked
+    up in the user directory (account id, email, name or display-name prefix)
+    and raises LookupError unless exactly one user matches.
+    """
+    if assignee in (None, "", "None", config.account_id):
+        return {"accountId": config.account_id}
+    user = get_user_directory(config).resolve(assignee)
+    # Server has no account ids; it assigns by user name.
+    return {"accountId": user.account_id} if user.account_id else {"name": user.name}
+
+
+OPEN_ISSUES_QUERY = (
+    "resolution = unresolved and assignee=currentuser() "
+    "ORDER BY created"
+)
+
+
+def get_open_issues(conn, fields=BRIEF_FIELDS, json_result=False):
     yield from get_issues(
-        conn, "resolution = unresolved and assignee=currentuser() ORDER BY created"
+        conn,
+        OPEN_ISSUES_QUERY,
+        fields=fields,
+        read_ahead=True,
+        json_result=json_result,
     )
 
 
@@ -82,16 +421,140 @@ def get_all_epics(conn, project_name=None):
     if project_name is None:
         config = read_config()
         project_name = config.default_project
-    yield from get_issues(conn, f'issuetype="Epic" AND project="{project_name}"')
+    fields = ",".join(EPIC_LIST_FIELDS)
+    yield from iterate_async(
+        conn, lambda client: client.epics(project_name, fields=fields)
+    )
 
 
-def get_issues_for_status(conn, status):
-    query = f'assignee=currentuser() and status="{status}" ORDER BY created'
-    yield from get_issues(conn, query)
+def status_query(*statuses):
+    """My issues in any of ``statuses``, as one search."""
+    quoted = ", ".join(f'"{status}"' for status in statuses)
+    where = f"status={quoted}" if len(statuses) == 1 else f"status in ({quoted})"
+    return f"assignee=currentuser() and {where} ORDER BY created"
 
 
-def get_issue_by_key(conn, id):
-    return conn.issue(id)
+def get_issues_for_status(conn, *statuses, fields=BRIEF_FIELDS, json_result=False):
+    yield from get_issues(
+        conn,
+        status_query(*statuses),
+        fields=fields,
+        read_ahead=True,
+        json_result=json_result,
+    )
+
+
+# Cached search results for the list commands, opened on first use.
+_results = None
+
+# Guards opening _results and _workflow; outbox flushes use them from threads.
+_caches_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _results
+    with _caches_lock:
+        if _results is None:
+            _results = ResultCache()
+        return _results
+
+
+def get_cached_results(config, command, query, fields=BRIEF_FIELDS, refresh=False):
+    """Raw issues matching ``query``, from the result cache when possible.
+
+    An entry older than the command's TTL is still returned, and refreshed in
+    the background for the next run.
+    """
+    cache = get_result_cache()
+    server = server_key(config)
+    cached = None if refresh else cache.get(server, query, fields)
+    if cached is None or time.time() - cached.fetched_at > DEFAULT_MAX_STALE:
+        conn = get_conn(config)
+        raws = list(get_issues(conn, query, fields, read_ahead=True, json_result=True))
+        cache.store(server, query, fields, raws)
+        return raws
+    ttl = config.result_ttls.get(command, DEFAULT_RESULT_TTL)
+    if time.time() - cached.fetched_at > ttl:
+        claimed_at = cache.claim_refresh(server, query, fields)
+        if claimed_at is not None:
+            refresh_in_background(query, fields, cache.path, config.profile, claimed_at)
+    return cached.raws
+
+
+def evict_results(issue_keys=(), changed_fields=None):
+    """Forget cached results a mutation may have changed (see ResultCache.evict).
+
+    The changed issues are dropped from the identity map too.
+    """
+    forget_issues(issue_keys)
+    get_result_cache().evict(issue_keys, changed_fields)
+
+
+# (server, issue key) -> Issue, shared by every get_issue_by_key in this process
+_issues = {}
+# (server, issue key) -> Future for a fetch in flight
+_issue_fetches = {}
+_issues_lock = threading.Lock()
+
+
+def _issue_cache_key(conn, key):
+    return getattr(conn, "server_url", None), str(key).upper()
+
+
+def forget_issues(issue_keys):
+    """Make the next get_issue_by_key for each of these ask the server again."""
+    keys = {str(key).upper() for key in issue_keys}
+    with _issues_lock:
+        for cache in (_issues, _issue_fetches):
+            for cache_key in [k for k in cache if k[1] in keys]:
+                # A fetch in flight may predate the change; it won't be kept.
+                del cache[cache_key]
+
+
+def clear_issues():
+    with _issues_lock:
+        _issues.clear()
+
+
+def get_issue_by_key(conn, id, refresh=False):
+    """The issue, fetched at most once per process.
+
+    Every caller gets the same Issue object, and callers asking for a key
+    that is already being fetched (from another thread) wait for that
+    request instead of sending their own.  ``refresh`` skips the cached copy.
+    """
+    cache_key = _issue_cache_key(conn, id)
+    with _issues_lock:
+        if refresh:
+            _issues.pop(cache_key, None)
+        if cache_key in _issues:
+            return _issues[cache_key]
+        fetch = _issue_fetches.get(cache_key)
+        if fetch is None:
+            fetch = _issue_fetches[cache_key] = Future()
+            leader = True
+        else:
+            leader = False
+    if not leader:
+        return fetch.result()
+    try:
+        issue = conn.issue(id)
+    except BaseException as e:
+        with _issues_lock:
+            if _issue_fetches.get(cache_key) is fetch:
+                del _issue_fetches[cache_key]
+        fetch.set_exception(e)
+        raise
+    with _issues_lock:
+        if _issue_fetches.get(cache_key) is fetch:
+            _issues[cache_key] = issue
+            del _issue_fetches[cache_key]
+    fetch.set_result(issue)
+    return issue
+
+
+def issue_from_raw(raw, server_url):
+    return Issue({"server": server_url}, None, raw=raw)
 
 
 # NEXT_ACTION = {
@@ -109,6 +572,56 @@ NEXT_ACTION = {
 }
 
 
+# The columns `kujira board` shows unless board_statuses says otherwise.
+DEFAULT_BOARD_STATUSES = tuple(NEXT_ACTION)
+BOARD_FIELDS = BRIEF_FIELDS + ("status",)
+
+
+def group_by_status(raw_issues, statuses):
+    """{status: [raw issues]} in ``statuses`` order.
+
+    Jira matches status names in any case, so grouping does too.
+    """
+    columns = {status: [] for status in statuses}
+    by_name = {status.lower(): status for status in statuses}
+    for raw in raw_issues:
+        name = (raw["fields"].get("status") or {}).get("name", "")
+        if name.lower() in by_name:
+            columns[by_name[name.lower()]].append(raw)
+    return columns
+
+
+# The learned workflow graphs, loaded on first use.
+_workflow = None
+
+
+def get_workflow():
+    global _workflow
+    with _caches_lock:
+        if _workflow is None:
+            _workflow = WorkflowCache()
+        return _workflow
+
+
+def get_workflow_position(conn, issue):
+    return (
+        getattr(conn, "server_url", None),
+        get_field(issue, "project", "key"),
+        get_field(issue, "issuetype", "name"),
+        issue.fields.status.name,
+    )
+
+
+def get_transitions(conn, issue, refresh=False):
+    """{name: {"id", "to"}} for the issue's status, from the cache when we can."""
+    workflow = get_workflow()
+    position = get_workflow_position(conn, issue)
+    transitions = None if refresh else workflow.transitions(*position)
+    if transitions is None:
+        transitions = workflow.learn(*position, conn.transitions(issue))
+    return transitions
+
+
 def advance_issue(conn, issue):
     status = issue.fields.status.name
     transition_name = NEXT_ACTION.get(status)
@@ -118,14 +631,61 @@ def advance_issue(conn, issue):
         return False
 
 
+# What a transition can change, as far as cached queries are concerned.
+TRANSITION_FIELDS = ("status", "statuscategory", "resolution", "resolved")
+
+
 def transition_issue(conn, issue, transition_name):
-    transitions = conn.transitions(issue)
-    for tns in transitions:
-        if tns["name"] == transition_name:
-            reopen_id = tns["id"]
-            conn.transition_issue(issue, reopen_id)
-            return transition_name
-    return False
+    position = get_workflow_position(conn, issue)
+    cached = get_workflow().transitions(*position) is not None
+    transition = get_transitions(conn, issue).get(transition_name)
+    if transition is None and cached:
+        # Conditions and validators can offer a transition to one issue and
+        # not another in the same status, so ask the server before giving up.
+        transition = get_transitions(conn, issue, refresh=True).get(transition_name)
+    if transition is None:
+        return False
+    try:
+        conn.transition_issue(issue, transition["id"])
+    except JIRAError as e:
+        if e.status_code != 400:
+            raise
+        # The workflow changed since we learned it; relearn and try once more.
+        transition = get_transitions(conn, issue, refresh=True).get(transition_name)
+        if transition is None:
+            return False
+        conn.transition_issue(issue, transition["id"])
+    # Keep the local copy current so chained transitions use the right status.
+    issue.fields.status.name = transition["to"]
+    evict_results([issue.key], TRANSITION_FIELDS)
+    return transition_name
+
+
+def move_issue(conn, issue, target_status, max_steps=10):
+    """Transition ``issue`` until it reaches ``target_status``.
+
+    Takes the shortest path through the learned workflow graph; where the
+    graph doesn't reach the target yet, follows NEXT_ACTION, learning the
+    workflow on the way.  Returns the transitions made, or None if stuck.
+    """
+    workflow = get_workflow()
+    transitions_made = []
+    while issue.fields.status.name != target_status:
+        if len(transitions_made) == max_steps:
+            return None
+        path = workflow.path_to(*get_workflow_position(conn, issue), target_status)
+        transition_name = path[0] if path else NEXT_ACTION.get(issue.fields.status.name)
+        if not transition_name or not transition_issue(conn, issue, transition_name):
+            return None
+        transitions_made.append(transition_name)
+    return transitions_made
+
+
+EPIC_FIELD = "customfield_10910"
+FULL_FIELDS = IssueModel.API_FIELDS + (EPIC_FIELD,)
+
+# epic key -> epic tag, shared by every lookup in this process
+_epic_tags = {}
 
 
 # issue.fields.comment.comments[0].body
@@ -133,40 +693,98 @@ def get_epic_tag(epic_issue):
     return f"{epic_issue.fields.summary} ({epic_issue.key})"
 
 
+def get_epic_key(issue):
+    return getattr(issue.fields, EPIC_FIELD, None)
+
+
+def resolve_epic_tags(conn, issues):
+    """Return {epic key: epic tag} for the epics of ``issues``.
+
+    Epics not seen before in this process are fetched with ``key in (...)``
+    searches, one per page of keys, instead of one request per issue.
+    """
+    epic_keys = {get_epic_key(issue) for issue in issues}
+    epic_keys.discard(None)
+    missing = [key for key in epic_keys if key not in _epic_tags]
+    # Epics this process already fetched whole (get_issue_by_key) need no search.
+    with _issues_lock:
+        fetched = [_issues.get(_issue_cache_key(conn, key)) for key in missing]
+    for epic in filter(None, fetched):
+        _epic_tags[epic.key] = get_epic_tag(epic)
+    missing = [key for key in missing if key not in _epic_tags]
+    epics = iterate_async(
+        conn, lambda client: client.issues_by_keys(missing, fields="summary")
+    )
+    for epic in epics:
+        _epic_tags[epic.key] = get_epic_tag(epic)
+    for key in missing:
+        # remember misses too, so a dangling epic isn't searched for again
+        _epic_tags.setdefault(key, None)
+    return {key: _epic_tags[key] for key in epic_keys}
+
+
 def get_printable_issue(issue, conn):
     try:
-        epic_key = issue.fields.customfield_10910
-        epic_issue = get_issue_by_key(conn, epic_key)
-        epic_tag = get_epic_tag(epic_issue)
+        epic_tag = resolve_epic_tags(conn, [issue]).get(get_epic_key(issue))
     except:
-        epic_issue = None
         epic_tag = None
     issue_model = IssueModel.from_api(issue, epic_tag)
     return issue_model
 
 
+def get_printable_issues(issues, conn):
+    issues = iter(issues)
+    pages = iter(lambda: list(islice(issues, PAGE_SIZE)), [])
+    for page in pages:
+        try:
+            epic_tags = resolve_epic_tags(conn, page)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            epic_tags = {}
+        for issue in page:
+            yield IssueModel.from_api(issue, epic_tags.get(get_epic_key(issue)))
+
+
 def get_printable_issue_brief(issue):
     try:
         issue_model = IssueModel.from_api(issue, None)
     except Exception as e:
         print(e, file=sys.stderr)
         return None
+    return format_issue_brief(issue_model)
+
+
+def format_issue_brief(issue_model):
     updated = issue_model.updated_at.date()
     return f"{issue_model.issue_id} | {issue_model.summary} ({updated})"
 
 
+def get_issue_models(raw_issues, server_url=None):
+    """Turn raw search JSON into IssueModels, skipping the Resource layer."""
+    for raw in raw_issues:
+        try:
+            yield IssueModel.from_json(raw, server_url=server_url)
+        except Exception as e:
+            print(e, file=sys.stderr)
+
+
 def update_current_issue(issue):
     print("Updating current issue")
-    with open(os.path.expanduser("~/.jira/current_issue"), "w") as f:
-        f.write(get_printable_issue_brief(issue) + "\n")
+    write_current_issue(get_printable_issue_brief(issue))
 
 
-def edit_issue(conn, issue_key):
+def get_issue_edits(conn, issue_key):
+    """Open the issue in the editor; returns (api issue, fields to update)."""
     api_issue = get_issue_by_key(conn, issue_key)
     issue = IssueModel.from_api(api_issue, None)
     edited_issue = edit(str(issue))
-    updates = get_updates(issue, edited_issue)
+    return api_issue, get_updates(issue, edited_issue)
+
+
+def edit_issue(conn, issue_key):
+    api_issue, updates = get_issue_edits(conn, issue_key)
     api_issue.update(**updates)
+    evict_results([issue_key], updates)
 
 
 def print_issue_fields(issue):
@@ -175,21 +793,37 @@ def print_issue_fields(issue):
             print(f"{key}: {value}")
 
 
-def get_current_sprint(conn):
-    board_id = 137
-    sprints = [
-        s
-        for s in conn.sprints(board_id)
-        if s.name
-        not in (
-            "Icebox",
-            "After COVID-19",
-            "Data Eng Groomed Tickets",
-            "Data Eng External Requests",
-        )
-        and "Data" in s.name
-    ]
-    return sprints[-1]
+def get_current_sprint(conn, config=None, refresh=False):
+    """The active sprint on the configured board, or None if there is none."""
+    if config is None:
+        config = read_config()
+    if config.sprint_board is None:
+        raise LookupError("Set sprint_board in ~/.jira/config.ini")
+    cache = SprintCache(server_path(DEFAULT_SPRINTS_PATH, config.server_url))
+    if refresh:
+        cache.invalidate(config.sprint_board)
+    sprint = pick_current_sprint(
+        cache.open_sprints(conn, config.sprint_board),
+        config.sprint_name_contains,
+        config.sprint_excludes,
+    )
+    if sprint is None and not refresh:
+        # The cached sprint may have been closed early; ask the server once.
+        return get_current_sprint(conn, config, refresh=True)
+    return sprint
+
+
+def get_sprint_issues(conn, sprint, fields=BRIEF_FIELDS, json_result=False, mine=False):
+    query = f"sprint = {sprint.id}"
+    if mine:
+        query += " AND assignee=currentuser()"
+    yield from get_issues(
+        conn,
+        query + " ORDER BY created",
+        fields=fields,
+        read_ahead=True,
+        json_result=json_result,
+    )
 
 
 def create_new_issue(conn, config):
@@ -198,6 +832,11 @@ def create_new_issue(conn, config):
     if issue.summary == "pending...":
         print("Need to fill out summary.  Issue uncreated.")
         return
+    try:
+        assignee = assignee_field(config, issue.assignee)
+    except LookupError as e:
+        print(f"{e}.  Issue uncreated.")
+        return
     print(str(issue))
 
     print("Creating new issue")
@@ -206,9 +845,10 @@ def create_new_issue(conn, config):
         summary=issue.summary,
         description=issue.description,
         issuetype={"name": issue.issue_type},
-        assignee={"accountId": config.account_id},
+        assignee=assignee,
     )
     print("New issue created")
+    evict_results()
     update_current_issue(new_issue)
     try:
 
@@ -0,0 +1,143 @@
+"""
+``kujira listen``: a local receiver for Jira webhooks.
+
+Issue events are written straight into the local mirror, which is also where
+cached epic listings come from; sprint events drop the cached sprints of the
+sprint's board.  Point a Jira webhook (or a tunnel to this machine) at
+``http://HOST:PORT/`` and cached reads stay fresh without polling.
+
+When a secret is configured, requests must carry Jira's
+``X-Hub-Signature: sha256=<hmac of the body>`` header.
+"""
+import hashlib
+import hmac
+import json
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from kujira.mirror import DEFAULT_MIRROR_PATH, IssueMirror
+from kujira.sprints import DEFAULT_SPRINTS_PATH, SprintCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+ISSUE_EVENTS = ("jira:issue_created", "jira:issue_updated")
+
+
+def _apply_issue_event(event, issue, mirror):
+    key = issue["key"]
+    if event == "jira:issue_deleted":
+        mirror.delete(key)
+        return f"deleted {key}"
+    stored = mirror.issue(key)
+    updated = issue.get("fields", {}).get("updated") or ""
+    if stored and (stored["fields"].get("updated") or "") > updated:
+        # Webhooks can arrive out of order; keep the newer copy.
+        return f"stale {event} {key}"
+    mirror.upsert([issue])
+    return f"stored {key}"
+
+
+def apply_event(payload, mirror, sprints, projects=(), listening_since=None):
+    """Apply one webhook payload to the caches; returns what was done.
+
+    ``listening_since`` is when the receiver started; a project synced since
+    then has missed no events, so it is counted as synced now.
+    """
+    event = payload.get("webhookEvent", "")
+    if event in ISSUE_EVENTS or event == "jira:issue_deleted":
+        issue = payload["issue"]
+        key = issue["key"]
+        project = key.rpartition("-")[0]
+        if projects and project not in projects:
+            return f"ignored {event} {key}"
+        result = _apply_issue_event(event, issue, mirror)
+        # Events arriving keep the project current, so cached reads can skip
+        # the periodic sync for it, unless events were missed while we were down.
+        if listening_since is not None:
+            mirror.touch(project, listening_since)
+        return result
+    if event.startswith("sprint_"):
+        board_id = payload.get("sprint", {}).get("originBoardId")
+        sprints.invalidate(board_id)
+        return f"invalidated sprints for board {board_id or 'all'}"
+    return f"ignored {event or 'unknown event'}"
+
+
+def signature(secret, body):
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        secret = self.server.secret
+        if secret and not hmac.compare_digest(
+            self.headers.get("X-Hub-Signature", ""), signature(secret, body)
+        ):
+            self.send_error(401, "Bad signature")
+            return
+        try:
+            payload = json.loads(body)
+            result = apply_event(
+                payload,
+                self.server.mirror,
+                self.server.sprints,
+                self.server.projects,
+                self.server.listening_since,
+            )
+        except (ValueError, KeyError) as e:
+            self.send_error(400, f"Bad payload: {e}")
+            return
+        self.server.on_event(result)
+        self.send_response(204)
+        self.end_headers()
+
+
+class WebhookServer(HTTPServer):
+    """Handles one request at a time, so the mirror has a single writer."""
+
+    def __init__(
+        self,
+        address=(DEFAULT_HOST, DEFAULT_PORT),
+        mirror_path=DEFAULT_MIRROR_PATH,
+        sprints_path=DEFAULT_SPRINTS_PATH,
+        projects=(),
+        secret=None,
+        on_event=print,
+        verbose=False,
+    ):
+        super().__init__(address, WebhookHandler)
+        self.mirror_path = mirror_path
+        self.sprints_path = sprints_path
+        self.projects = projects
+        self.secret = secret
+        self.on_event = on_event
+        self.verbose = verbose
+        self.listening_since = None
+        self._mirror = None
+
+    @property
+    def mirror(self):
+        # Opened on first use, in the thread that serves requests; sqlite
+        # connections can't move between threads.
+        if self._mirror is None:
+            self._mirror = IssueMirror(self.mirror_path)
+        return self._mirror
+
+    @property
+    def sprints(self):
+        return SprintCache(self.sprints_path)
+
+    def serve_forever(self, poll_interval=0.5):
+        self.listening_since = time.time()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            if self._mirror is not None:
+                self._mirror.close()
+                self._mirror = None
@@ -0,0 +1,299 @@
+"""
+Local SQLite mirror of the issues in the projects we work in.
+
+Rows keep the raw JSON of each issue next to the handful of columns the read
+commands filter on, so cached reads can rebuild the same objects the API
+would have returned.  An FTS5 index over summary, description and comments,
+kept in step on every upsert, backs ``kujira grep``.
+"""
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+
+DEFAULT_MIRROR_PATH = "~/.jira/mirror.db"
+DEFAULT_MAX_AGE = 15 * 60
+SYNC_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT PRIMARY KEY,
+    project TEXT,
+    issue_type TEXT,
+    status TEXT,
+    resolution TEXT,
+    assignee TEXT,
+    created TEXT,
+    updated TEXT,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_by_assignee ON issues (assignee, status, created);
+CREATE INDEX IF NOT EXISTS issues_by_project ON issues (project, issue_type);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project TEXT PRIMARY KEY,
+    high_water TEXT,
+    synced_at REAL
+);
+"""
+
+# The index shares rowids with the issues table, so an issue's text row is
+# found without scanning the index.
+TEXT_SCHEMA = """
+CREATE VIRTUAL TABLE issue_text USING fts5(
+    summary, description, comments, tokenize = 'porter unicode61'
+);
+"""
+
+# bm25 column weights: summary, description, comments.
+TEXT_WEIGHTS = (10.0, 3.0, 1.0)
+
+
+def _name(field, attr="name"):
+    return field.get(attr) if field else None
+
+
+def issue_row(raw):
+    fields = raw.get("fields", {})
+    return (
+        raw["key"],
+        _name(fields.get("project"), "key"),
+        _name(fields.get("issuetype")),
+        _name(fields.get("status")),
+        _name(fields.get("resolution")),
+        _name(fields.get("assignee"), "accountId"),
+        fields.get("created"),
+        fields.get("updated"),
+        json.dumps(raw),
+    )
+
+
+def plain_text(value):
+    """Text of a plain or Atlassian Document Format field."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        if "text" in value:
+            return value["text"]
+        return " ".join(plain_text(node) for node in value.get("content", []))
+    if isinstance(value, list):
+        return " ".join(plain_text(node) for node in value)
+    return str(value)
+
+
+def issue_text(raw):
+    fields = raw.get("fields", {})
+    comments = (fields.get("comment") or {}).get("comments", [])
+    return (
+        plain_text(fields.get("summary")),
+        plain_text(fields.get("description")),
+        "\n".join(plain_text(comment.get("body")) for comment in comments),
+    )
+
+
+def fts_phrase(text):
+    """Quote TEXT so FTS5 matches it as a phrase rather than as query syntax."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def jql_timestamp(jira_timestamp):
+    """'2019-05-29T10:11:12.000+0000' -> '2019/05/29 10:11'
+
+    Jira renders timestamps in the user's timezone and JQL reads them in the
+    same timezone, so the wall-clock part is used as is.  JQL only has minute
+    precision; callers compare with >= and upsert, so the overlap is harmless.
+    """
+    return jira_timestamp[:16].replace("-", "/").replace("T", " ")
+
+
+class IssueMirror:
+    def __init__(self, path=DEFAULT_MIRROR_PATH):
+        path = os.path.expanduser(path)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.has_text_index = self._create_text_index()
+
+    def close(self):
+        self.db.close()
+
+    def _create_text_index(self):
+        exists = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'issue_text'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            with self.db:
+                self.db.executescript(TEXT_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; everything but grep still works.
+            return False
+        rows = self.db.execute("SELECT rowid, raw FROM issues").fetchall()
+        with self.db:
+            self._index_text((rowid, json.loads(raw)) for rowid, raw in rows)
+        return True
+
+    def _index_text(self, rows):
+        self.db.executemany(
+            "INSERT INTO issue_text (rowid, summary, description, comments) "
+            "VALUES (?, ?, ?, ?)",
+            ((rowid,) + issue_text(raw) for rowid, raw in rows),
+        )
+
+    def _unindex_text(self, where, params):
+        if self.has_text_index:
+            self.db.execute(
+                f"DELETE FROM issue_text WHERE rowid IN "
+                f"(SELECT rowid FROM issues WHERE {where})",
+                params,
+            )
+
+    def upsert(self, raw_issues):
+        raw_issues = list(raw_issues)
+        with self.db:
+            for raw in raw_issues:
+                self._unindex_text("key = ?", (raw["key"],))
+            # Updating in place keeps the rowid the text index points at.
+            cursor = self.db.executemany(
+                "INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET project = excluded.project, "
+                "issue_type = excluded.issue_type, status = excluded.status, "
+                "resolution = excluded.resolution, assignee = excluded.assignee, "
+                "created = excluded.created, updated = excluded.updated, "
+                "raw = excluded.raw",
+                (issue_row(raw) for raw in raw_issues),
+            )
+            if self.has_text_index:
+                self._index_text((self._rowid(raw["key"]), raw) for raw in raw_issues)
+        return cursor.rowcount
+
+    def _rowid(self, key):
+        return self.db.execute(
+            "SELECT rowid FROM issues WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+    def delete(self, key):
+        with self.db:
+            self._unindex_text("key = ?", (key,))
+            self.db.execute("DELETE FROM issues WHERE key = ?", (key,))
+
+    def high_water(self, project):
+        row = self.db.execute(
+            "SELECT high_water FROM sync_state WHERE project = ?", (project,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, conn, project, full=False):
+        """Pull issues updated since the last sync; returns how many were stored."""
+        from kujira.kujira import get_issues
+
+        query = f'project = "{project}"'
+        high_water = None if full else self.high_water(project)
+        if high_water:
+            query += f' AND updated >= "{jql_timestamp(high_water)}"'
+        query += " ORDER BY updated ASC"
+
+        if full:
+            with self.db:
+                # Forget the last sync too: if the reload fails partway, the
+                # half-empty project must not pass for fresh.
+                self.db.execute("DELETE FROM sync_state WHERE project = ?", (project,))
+                self._unindex_text("project = ?", (project,))
+                self.db.execute("DELETE FROM issues WHERE project = ?", (project,))
+        count = 0
+        raws = (issue.raw for issue in get_issues(conn, query, read_ahead=True))
+        for page in iter(lambda: list(islice(raws, SYNC_BATCH_SIZE)), []):
+            self.upsert(page)
+            count += len(page)
+            updated = max(raw["fields"].get("updated") or "" for raw in page)
+            if updated and (high_water is None or updated > high_water):
+                high_water = updated
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (project, high_water, time.time()),
+            )
+        return count
+
+    def touch(self, project, since):
+        """Count ``project`` as synced now if it was synced at or after ``since``.
+
+        The high water mark is kept.  A project never synced, or last synced
+        before ``since``, stays that way: webhooks alone don't fill it.
+        """
+        with self.db:
+            self.db.execute(
+                "UPDATE sync_state SET synced_at = ? "
+                "WHERE project = ? AND synced_at >= ?",
+                (time.time(), project, since),
+            )
+
+    def age(self, projects):
+        """Seconds since the least recently synced of ``projects``, None if never."""
+        ages = []
+        for project in projects:
+            row = self.db.execute(
+                "SELECT synced_at FROM sync_state WHERE project = ?", (project,)
+            ).fetchone()
+            if row is None:
+                return None
+            ages.append(time.time() - row[0])
+        return max(ages) if ages else None
+
+    def _raws(self, sql, params):
+        for (raw,) in self.db.execute(sql, params):
+            yield json.loads(raw)
+
+    def issue(self, key):
+        return next(self._raws("SELECT raw FROM issues WHERE key = ?", (key,)), None)
+
+    def open_issues(self, account_id):
+        yield from self._raws(
+            "SELECT raw FROM issues WHERE assignee = ? AND resolution IS NULL "
+            "ORDER BY created",
+            (account_id,),
+        )
+
+    def issues_for_status(self, account_id, *statuses):
+        yield from self._raws(
+            "SELECT raw FROM issues WHERE assignee = ? "
+            # Jira matches status names in any case.
+            f"AND status COLLATE NOCASE IN ({', '.join('?' for _ in statuses)}) "
+            "ORDER BY created",
+            (account_id,) + statuses,
+        )
+
+    def epics(self, project):
+        yield from self._raws(
+            "SELECT raw FROM issues WHERE project = ? AND issue_type = 'Epic' "
+            "ORDER BY key",
+            (project,),
+        )
+
+    def search(self, text, project=None, limit=20, raw_query=False):
+        """Issues matching TEXT, best match first, with a highlighted snippet.
+
+        TEXT is matched as a phrase unless ``raw_query`` is set, in which case
+        it is passed to FTS5 as is (AND, OR, NEAR, prefix*).
+        """
+        if not self.has_text_index:
+            raise RuntimeError("This SQLite has no FTS5; grep is unavailable")
+        sql = (
+            "SELECT issues.raw, snippet(issue_text, -1, '[', ']', '...', 12) "
+            "FROM issue_text JOIN issues ON issues.rowid = issue_text.rowid "
+            "WHERE issue_text MATCH ?"
+        )
+        params = [text if raw_query else fts_phrase(text)]
+        if project:
+            sql += " AND issues.project = ?"
+            params.append(project)
+        sql += (
+            f" ORDER BY bm25(issue_text, {', '.join(map(str, TEXT_WEIGHTS))}) LIMIT ?"
+        )
+        params.append(limit)
+        for raw, snippet in self.db.execute(sql, params):
+            yield json.loads(raw), snippet
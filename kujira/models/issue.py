@@ -1,23 +1,52 @@
 import re
+from datetime import datetime, timedelta, timezone
 
 import dateutil.parser
 import yaml
 
 
 class IssueModel:
+    __slots__ = (
+        "project",
+        "issue_type",
+        "assignee",
+        "reporter",
+        "summary",
+        "description",
+        "priority",
+        "updated_at",
+        "issue_id",
+        "epic",
+        "server_url",
+        "_url",
+    )
+
+    # Fields from_api reads; search for fewer and the rest are left as None.
+    API_FIELDS = (
+        "project",
+        "issuetype",
+        "assignee",
+        "reporter",
+        "summary",
+        "description",
+        "priority",
+        "updated",
+    )
+
     def __init__(
         self,
-        project,
-        issue_type,
-        assignee,
-        reporter,
-        summary,
-        description,
-        priority,
-        updated_at,
+        project=None,
+        issue_type=None,
+        assignee=None,
+        reporter=None,
+        summary=None,
+        description=None,
+        priority=None,
+        updated_at=None,
         epic=None,
         issue_id=None,
         url=None,
+        server_url=None,
     ):
         self.project = project
         self.issue_type = issue_type
@@ -29,24 +58,57 @@ class IssueModel:
         self.updated_at = updated_at
         self.issue_id = issue_id
         self.epic = epic if epic else "None"
-        self.url = url
+        self.server_url = server_url
+        self._url = url
+
+    @property
+    def url(self):
+        # Built on first use, so bulk listings don't format a URL per issue.
+        if self._url is None and self.server_url and self.issue_id:
+            self._url = f"{self.server_url}/browse/{self.issue_id}"
+        return self._url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
 
     @classmethod
     def from_api(cls, api_issue, epic_tag):
+        """Build a model from an API issue, which may carry only some fields."""
+        updated = get_field(api_issue, "updated")
         return cls(
             issue_id=api_issue.key,
-            project=api_issue.fields.project.id,
-            assignee=api_issue.fields.assignee.accountId,
-            reporter=api_issue.fields.reporter.accountId,
-            summary=api_issue.fields.summary.replace(":", " "),
-            description=api_issue.fields.description.replace(":", " "),
-            priority=api_issue.fields.priority.name,
-            issue_type=api_issue.fields.issuetype.name,
+            project=get_field(api_issue, "project", "id"),
+            assignee=get_field(api_issue, "assignee", "accountId"),
+            reporter=get_field(api_issue, "reporter", "accountId"),
+            summary=strip_colons(get_field(api_issue, "summary")),
+            description=strip_colons(get_field(api_issue, "description")),
+            priority=get_field(api_issue, "priority", "name"),
+            issue_type=get_field(api_issue, "issuetype", "name"),
             epic=epic_tag,
-            updated_at=dateutil.parser.parse(api_issue.fields.updated),
+            updated_at=parse_timestamp(updated) if updated else None,
             url=api_issue.permalink(),
         )
 
+    @classmethod
+    def from_json(cls, raw, epic_tag=None, server_url=None):
+        """Build a model straight from an issue in a search's JSON response."""
+        fields = raw.get("fields", {})
+        updated = fields.get("updated")
+        return cls(
+            issue_id=raw["key"],
+            project=get_json_field(fields, "project", "id"),
+            assignee=get_json_field(fields, "assignee", "accountId"),
+            reporter=get_json_field(fields, "reporter", "accountId"),
+            summary=strip_colons(fields.get("summary")),
+            description=strip_colons(fields.get("description")),
+            priority=get_json_field(fields, "priority", "name"),
+            issue_type=get_json_field(fields, "issuetype", "name"),
+            epic=epic_tag,
+            updated_at=parse_timestamp(updated) if updated else None,
+            server_url=server_url,
+        )
+
     @classmethod
     def from_file(cls, path_to_issue):
         with open(path_to_issue, "r") as f:
@@ -88,7 +150,7 @@ class IssueModel:
         )
 
     def __str__(self):
-        description = "\n  ".join(self.description.split("\n"))
+        description = "\n  ".join((self.description or "").split("\n"))
         return f"""\
 project: {self.project}
 issue_id: { self.issue_id }
@@ -115,6 +177,56 @@ description: |
 IssueModel(project='{self.project}', issue_type='{self.issue_type}', assignee='{self.assignee}', reporter='{self.reporter}', summary='{self.summary}', priority='{self.priority}', issue_id='{self.issue_id}', epic='{self.epic}')"""
 
 
+def get_field(api_issue, *path):
+    value = api_issue.fields
+    for attr in path:
+        value = getattr(value, attr, None)
+        if value is None:
+            return None
+    return value
+
+
+def get_json_field(fields, name, attr):
+    value = fields.get(name)
+    return value.get(attr) if value else None
+
+
+_utc_offsets = {}
+
+
+def parse_timestamp(value):
+    """Parse Jira's '2019-05-29T10:11:12.000+0000' without dateutil.
+
+    Anything not in exactly that shape goes through dateutil.
+    """
+    if len(value) == 28 and value[10] == "T" and value[19] == ".":
+        try:
+            offset = value[23:]
+            tzinfo = _utc_offsets.get(offset)
+            if tzinfo is None:
+                minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+                sign = -1 if offset[0] == "-" else 1
+                tzinfo = timezone(timedelta(minutes=sign * minutes))
+                _utc_offsets[offset] = tzinfo
+            return datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+                int(value[20:23]) * 1000,
+                tzinfo,
+            )
+        except ValueError:
+            pass
+    return dateutil.parser.parse(value)
+
+
+def strip_colons(text):
+    return text.replace(":", " ") if text is not None else None
+
+
 def process_string(item):
     return item.strip("\n").strip()
 
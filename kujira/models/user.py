@@ -2,21 +2,37 @@ import re
 
 
 class UserModel:
-    def __init__(self, name, key, email, display_name):
+    def __init__(self, name, key, email, display_name, account_id=None):
         self.name = name
         self.key = key
         self.email = email
         self.display_name = display_name
+        self.account_id = account_id
 
     @classmethod
     def from_API(cls, api_user):
+        # Cloud hides name/key and sometimes email, Server has no accountId.
         return cls(
-            email=api_user.emailAddress,
-            name=api_user.name,
-            key=api_user.key,
+            email=getattr(api_user, "emailAddress", None),
+            name=getattr(api_user, "name", None),
+            key=getattr(api_user, "key", None),
             display_name=api_user.displayName,
+            account_id=getattr(api_user, "accountId", None),
         )
 
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "key": self.key,
+            "email": self.email,
+            "display_name": self.display_name,
+            "account_id": self.account_id,
+        }
+
     @classmethod
     def from_string(cls, str_user):
         key, name, display_name, email = re.findall(r"\[(.+?)\]", str_user)
@@ -28,6 +44,7 @@ class UserModel:
             and self.email == other.email
             and self.display_name == other.display_name
             and self.key == other.key
+            and self.account_id == other.account_id
         )
 
     def __str__(self):
@@ -0,0 +1,371 @@
+"""
+Write-behind queue for mutations.
+
+With ``write_behind = yes`` (or ``--queue``) ``advance``, ``edit``,
+``add-epic-to-issue`` and ``rm`` record the change in a local SQLite queue and
+return; a detached ``python -m kujira.outbox`` process, or ``kujira queue
+flush``, applies it later.  Operations on different issues are applied
+concurrently and those on one issue in order.  Each operation looks at the
+issue first, so one that already took effect (a retry after a lost response,
+an issue someone else deleted) isn't applied twice.  Pending edits to one
+issue are collapsed into a single update.
+"""
+import fcntl
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from kujira.aio import DEFAULT_CONCURRENCY
+
+DEFAULT_OUTBOX_PATH = "~/.jira/outbox.db"
+OPERATIONS = ("advance", "edit", "epic", "rm")
+# Pauses between tries of one operation within a flush.
+RETRY_DELAYS = (1, 4)
+# Flushes an operation may fail in before it is marked failed.
+MAX_ATTEMPTS = 5
+TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile TEXT,
+    issue_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS operations_by_state ON operations (state, id);
+"""
+
+Operation = namedtuple(
+    "Operation",
+    "id profile issue_key kind payload state attempts last_error created_at",
+)
+SELECT_OPERATIONS = f"SELECT {', '.join(Operation._fields)} FROM operations"
+
+
+def _operation(row):
+    return Operation(*row[:4], json.loads(row[4]), *row[5:])
+
+
+class OperationFailed(Exception):
+    """An operation that retrying won't fix, e.g. a missing epic."""
+
+
+class Outbox:
+    def __init__(self, path=DEFAULT_OUTBOX_PATH):
+        path = os.path.expanduser(path)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def enqueue(self, profile, issue_key, kind, payload=None):
+        """Record an operation; returns its id.
+
+        An edit merges into the issue's pending edit if there is one, and
+        ``rm`` drops whatever else is pending for the issue.
+        """
+        if kind not in OPERATIONS:
+            raise ValueError(f"Unknown operation {kind!r}")
+        payload = payload or {}
+        now = time.time()
+        with self.db:
+            if kind == "edit":
+                pending = self._pending_edit(profile, issue_key)
+                if pending is not None:
+                    fields = dict(pending.payload["fields"], **payload["fields"])
+                    self._set_payload(pending.id, {"fields": fields}, now)
+                    return pending.id
+            if kind == "rm":
+                self.db.execute(
+                    "DELETE FROM operations WHERE state = 'pending' "
+                    "AND profile IS ? AND issue_key = ?",
+                    (profile, issue_key),
+                )
+            cursor = self.db.execute(
+                "INSERT INTO operations "
+                "(profile, issue_key, kind, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (profile, issue_key, kind, json.dumps(payload), now, now),
+            )
+        return cursor.lastrowid
+
+    def _pending_edit(self, profile, issue_key):
+        """The issue's last pending operation, if it is an edit."""
+        rows = self.db.execute(
+            SELECT_OPERATIONS + " WHERE state = 'pending' "
+            "AND profile IS ? AND issue_key = ? ORDER BY id DESC LIMIT 1",
+            (profile, issue_key),
+        )
+        last = next(map(_operation, rows), None)
+        return last if last is not None and last.kind == "edit" else None
+
+    def _set_payload(self, operation_id, payload, now=None):
+        self.db.execute(
+            "UPDATE operations SET payload = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(payload), now or time.time(), operation_id),
+        )
+
+    def operations(self, states=("pending", "failed")):
+        rows = self.db.execute(
+            SELECT_OPERATIONS
+            + f" WHERE state IN ({', '.join('?' for _ in states)}) ORDER BY id",
+            tuple(states),
+        )
+        return [_operation(row) for row in rows]
+
+    def pending_by_issue(self):
+        """{(profile, issue key): [pending operations, oldest first]}"""
+        issues = {}
+        for operation in self.operations(("pending",)):
+            issues.setdefault((operation.profile, operation.issue_key), []).append(
+                operation
+            )
+        return issues
+
+    def remember(self, operation_id, payload):
+        """Save what an operation learned before applying it, for its retries."""
+        with self.db:
+            self._set_payload(operation_id, payload)
+
+    def done(self, operation_id):
+        with self.db:
+            self.db.execute("DELETE FROM operations WHERE id = ?", (operation_id,))
+
+    def attempt_failed(self, operation_id, error, permanent=False):
+        """Count a failed flush; past MAX_ATTEMPTS (or if permanent) it's failed."""
+        with self.db:
+            self.db.execute(
+                "UPDATE operations SET attempts = attempts + 1, last_error = ?, "
+                "updated_at = ?, state = CASE WHEN ? OR attempts + 1 >= ? "
+                "THEN 'failed' ELSE 'pending' END WHERE id = ?",
+                (str(error), time.time(), permanent, MAX_ATTEMPTS, operation_id),
+            )
+
+    def retry_failed(self):
+        """Put failed operations back in the queue; returns how many."""
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE operations SET state = 'pending', attempts = 0 "
+                "WHERE state = 'failed'"
+            )
+        return cursor.rowcount
+
+
+def describe(operation):
+    """'#3 pending edit DS-1 description [partner] (2 attempts): 502 ...'"""
+    details = {
+        "edit": ", ".join(operation.payload.get("fields", ())),
+        "epic": operation.payload.get("epic_key"),
+    }
+    text = f"#{operation.id} {operation.state} {operation.kind} {operation.issue_key}"
+    if details.get(operation.kind):
+        text += f" {details[operation.kind]}"
+    if operation.profile:
+        text += f" [{operation.profile}]"
+    if operation.attempts:
+        plural = "s" if operation.attempts > 1 else ""
+        text += f" ({operation.attempts} attempt{plural}): {operation.last_error}"
+    return text
+
+
+def is_transient(error):
+    from jira import JIRAError
+    from requests.exceptions import RequestException
+
+    if isinstance(error, JIRAError):
+        return error.status_code is None or error.status_code in TRANSIENT_STATUSES
+    return isinstance(error, RequestException)
+
+
+def fetch_issue(conn, issue_key, refresh=True):
+    """The issue, or None if it doesn't exist (any more).
+
+    Refreshed by default: the idempotency checks need the issue as it is now,
+    not as an earlier try saw it.
+    """
+    from jira import JIRAError
+
+    from kujira.kujira import get_issue_by_key
+
+    try:
+        return get_issue_by_key(conn, issue_key, refresh=refresh)
+    except JIRAError as e:
+        if e.status_code == 404:
+            return None
+        raise
+
+
+def apply_operation(conn, outbox, operation):
+    """Apply one operation unless it already took effect; returns what happened."""
+    from kujira.kujira import EPIC_FIELD, advance_issue, evict_results
+
+    key = operation.issue_key
+    issue = fetch_issue(conn, key)
+    if issue is None:
+        if operation.kind == "rm":
+            return f"{key} is already deleted"
+        raise OperationFailed(f"{key} does not exist")
+
+    if operation.kind == "advance":
+        status = issue.fields.status.name
+        start = operation.payload.get("from")
+        if start is None:
+            # Remember where we started: if this try's response is lost, the
+            # retry (in this flush or a later one) finds the issue moved on and
+            # knows not to advance it again.
+            operation.payload["from"] = status
+            outbox.remember(operation.id, operation.payload)
+        elif status != start:
+            return f"{key} already moved from {start} to {status}"
+        result = advance_issue(conn, issue)
+        if not result:
+            raise OperationFailed(f"No transition for {key} from {status}")
+        return f"{key} transitioned from {status} to {result}"
+
+    if operation.kind == "edit":
+        fields = operation.payload["fields"]
+        # Setting fields is idempotent, so a retry just sets them again.
+        issue.update(fields=fields)
+        evict_results([key], fields)
+        return f"{key} updated {', '.join(fields)}"
+
+    if operation.kind == "epic":
+        epic_key = operation.payload["epic_key"]
+        # Only the epic's id is needed, so epics are shared between operations.
+        epic = fetch_issue(conn, epic_key, refresh=False)
+        if epic is None:
+            raise OperationFailed(f"Could not find an epic with the key {epic_key}")
+        parent = getattr(issue.fields, "parent", None)
+        if getattr(parent, "id", None) == epic.id:
+            return f"{key} is already in {epic_key}"
+        issue.update(fields={"parent": {"id": epic.id}})
+        evict_results([key], ("parent", "epic link", EPIC_FIELD))
+        return f"Added epic {epic_key} to {key}"
+
+    issue.delete()
+    evict_results([key], ())
+    return f"{key} deleted"
+
+
+def _flush_issue(path, config, operations, sleep):
+    """Apply one issue's operations in order; returns [(operation, error or result)].
+
+    Stops at an operation that keeps failing transiently, so later ones
+    aren't applied out of order.
+    """
+    from kujira.kujira import get_conn
+
+    outbox = Outbox(path)
+    outcomes = []
+    conn = None
+    try:
+        for operation in operations:
+            for delay in RETRY_DELAYS + (None,):
+                try:
+                    # Connecting asks for serverInfo, so it can fail like the rest.
+                    conn = conn or get_conn(config)
+                    outcome = apply_operation(conn, outbox, operation)
+                except Exception as e:
+                    if is_transient(e) and delay is not None:
+                        sleep(delay)
+                        continue
+                    outbox.attempt_failed(operation.id, e, not is_transient(e))
+                    outcomes.append((operation, e))
+                    if is_transient(e):
+                        return outcomes
+                else:
+                    outbox.done(operation.id)
+                    outcomes.append((operation, outcome))
+                break
+    finally:
+        outbox.close()
+    return outcomes
+
+
+def _flush_pass(path, configs, blocked, concurrency, sleep):
+    """Flush every issue with pending operations, except ``blocked`` ones."""
+    outbox = Outbox(path)
+    try:
+        issues = outbox.pending_by_issue()
+        for issue, operations in list(issues.items()):
+            if issue in blocked:
+                del issues[issue]
+            elif issue[0] not in configs:
+                for operation in operations:
+                    error = f"No [Jira:{issue[0]}] section in the kujira config"
+                    outbox.attempt_failed(operation.id, error, permanent=True)
+                del issues[issue]
+    finally:
+        outbox.close()
+    with ThreadPoolExecutor(concurrency) as pool:
+        return pool.map(
+            lambda item: _flush_issue(path, configs[item[0][0]], item[1], sleep),
+            issues.items(),
+        )
+
+
+def flush(path=DEFAULT_OUTBOX_PATH, concurrency=DEFAULT_CONCURRENCY, sleep=time.sleep):
+    """Apply every pending operation; returns [(operation, error or result)].
+
+    Only one process flushes at a time; others return [] straight away.
+    Operations queued while a flush runs are applied before it returns.
+    """
+    from kujira.kujira import read_all_configs
+
+    path = os.path.expanduser(path)
+    configs = {config.profile: config for config in read_all_configs()}
+    outcomes = []
+    # Issues with an operation still failing; the next flush retries them.
+    blocked = set()
+    while True:
+        with open(path + ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return outcomes
+            for issue_outcomes in _flush_pass(
+                path, configs, blocked, concurrency, sleep
+            ):
+                outcomes.extend(issue_outcomes)
+                operation, outcome = issue_outcomes[-1]
+                if isinstance(outcome, Exception) and is_transient(outcome):
+                    blocked.add((operation.profile, operation.issue_key))
+        # Checked after unlocking: a flusher started for an operation queued
+        # while we held the lock gave up, so it's ours to apply.
+        outbox = Outbox(path)
+        try:
+            waiting = set(outbox.pending_by_issue()) - blocked
+        finally:
+            outbox.close()
+        if not waiting:
+            return outcomes
+
+
+def flush_in_background(path=DEFAULT_OUTBOX_PATH):
+    """Start a detached process that flushes the queue."""
+    subprocess.Popen(
+        [sys.executable, "-m", "kujira.outbox", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+if __name__ == "__main__":
+    flush(sys.argv[1])
@@ -0,0 +1,7 @@
+"""
+Ways get_issues can walk a search; see its docstring.
+
+Kept apart from kujira.aio so the CLI can offer them without importing asyncio.
+"""
+
+PAGING_MODES = ("offset", "token", "keyset")
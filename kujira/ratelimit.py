@@ -0,0 +1,197 @@
+"""
+Client-side rate limiting for every request to a Jira server.
+
+One RateLimiter per server is shared by everything that talks to it.  Requests
+take a token from a bucket that refills at the current rate.  The rate grows
+additively while responses come back clean and halves when the server says
+we are close to or over its limit (AIMD), so bulk jobs settle near the
+highest rate the server tolerates.  A 429 (or 503) pauses the whole bucket
+for the Retry-After delay, or a jittered exponential backoff when there is
+none, and the request is sent again.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RATE = 10.0
+DEFAULT_MAX_RATE = 50.0
+MIN_RATE = 0.5
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+RETRY_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - max(self.updated, self.paused_until))
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = max(now, self.updated)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every request back for ``seconds``, then restart from empty."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0.0
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def parse_reset(value, now=None):
+    """Seconds until an X-RateLimit-Reset timestamp (ISO 8601)."""
+    if not value:
+        return None
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate=DEFAULT_RATE,
+        max_rate=DEFAULT_MAX_RATE,
+        min_rate=MIN_RATE,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        jitter=random.random,
+    ):
+        self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.jitter = jitter
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self):
+        self.bucket.acquire()
+
+    def speed_up(self):
+        # Additive increase: about one more request per second for every
+        # second's worth of clean responses.
+        with self._lock:
+            rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+            self.bucket.set_rate(rate)
+
+    def slow_down(self):
+        with self._lock:
+            self.bucket.set_rate(max(self.min_rate, self.rate / 2))
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the ``attempt``-th retry."""
+        return self.jitter() * min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt)
+
+    def observe(self, status, headers, attempt=0):
+        """Adjust the rate for a response; returns a delay if it should be retried."""
+        if status in RETRY_STATUSES:
+            self.slow_down()
+            delay = parse_retry_after(headers.get("Retry-After"))
+            if delay is None:
+                delay = self.backoff(attempt)
+            else:
+                # Spread out the clients that were all told the same delay.
+                delay += self.jitter() * min(1.0, delay / 10 + 0.1)
+            self.bucket.pause(delay)
+            return delay
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        remaining = int(remaining) if remaining and remaining.isdigit() else None
+        near_limit = headers.get("X-RateLimit-NearLimit", "").lower() == "true"
+        if remaining == 0:
+            self.slow_down()
+            reset = parse_reset(headers.get("X-RateLimit-Reset"))
+            if reset:
+                self.bucket.pause(reset)
+        elif near_limit:
+            self.slow_down()
+        else:
+            self.speed_up()
+        return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """An HTTPAdapter that sends through a RateLimiter and retries 429s itself."""
+
+    def __init__(self, limiter, retries=DEFAULT_RETRIES, **kwargs):
+        self.limiter = limiter
+        self.retries = retries
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            response = super().send(request, **kwargs)
+            delay = self.limiter.observe(
+                response.status_code, response.headers, attempt
+            )
+            if delay is None or attempt == self.retries:
+                return response
+            response.close()
+            attempt += 1
+
+
+def install(session, server_url, limiter, pool_size=10):
+    """Route every request ``session`` makes to ``server_url`` through ``limiter``."""
+    adapter = RateLimitedAdapter(
+        limiter, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount(server_url, adapter)
+    return adapter
@@ -0,0 +1,229 @@
+"""
+Persistent cache of search results for the list commands.
+
+Entries are keyed by the server and user (see server_key), the normalized JQL
+and the fields asked for.  A command prints a cached result straight away; once
+it is older than the command's TTL a detached ``python -m kujira.results``
+process refreshes it for next time.  Mutations kujira makes evict the entries
+they could affect: those listing the issue, and those whose JQL mentions a
+field the mutation changed.
+"""
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_RESULTS_PATH = "~/.jira/results.db"
+DEFAULT_RESULT_TTL = 60
+# Past this age an entry is refetched before printing rather than after.
+DEFAULT_MAX_STALE = 24 * 60 * 60
+# How long one background refresh may take before another one is started.
+REFRESH_TIMEOUT = 2 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    server TEXT,
+    jql TEXT,
+    fields TEXT,
+    fetched_at REAL,
+    refreshing_at REAL,
+    raws TEXT NOT NULL,
+    PRIMARY KEY (server, jql, fields)
+);
+CREATE TABLE IF NOT EXISTS result_issues (
+    server TEXT,
+    jql TEXT,
+    fields TEXT,
+    key TEXT
+);
+CREATE INDEX IF NOT EXISTS result_issues_by_key ON result_issues (key);
+"""
+
+JQL_TOKEN = re.compile(
+    r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[!<>]=|[=~<>(),]|[^\s=~<>!(),]+'
+)
+CUSTOM_FIELD = re.compile(r"customfield_(\d+)")
+
+CachedResult = namedtuple("CachedResult", "raws fetched_at")
+
+
+def server_key(config):
+    """Who ran a search: the same JQL (currentuser()) differs between users."""
+    return f"{config.user}@{config.server_url}"
+
+
+def normalize_jql(jql):
+    """'assignee=currentUser() AND status="In Review"'
+    -> 'assignee = currentuser ( ) and status = "In Review"'
+    """
+    return " ".join(
+        token if token[0] in "\"'" else token.lower()
+        for token in JQL_TOKEN.findall(jql)
+    )
+
+
+def fields_key(fields):
+    return ",".join(sorted(fields or ("*all",)))
+
+
+def jql_names(jql):
+    """The lowercased words of ``jql``, unquoted: field names, values and all."""
+    return {token.strip("\"'").lower() for token in JQL_TOKEN.findall(jql)}
+
+
+def field_names(fields):
+    """``fields`` lowercased, with the cf[N] spelling of each custom field."""
+    names = set()
+    for field in fields:
+        names.add(field.lower())
+        custom = CUSTOM_FIELD.fullmatch(field.lower())
+        if custom:
+            names.add(f"cf[{custom.group(1)}]")
+    return names
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        path = os.path.expanduser(path)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        # Mutations evict from worker threads too (see kujira.outbox).
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, server, jql, fields):
+        row = self.db.execute(
+            "SELECT raws, fetched_at FROM results "
+            "WHERE server = ? AND jql = ? AND fields = ?",
+            (server, normalize_jql(jql), fields_key(fields)),
+        ).fetchone()
+        return CachedResult(json.loads(row[0]), row[1]) if row else None
+
+    def store(self, server, jql, fields, raws, fetched_at=None, claimed_at=None):
+        """Cache ``raws``; returns False if the entry wasn't stored.
+
+        A refresh passes the ``claimed_at`` that claim_refresh gave it, and its
+        result is dropped if the entry was evicted (or replaced) since then:
+        it may have been fetched before a mutation.
+        """
+        entry = (server, normalize_jql(jql), fields_key(fields))
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock, self.db:
+            if claimed_at is not None:
+                row = self.db.execute(
+                    "SELECT refreshing_at FROM results "
+                    "WHERE server = ? AND jql = ? AND fields = ?",
+                    entry,
+                ).fetchone()
+                if row is None or row[0] != claimed_at:
+                    return False
+            self._delete(*entry)
+            self.db.execute(
+                "INSERT INTO results VALUES (?, ?, ?, ?, NULL, ?)",
+                entry + (fetched_at, json.dumps(raws)),
+            )
+            self.db.executemany(
+                "INSERT INTO result_issues VALUES (?, ?, ?, ?)",
+                (entry + (raw["key"],) for raw in raws),
+            )
+        return True
+
+    def _delete(self, server, jql, fields):
+        for table in ("results", "result_issues"):
+            self.db.execute(
+                f"DELETE FROM {table} WHERE server = ? AND jql = ? AND fields = ?",
+                (server, jql, fields),
+            )
+
+    def claim_refresh(self, server, jql, fields, now=None):
+        """For the one caller that should refresh the entry now, the claim time.
+
+        Pass it to ``store`` with the refreshed result; other callers get None.
+        """
+        now = time.time() if now is None else now
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE results SET refreshing_at = ? "
+                "WHERE server = ? AND jql = ? AND fields = ? "
+                "AND (refreshing_at IS NULL OR refreshing_at < ?)",
+                (
+                    now,
+                    server,
+                    normalize_jql(jql),
+                    fields_key(fields),
+                    now - REFRESH_TIMEOUT,
+                ),
+            )
+        return now if cursor.rowcount == 1 else None
+
+    def evict(self, issue_keys=(), changed_fields=None):
+        """Drop entries listing any of ``issue_keys`` or filtering on a changed field.
+
+        ``changed_fields=None`` means anything may have changed (a new issue),
+        which drops every entry.
+        """
+        with self._lock:
+            entries = set()
+            for key in issue_keys:
+                entries.update(
+                    self.db.execute(
+                        "SELECT server, jql, fields FROM result_issues WHERE key = ?",
+                        (key,),
+                    )
+                )
+            changed = None
+            if changed_fields is not None:
+                changed = field_names(changed_fields) | {"updated"}
+            for entry in self.db.execute("SELECT server, jql, fields FROM results"):
+                if changed is None or changed & jql_names(entry[1]):
+                    entries.add(entry)
+            with self.db:
+                for entry in entries:
+                    self._delete(*entry)
+        return len(entries)
+
+
+def refresh_in_background(
+    jql, fields, path=DEFAULT_RESULTS_PATH, profile=None, claimed_at=None
+):
+    """Start a detached process that refetches ``jql`` into the cache."""
+    claim = "" if claimed_at is None else repr(claimed_at)
+    subprocess.Popen(
+        [sys.executable, "-m", "kujira.results", path, profile or "", claim, jql]
+        + list(fields),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def refresh(path, jql, fields, profile=None, claimed_at=None):
+    from kujira.kujira import get_conn, get_issues, read_config
+
+    config = read_config(profile=profile)
+    conn = get_conn(config)
+    raws = list(
+        get_issues(conn, jql, fields or None, read_ahead=True, json_result=True)
+    )
+    cache = ResultCache(path)
+    try:
+        cache.store(server_key(config), jql, fields, raws, claimed_at=claimed_at)
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    path, profile, claimed_at, jql, *fields = sys.argv[1:]
+    claimed_at = float(claimed_at) if claimed_at else None
+    refresh(path, jql, tuple(fields), profile or None, claimed_at)
@@ -0,0 +1,291 @@
+"""
+Sharded scans of very large JQL queries.
+
+The query is split into created-date (or, within one project, key-number)
+ranges, each small enough to page through cheaply.  Range sizes come from
+``maxResults=0`` count probes: a range holding more than ``shard_size``
+issues is cut into smaller ranges and probed again.  Shards are then fetched
+concurrently with keyset paging and merged into one stream ordered by key.
+
+With a checkpoint file the shard plan and the shards already read are kept on
+disk, so a scan that died half way can be run again and skip what it finished.
+A deferred checkpoint only counts a shard as finished once its issues are
+written out, and remembers how far the output got, so an export can resume
+by appending to its file.
+"""
+import asyncio
+import json
+import math
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from kujira.aio import ORDER_BY, issue_key, issue_project, merge_sorted
+
+DEFAULT_SHARD_SIZE = 5000
+SHARD_BY = ("created", "key")
+EPOCH = datetime(1970, 1, 1)
+
+Shard = namedtuple("Shard", "jql count")
+
+
+def key_order(key):
+    project, _, number = key.rpartition("-")
+    return (project, int(number))
+
+
+def exact_counts(conn):
+    """Whether count_issues is exact; Cloud only gives approximate counts."""
+    return getattr(conn, "_is_cloud", False) is not True
+
+
+def count_issues(conn, jql):
+    """How many issues match ``jql``, without fetching any of them."""
+    if not exact_counts(conn):
+        return conn.approximate_issue_count(jql)
+    params = {"jql": jql, "maxResults": 0, "fields": "key", "validateQuery": False}
+    return conn._get_json("search", params=params)["total"]
+
+
+def _where(query):
+    return ORDER_BY.sub("", query).strip()
+
+
+def _and(where, clause):
+    return f"({where}) AND {clause}" if where else clause
+
+
+def _minutes(jira_timestamp):
+    # The wall-clock part, as JQL reads dates in the user's timezone too.
+    moment = datetime.strptime(jira_timestamp[:16], "%Y-%m-%dT%H:%M")
+    return int((moment - EPOCH).total_seconds() // 60)
+
+
+def _jql_minute(minutes):
+    return (EPOCH + timedelta(minutes=minutes)).strftime("%Y/%m/%d %H:%M")
+
+
+class ShardPlanner:
+    """Splits a query into ranges of an integer axis: minutes or key numbers."""
+
+    def __init__(self, client, query, by="created", shard_size=DEFAULT_SHARD_SIZE):
+        if by not in SHARD_BY:
+            raise ValueError(f"Can't shard by {by!r}")
+        self.client = client
+        self.where = _where(query)
+        self.by = by
+        self.shard_size = shard_size
+        self.project = None
+
+    def clause(self, low, high):
+        if self.by == "created":
+            return (
+                f'created >= "{_jql_minute(low)}" AND created < "{_jql_minute(high)}"'
+            )
+        return (
+            f'project = "{self.project}" AND key >= "{self.project}-{low}" '
+            f'AND key < "{self.project}-{high}"'
+        )
+
+    async def _first(self, order):
+        jql = f"{self.where} ORDER BY {order}" if self.where else f"ORDER BY {order}"
+        result = await self.client.call(
+            self.client.conn.search_issues,
+            jql,
+            maxResults=1,
+            fields="created",
+            json_result=True,
+        )
+        return result["issues"][0] if result["issues"] else None
+
+    async def bounds(self):
+        """[low, high) covering every matching issue, or None if there are none."""
+        if self.by == "created":
+            first, last = await asyncio.gather(
+                self._first("created ASC"), self._first("created DESC")
+            )
+            if first is None:
+                return None
+            low = _minutes(first["fields"]["created"])
+            return low, _minutes(last["fields"]["created"]) + 1
+        first, last = await asyncio.gather(
+            self._first("key ASC"), self._first("key DESC")
+        )
+        if first is None:
+            return None
+        self.project = issue_project(first["key"])
+        if issue_project(last["key"]) != self.project:
+            raise ValueError("Sharding by key needs a query within one project")
+        return key_order(first["key"])[1], key_order(last["key"])[1] + 1
+
+    async def count(self, low, high):
+        jql = _and(self.where, self.clause(low, high))
+        return await self.client.call(count_issues, self.client.conn, jql)
+
+    async def plan(self):
+        bounds = await self.bounds()
+        if bounds is None:
+            return []
+        # An approximate count of 0 may be wrong; reading the range costs one
+        # request, missing its issues would lose them silently.
+        skip_empty = exact_counts(self.client.conn)
+        ranges, shards = [bounds], []
+        while ranges:
+            counts = await asyncio.gather(*(self.count(*r) for r in ranges))
+            split = []
+            for (low, high), count in zip(ranges, counts):
+                if count == 0 and skip_empty:
+                    continue
+                if count <= self.shard_size or high - low <= 1:
+                    shards.append((low, high, count))
+                    continue
+                # Assume issues spread evenly; uneven parts get split again.
+                parts = min(high - low, math.ceil(count / self.shard_size))
+                edges = [low + (high - low) * i // parts for i in range(parts + 1)]
+                split.extend(zip(edges, edges[1:]))
+            ranges = split
+        return [
+            Shard(_and(self.where, self.clause(low, high)), count)
+            for low, high, count in sorted(shards)
+        ]
+
+
+class ScanCheckpoint:
+    """The shard plan of one query and the shards already read, kept on disk.
+
+    A ``deferred`` checkpoint holds shards read to the end until ``commit``
+    says their issues reached the output; ``output`` is then the last key
+    written and the output's size in bytes at that point.
+    """
+
+    def __init__(self, path, query, deferred=False):
+        self.path = os.path.expanduser(path)
+        self.query = query
+        self.deferred = deferred
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        if state.get("query") != query:
+            state = {"query": query, "shards": None, "finished": []}
+        self.shards = state["shards"] and [Shard(*shard) for shard in state["shards"]]
+        self.finished = set(state["finished"])
+        self.output = state.get("output")
+        self.read = set()
+        self.last_key = None
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "query": self.query,
+                    "shards": self.shards,
+                    "finished": sorted(self.finished),
+                    "output": self.output,
+                },
+                f,
+                indent=2,
+            )
+        os.replace(tmp_path, self.path)
+
+    def set_plan(self, shards):
+        self.shards = shards
+        self.save()
+
+    def finish(self, shard):
+        if self.deferred:
+            self.read.add(shard.jql)
+            return
+        self.finished.add(shard.jql)
+        self.save()
+
+    def track(self, issues):
+        """Yield ``issues``, remembering the last key for ``commit``."""
+        for issue in issues:
+            self.last_key = issue_key(issue)
+            yield issue
+
+    def commit(self, offset):
+        """Everything ``track`` yielded is in the output, now ``offset`` bytes."""
+        self.finished |= self.read
+        self.read.clear()
+        if self.last_key:
+            self.output = {"key": self.last_key, "offset": offset}
+        self.save()
+
+
+async def merge_by_key(streams, on_finished=None):
+    """Merge key-ordered async streams into one, reading them all concurrently.
+
+    ``on_finished(i)`` is called once every item of stream ``i`` was yielded.
+    """
+    ordered = merge_sorted(
+        streams, lambda issue: key_order(issue_key(issue)), on_finished
+    )
+    async for issue in ordered:
+        yield issue
+
+
+async def scan(
+    client,
+    query,
+    by="created",
+    shard_size=DEFAULT_SHARD_SIZE,
+    checkpoint=None,
+    **search_kwargs,
+):
+    """Every issue matching ``query`` in key order, fetched shard by shard."""
+    shards = checkpoint.shards if checkpoint else None
+    if shards is None:
+        shards = await ShardPlanner(client, query, by, shard_size).plan()
+        if checkpoint:
+            checkpoint.set_plan(shards)
+    if checkpoint:
+        shards = [shard for shard in shards if shard.jql not in checkpoint.finished]
+
+    def finished(i):
+        if checkpoint:
+            checkpoint.finish(shards[i])
+
+    # Issues up to the last one written out were read before the restart.
+    written = checkpoint and checkpoint.output and key_order(checkpoint.output["key"])
+    streams = [
+        client.search_issues_by_key(shard.jql, **search_kwargs) for shard in shards
+    ]
+    async for issue in merge_by_key(streams, finished):
+        if written and key_order(issue_key(issue)) <= written:
+            continue
+        yield issue
+
+
+def scan_issues(
+    conn,
+    query,
+    by="created",
+    shard_size=DEFAULT_SHARD_SIZE,
+    checkpoint_path=None,
+    fields=None,
+    json_result=False,
+    concurrency=None,
+    checkpoint=None,
+):
+    """Synchronous sharded scan; see ``scan``.
+
+    Pass a ``checkpoint`` instead of ``checkpoint_path`` to keep hold of it.
+    """
+    from kujira.kujira import iterate_async
+
+    search_kwargs = {}
+    if fields is not None:
+        search_kwargs["fields"] = ",".join(fields)
+    if json_result:
+        search_kwargs["json_result"] = True
+    if checkpoint is None and checkpoint_path:
+        checkpoint = ScanCheckpoint(checkpoint_path, query)
+    yield from iterate_async(
+        conn,
+        lambda client: scan(client, query, by, shard_size, checkpoint, **search_kwargs),
+        concurrency=concurrency,
+    )
@@ -0,0 +1,67 @@
+"""
+Fan-out searches over every configured Jira server.
+
+Each server profile gets its own connection and AsyncJira client, all on one
+event loop, and the result streams are merged by created or updated time as
+they arrive.  Output starts as soon as every server has answered its first
+page rather than when the slowest one has finished.
+"""
+from datetime import datetime, timezone
+
+from kujira.aio import ORDER_BY, AsyncJira, iterate_sync, merge_sorted
+
+MERGE_BY = ("created", "updated")
+JIRA_TIMESTAMP = "%Y-%m-%dT%H:%M:%S.%f%z"
+NO_TIMESTAMP = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def profile_name(config):
+    return config.profile or "default"
+
+
+def timestamp(raw, field):
+    """The field as an aware datetime; servers may answer in different zones."""
+    value = raw.get("fields", {}).get(field)
+    return datetime.strptime(value, JIRA_TIMESTAMP) if value else NO_TIMESTAMP
+
+
+def ordered_query(query, by):
+    where = ORDER_BY.sub("", query).strip()
+    order = f"ORDER BY {by} ASC, key ASC"
+    return f"{where} {order}" if where else order
+
+
+async def _server_issues(config, query, **search_kwargs):
+    """(config, raw issue) for every match on one server."""
+    from kujira.kujira import get_conn
+
+    client = AsyncJira(None, config.concurrency)
+    try:
+        # Connecting costs a round trip too, so it happens concurrently.
+        client.conn = await client.call(get_conn, config)
+        if getattr(client.conn, "_is_cloud", False) is True:
+            issues = client.search_issues_by_token(query, **search_kwargs)
+        else:
+            issues = client.search_issues(query, **search_kwargs)
+        async for raw in issues:
+            yield config, raw
+    finally:
+        client.close()
+
+
+def search_all_servers(configs, query, by="created", fields=None):
+    """Yield (config, raw issue) from every server, merged in ``by`` order.
+
+    ``query``'s ORDER BY is replaced, since the merge needs every stream in
+    ascending ``by`` order.
+    """
+    if by not in MERGE_BY:
+        raise ValueError(f"Can't merge by {by!r}, expected one of {MERGE_BY}")
+    search_kwargs = {"json_result": True}
+    if fields is not None:
+        search_kwargs["fields"] = ",".join(dict.fromkeys(tuple(fields) + (by,)))
+    streams = [
+        _server_issues(config, ordered_query(query, by), **search_kwargs)
+        for config in configs
+    ]
+    yield from iterate_sync(merge_sorted(streams, lambda item: timestamp(item[1], by)))
@@ -0,0 +1,108 @@
+"""
+Per-board cache of the sprints that are still open.
+
+Only active and future sprints are fetched, so the request doesn't grow with
+the board's history.  A board's entry is refetched when its TTL runs out, when
+a cached sprint has probably changed state since the fetch (an active sprint
+passed its end date, a future one its start date) or when told a sprint on
+the board changed (see invalidate).
+"""
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+
+DEFAULT_SPRINTS_PATH = "~/.jira/sprints.json"
+DEFAULT_SPRINTS_TTL = 24 * 60 * 60
+OPEN_STATES = "active,future"
+
+Sprint = namedtuple("Sprint", "id name state start_date end_date")
+
+
+def sprint_from_api(sprint):
+    raw = sprint if isinstance(sprint, dict) else sprint.raw
+    return Sprint(
+        raw["id"], raw["name"], raw["state"], raw.get("startDate"), raw.get("endDate")
+    )
+
+
+def _epoch(iso_timestamp):
+    return datetime.fromisoformat(iso_timestamp.replace("Z", "+00:00")).timestamp()
+
+
+def _state_boundary(sprint):
+    """When the sprint is next expected to change state, if known."""
+    boundary = sprint.end_date if sprint.state == "active" else sprint.start_date
+    return _epoch(boundary) if boundary else None
+
+
+def pick_current_sprint(sprints, name_contains="", excludes=()):
+    """The last active sprint whose name passes the configured filters."""
+    candidates = [
+        sprint
+        for sprint in sprints
+        if sprint.state == "active"
+        and name_contains in sprint.name
+        and sprint.name not in excludes
+    ]
+    return candidates[-1] if candidates else None
+
+
+class SprintCache:
+    def __init__(self, path=DEFAULT_SPRINTS_PATH):
+        self.path = os.path.expanduser(path)
+        try:
+            with open(self.path) as f:
+                self.boards = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.boards = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.boards, f)
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self, board_id, ttl=DEFAULT_SPRINTS_TTL, now=None):
+        entry = self.boards.get(str(board_id))
+        if entry is None:
+            return True
+        now = time.time() if now is None else now
+        if now - entry["fetched_at"] > ttl:
+            return True
+        for sprint in self._sprints(entry):
+            boundary = _state_boundary(sprint)
+            if boundary is not None and entry["fetched_at"] < boundary <= now:
+                return True
+        return False
+
+    def _sprints(self, entry):
+        return [Sprint(*sprint) for sprint in entry["sprints"]]
+
+    def sprints(self, board_id):
+        entry = self.boards.get(str(board_id))
+        return self._sprints(entry) if entry else None
+
+    def store(self, board_id, sprints, fetched_at=None):
+        self.boards[str(board_id)] = {
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "sprints": [list(sprint) for sprint in sprints],
+        }
+        self.save()
+
+    def invalidate(self, board_id=None):
+        """Forget one board, or every board when no id is given."""
+        if board_id is None:
+            self.boards.clear()
+        else:
+            self.boards.pop(str(board_id), None)
+        self.save()
+
+    def open_sprints(self, conn, board_id, ttl=DEFAULT_SPRINTS_TTL):
+        """Active and future sprints on the board, from the cache while fresh."""
+        if self.is_stale(board_id, ttl):
+            sprints = conn.sprints(board_id, state=OPEN_STATES)
+            self.store(board_id, [sprint_from_api(sprint) for sprint in sprints])
+        return self.sprints(board_id)
@@ -0,0 +1,207 @@
+"""
+Request tracing for ``kujira --trace``.
+
+While a Tracer is installed, every HTTP request sent through requests (which
+is how the JIRA connection talks to the server) is recorded with its method,
+endpoint, status, response size and wall time, and calls to the API functions
+in kujira.kujira are counted.  It can also run cProfile over the command.
+"""
+import functools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+TRACED_FUNCTIONS = (
+    "get_conn",
+    "get_issues",
+    "get_issues_read_ahead",
+    "get_users",
+    "get_user_directory",
+    "get_open_issues",
+    "get_all_epics",
+    "get_issues_for_status",
+    "get_issue_by_key",
+    "get_transitions",
+    "advance_issue",
+    "transition_issue",
+    "move_issue",
+    "resolve_epic_tags",
+    "get_printable_issue",
+    "get_printable_issues",
+    "edit_issue",
+    "get_current_sprint",
+    "get_sprint_issues",
+    "create_new_issue",
+)
+
+ISSUE_KEY = re.compile(r"/[A-Z][A-Z0-9_]*-\d+(?=/|$)")
+
+
+def endpoint(url):
+    """The path of ``url`` with issue keys replaced, so calls group by endpoint.
+
+    'https://x/rest/api/2/issue/DS-1/transitions' becomes
+    '/rest/api/2/issue/{key}/transitions'.
+    """
+    return ISSUE_KEY.sub("/{key}", urlsplit(url).path)
+
+
+class Tracer:
+    def __init__(self, profile=False):
+        self.requests = []
+        self.calls = Counter()
+        self.profiler = None
+        self.wall_time = None
+        self._profile = profile
+        self._lock = threading.Lock()
+        self._restore = []
+        self._started = None
+
+    def install(self):
+        import requests
+
+        from kujira import kujira as api
+
+        original_send = requests.Session.send
+        self._patch(requests.Session, "send", self._timed_send(original_send))
+        for name in TRACED_FUNCTIONS:
+            self._patch(api, name, self._counted(name, getattr(api, name)))
+        if self._profile:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._started = time.perf_counter()
+        return self
+
+    def uninstall(self):
+        self.wall_time = time.perf_counter() - self._started
+        if self.profiler is not None:
+            self.profiler.disable()
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        del self._restore[:]
+
+    def _patch(self, owner, name, replacement):
+        self._restore.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _timed_send(self, send):
+        tracer = self
+
+        @functools.wraps(send)
+        def timed_send(session, request, **kwargs):
+            start = time.perf_counter()
+            status, size = None, 0
+            try:
+                # Session.send reads the body unless streaming, so this
+                # covers the whole exchange.
+                response = send(session, request, **kwargs)
+                status = response.status_code
+                if kwargs.get("stream"):
+                    size = int(response.headers.get("Content-Length") or 0)
+                else:
+                    size = len(response.content)
+                return response
+            finally:
+                tracer.record(
+                    request.method,
+                    request.url,
+                    status,
+                    size,
+                    time.perf_counter() - start,
+                )
+
+        return timed_send
+
+    def _counted(self, name, function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            with self._lock:
+                self.calls[name] += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+    def record(self, method, url, status, size, seconds):
+        with self._lock:
+            self.requests.append(
+                {
+                    "method": method,
+                    "endpoint": endpoint(url),
+                    "url": url,
+                    "status": status,
+                    "bytes": size,
+                    "ms": seconds * 1000,
+                }
+            )
+
+    def endpoints(self):
+        """Requests grouped by method and endpoint, slowest total first."""
+        groups = {}
+        for request in self.requests:
+            group = groups.setdefault(
+                (request["method"], request["endpoint"]),
+                {
+                    "method": request["method"],
+                    "endpoint": request["endpoint"],
+                    "calls": 0,
+                    "statuses": Counter(),
+                    "bytes": 0,
+                    "ms": 0.0,
+                    "max_ms": 0.0,
+                },
+            )
+            group["calls"] += 1
+            group["statuses"][str(request["status"])] += 1
+            group["bytes"] += request["bytes"]
+            group["ms"] += request["ms"]
+            group["max_ms"] = max(group["max_ms"], request["ms"])
+        return sorted(groups.values(), key=lambda g: g["ms"], reverse=True)
+
+    def report(self):
+        endpoints = self.endpoints()
+        for group in endpoints:
+            group["statuses"] = dict(group["statuses"])
+        return {
+            "wall_ms": self.wall_time * 1000,
+            "request_ms": sum(r["ms"] for r in self.requests),
+            "bytes": sum(r["bytes"] for r in self.requests),
+            "endpoints": endpoints,
+            "calls": dict(self.calls.most_common()),
+            "requests": self.requests,
+        }
+
+    def print_table(self, file):
+        report = self.report()
+        print(
+            f"{'calls':>6} {'status':<10} {'KiB':>9} {'ms':>9} {'max ms':>8}  endpoint",
+            file=file,
+        )
+        for group in report["endpoints"]:
+            statuses = ",".join(sorted(group["statuses"]))
+            print(
+                f"{group['calls']:>6} {statuses:<10} {group['bytes'] / 1024:>9.1f} "
+                f"{group['ms']:>9.1f} {group['max_ms']:>8.1f}  "
+                f"{group['method']} {group['endpoint']}",
+                file=file,
+            )
+        print(
+            f"{len(self.requests)} requests, {report['bytes'] / 1024:.1f} KiB, "
+            f"{report['request_ms']:.1f} ms in requests, "
+            f"{report['wall_ms']:.1f} ms wall",
+            file=file,
+        )
+        if report["calls"]:
+            calls = ", ".join(f"{name} {n}" for name, n in report["calls"].items())
+            print(f"kujira calls: {calls}", file=file)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_profile(self, path):
+        self.profiler.dump_stats(path)
@@ -0,0 +1,106 @@
+"""
+A local, indexed copy of the user directory.
+
+Fetching every user takes one request per thousand users, so the directory is
+kept on disk and refreshed once it is older than its TTL.  Lookups by account
+id, email or user name are dictionary hits; display names are matched by
+prefix with a binary search over a sorted list.
+"""
+import json
+import os
+import time
+from bisect import bisect_left
+
+from kujira.models.user import UserModel
+
+DEFAULT_USERS_PATH = "~/.jira/users.json"
+DEFAULT_USERS_TTL = 24 * 60 * 60
+
+
+def _fold(text):
+    return text.casefold() if text else None
+
+
+class UserDirectory:
+    def __init__(self, users, fetched_at=None):
+        self.users = list(users)
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.by_account_id = {}
+        self.by_email = {}
+        self.by_name = {}
+        for user in self.users:
+            if user.account_id:
+                self.by_account_id[user.account_id] = user
+            if user.email:
+                self.by_email[_fold(user.email)] = user
+            for name in (user.name, user.key):
+                if name:
+                    self.by_name.setdefault(_fold(name), user)
+        self._display_names = sorted(
+            (_fold(user.display_name), i)
+            for i, user in enumerate(self.users)
+            if user.display_name
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_USERS_PATH):
+        try:
+            with open(os.path.expanduser(path)) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        users = (UserModel.from_dict(user) for user in data["users"])
+        return cls(users, fetched_at=data["fetched_at"])
+
+    def save(self, path=DEFAULT_USERS_PATH):
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "fetched_at": self.fetched_at,
+                    "users": [user.to_dict() for user in self.users],
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def is_stale(self, ttl=DEFAULT_USERS_TTL):
+        return time.time() - self.fetched_at > ttl
+
+    def get(self, query):
+        """The user whose account id, email, name or key is exactly ``query``."""
+        return (
+            self.by_account_id.get(query)
+            or self.by_email.get(_fold(query))
+            or self.by_name.get(_fold(query))
+        )
+
+    def find(self, prefix):
+        """Users whose display name starts with ``prefix``, in name order."""
+        prefix = _fold(prefix)
+        start = bisect_left(self._display_names, (prefix, -1))
+        matches = []
+        for display_name, i in self._display_names[start:]:
+            if not display_name.startswith(prefix):
+                break
+            matches.append(self.users[i])
+        return matches
+
+    def resolve(self, query):
+        """Exactly one user for ``query``, or LookupError listing the candidates."""
+        user = self.get(query)
+        if user is not None:
+            return user
+        matches = self.find(query)
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise LookupError(f"No user matches {query!r}")
+        names = ", ".join(user.display_name for user in matches)
+        raise LookupError(f"{query!r} is ambiguous: {names}")
+
+    def display_name(self, account_id):
+        user = self.by_account_id.get(account_id)
+        return user.display_name if user else account_id
@@ -0,0 +1,179 @@
+"""
+``kujira watch``: follow a JQL query, printing only what changed.
+
+After one full fetch, each poll asks only for issues updated since the newest
+``updated`` seen so far, with just the fields the diff shows.  A second, tiny
+search over the remembered keys finds issues that were updated out of the
+query (resolved, reassigned ...), and a full fetch every so often catches
+deletions.  The poll interval stretches while nothing changes.
+"""
+import time
+from collections import namedtuple
+
+from kujira.aio import ORDER_BY
+from kujira.mirror import jql_timestamp
+
+WATCH_FIELDS = ("summary", "status", "assignee", "updated")
+DEFAULT_INTERVAL = 10
+DEFAULT_MAX_INTERVAL = 5 * 60
+BACKOFF = 1.5
+FULL_FETCH_EVERY = 30
+
+Change = namedtuple("Change", "kind key before after")
+
+
+def watch_row(raw):
+    fields = raw.get("fields", {})
+    assignee = fields.get("assignee") or {}
+    status = fields.get("status") or {}
+    return {
+        "summary": fields.get("summary"),
+        "status": status.get("name"),
+        "assignee": assignee.get("displayName"),
+        "updated": fields.get("updated"),
+    }
+
+
+def format_change(change):
+    row = change.after or change.before
+    line = f"{change.key} | {row['summary']} [{row['status']}]"
+    if change.kind == "added":
+        return f"+ {line}"
+    if change.kind == "removed":
+        return f"- {line}"
+    changed = [
+        f"{name}: {change.before[name]} -> {change.after[name]}"
+        for name in ("summary", "status", "assignee")
+        if change.before[name] != change.after[name]
+    ]
+    return f"~ {line}" + (f" ({'; '.join(changed)})" if changed else "")
+
+
+class AdaptiveInterval:
+    """Poll quickly after a change, backing off while nothing happens."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        self.min_interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.current = interval
+
+    def next(self, changed):
+        if changed:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.max_interval, self.current * BACKOFF)
+        return self.current
+
+
+class Watcher:
+    def __init__(self, conn, jql, fields=WATCH_FIELDS):
+        self.conn = conn
+        self.where = ORDER_BY.sub("", jql).strip()
+        self.fields = fields
+        self.rows = {}
+        self.last_seen = None
+        self.polls = 0
+
+    def _search(self, jql):
+        from kujira.kujira import get_issues
+
+        return get_issues(
+            self.conn, jql, fields=self.fields, read_ahead=True, json_result=True
+        )
+
+    def _and(self, clause):
+        return f"({self.where}) AND {clause}" if self.where else clause
+
+    def _see(self, row):
+        if row["updated"] and (
+            self.last_seen is None or row["updated"] > self.last_seen
+        ):
+            self.last_seen = row["updated"]
+
+    def fetch_all(self):
+        """Fetch the whole query, returning the changes since the last snapshot."""
+        rows = {raw["key"]: watch_row(raw) for raw in self._search(self.where)}
+        changes = [
+            Change("removed", key, row, None)
+            for key, row in self.rows.items()
+            if key not in rows
+        ]
+        for key, row in rows.items():
+            before = self.rows.get(key)
+            if before is None:
+                changes.append(Change("added", key, None, row))
+            elif before != row:
+                changes.append(Change("changed", key, before, row))
+            self._see(row)
+        self.rows = rows
+        return changes
+
+    def poll(self):
+        """The changes since the previous poll."""
+        self.polls += 1
+        if self.last_seen is None or self.polls % FULL_FETCH_EVERY == 0:
+            return self.fetch_all()
+        # JQL dates have minute precision, so >= re-reads the last minute;
+        # those issues compare equal to the snapshot and are skipped.
+        since = f'updated >= "{jql_timestamp(self.last_seen)}"'
+        updated = {raw["key"]: watch_row(raw) for raw in self._search(self._and(since))}
+        changes = []
+        for key, row in updated.items():
+            before = self.rows.get(key)
+            if before is None:
+                changes.append(Change("added", key, None, row))
+            elif before != row:
+                changes.append(Change("changed", key, before, row))
+            self.rows[key] = row
+            self._see(row)
+        for key in self._updated_out_of_query(since, updated):
+            changes.append(Change("removed", key, self.rows.pop(key), None))
+        return changes
+
+    def _updated_out_of_query(self, since, still_matching):
+        from jira import JIRAError
+
+        from kujira.kujira import iterate_async
+
+        keys = [key for key in self.rows if key not in still_matching]
+        if not keys:
+            return []
+        raws = iterate_async(
+            self.conn,
+            lambda client: client.issues_by_keys(
+                keys, where=since, fields="updated", json_result=True
+            ),
+        )
+        left = []
+        try:
+            for raw in raws:
+                left.append(raw["key"])
+                self._see(watch_row(raw))
+        except JIRAError:
+            # The next full fetch finds whatever left the query meanwhile.
+            return []
+        return left
+
+
+def watch(
+    conn,
+    jql,
+    interval=DEFAULT_INTERVAL,
+    max_interval=DEFAULT_MAX_INTERVAL,
+    echo=print,
+    sleep=time.sleep,
+    max_polls=None,
+):
+    watcher = Watcher(conn, jql)
+    for change in watcher.fetch_all():
+        echo(format_change(change))
+    delays = AdaptiveInterval(interval, max_interval)
+    polls = 0
+    changed = True
+    while max_polls is None or polls < max_polls:
+        sleep(delays.next(changed))
+        changes = watcher.poll()
+        for change in changes:
+            echo(format_change(change))
+        changed = bool(changes)
+        polls += 1
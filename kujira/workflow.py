@@ -0,0 +1,78 @@
+"""
+Learned workflow graphs, so transitions don't need a lookup round trip.
+
+For each server, project and issue type we remember, per status, the
+transitions the server offered last time: their names, ids and the status they
+lead to.  Transition ids are only meaningful on the server that gave them.
+"""
+import json
+import os
+import threading
+from collections import deque
+
+DEFAULT_WORKFLOW_PATH = "~/.jira/workflow.json"
+
+
+def workflow_key(server, project, issue_type):
+    return f"{server} {project}/{issue_type}"
+
+
+class WorkflowCache:
+    def __init__(self, path=DEFAULT_WORKFLOW_PATH):
+        self.path = os.path.expanduser(path)
+        # The outbox flusher transitions issues from several threads.
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.graphs = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.graphs = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.graphs, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def transitions(self, server, project, issue_type, status):
+        """{transition name: {"id": ..., "to": status}}, or None if never seen."""
+        graph = self.graphs.get(workflow_key(server, project, issue_type), {})
+        return graph.get(status)
+
+    def learn(self, server, project, issue_type, status, api_transitions):
+        """Record the output of ``conn.transitions`` for an issue in ``status``."""
+        transitions = {
+            t["name"]: {"id": str(t["id"]), "to": t["to"]["name"]}
+            for t in api_transitions
+        }
+        with self._lock:
+            graph = self.graphs.setdefault(
+                workflow_key(server, project, issue_type), {}
+            )
+            graph[status] = transitions
+            self.save()
+        return transitions
+
+    def path_to(self, server, project, issue_type, status, target):
+        """Shortest list of transition names from ``status`` to ``target``.
+
+        Only statuses already learned are explored; returns None when the
+        known part of the graph doesn't reach ``target``.
+        """
+        graph = self.graphs.get(workflow_key(server, project, issue_type), {})
+        previous = {status: None}
+        queue = deque([status])
+        while queue:
+            current = queue.popleft()
+            if current == target:
+                path = []
+                while previous[current] is not None:
+                    current, name = previous[current]
+                    path.append(name)
+                return path[::-1]
+            for name, transition in sorted(graph.get(current, {}).items()):
+                if transition["to"] not in previous:
+                    previous[transition["to"]] = (current, name)
+                    queue.append(transition["to"])
+        return None
@@ -11,7 +11,9 @@ with open('README.rst') as readme_file:
 with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
-requirements = ['Click>=6.0', 'pyyaml', 'jira', 'python-dateutil']
+# jira 3.10.4 is the first release with enhanced_search_issues and
+# approximate_issue_count (Cloud's /search/jql endpoints).
+requirements = ['Click>=6.0', 'pyyaml', 'jira>=3.10.4', 'python-dateutil']
 
 setup_requirements = ['pytest-runner']
 
@@ -25,16 +27,11 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
-        "Programming Language :: Python :: 2",
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.10',
     ],
     description="A set of scripts for managing Jira using jira-python",
-    entry_points={'console_scripts': ['kujira=kujira.cli:main']},
+    entry_points={'console_scripts': ['kujira=kujira.daemon:run']},
     install_requires=requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
@@ -42,6 +39,7 @@ setup(
     keywords='kujira',
     name='kujira',
     packages=find_packages(include=['kujira']),
+    python_requires='>=3.10',
     setup_requires=setup_requirements,
     test_suite='tests',
     tests_require=test_requirements,
@@ -0,0 +1,560 @@
+"""
+A small stand-in for the Jira REST API, served on localhost.
+
+It understands the handful of endpoints kujira uses and enough JQL
+(``field op value`` clauses joined with AND, plus ORDER BY) to answer the
+queries kujira builds.  Tests seed it with issues, users and sprints and can
+add per-request latency; every request is logged with its response size.
+
+    with FakeJira() as fake:
+        fake.seed(issues=200, users=30, epics=5)
+        conn = fake.connect()
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API = "/rest/api/2/"
+AGILE = "/rest/agile/1.0/"
+CURRENT_USER = "account-0"
+EPIC_FIELD = "customfield_10910"
+
+DEFAULT_WORKFLOW = {
+    "Backlog": [{"id": "11", "name": "In Progress", "to": {"name": "In Progress"}}],
+    "In Progress": [
+        {"id": "21", "name": "In Review", "to": {"name": "In Review"}},
+        {"id": "41", "name": "Backlog", "to": {"name": "Backlog"}},
+    ],
+    "In Review": [{"id": "31", "name": "Done", "to": {"name": "Done"}}],
+    "Done": [],
+}
+
+FIELDS = [
+    {"id": "summary", "name": "Summary", "clauseNames": ["summary"]},
+    {"id": "updated", "name": "Updated", "clauseNames": ["updated"]},
+    {"id": EPIC_FIELD, "name": "Epic Link", "clauseNames": ["cf[10910]"]},
+]
+
+
+class JQLError(ValueError):
+    pass
+
+
+def jira_timestamp(moment):
+    return (
+        moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}+0000"
+    )
+
+
+def _wall_clock(value):
+    """Naive datetime from a Jira timestamp or a JQL date literal."""
+    value = value.strip('"')
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value[:23] if "T" in value else value, fmt)
+        except ValueError:
+            pass
+    for fmt in ("%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise JQLError(f"Bad date {value!r}")
+
+
+def _issue_key_order(key):
+    project, _, number = key.rpartition("-")
+    return (project, int(number))
+
+
+def _split_top_level(text, separator):
+    """Split on ``separator`` (a lower-case word) outside quotes and parens."""
+    parts, depth, quoted, start = [], 0, False, 0
+    lowered = text.lower()
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and lowered.startswith(f" {separator} ", i):
+            parts.append(text[start:i])
+            i += len(separator) + 2
+            start = i
+            continue
+        i += 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+def _parse_value(text):
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        return [_parse_value(item) for item in text[1:-1].split(",")]
+    if text.startswith('"') and text.endswith('"'):
+        return text[1:-1]
+    if text.lower() == "currentuser()":
+        return CURRENT_USER
+    return text
+
+
+KEY_LIST = re.compile(r"\bkey\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+CLAUSE = re.compile(
+    r"^(\w+(?:\[\d+\])?)\s*(not in|in|!=|>=|<=|=|>|<|~)\s*(.+)$", re.IGNORECASE
+)
+
+
+def _field_value(issue, name):
+    fields = issue["fields"]
+    name = name.lower()
+    if name in ("key", "issuekey"):
+        return issue["key"]
+    if name == "project":
+        return fields["project"]["key"]
+    if name in ("issuetype", "type"):
+        return fields["issuetype"]["name"]
+    if name in ("status", "assignee", "reporter", "resolution", "priority"):
+        value = fields.get(name)
+        if value is None:
+            return "unresolved" if name == "resolution" else None
+        return value.get("accountId") or value.get("name")
+    if name in ("created", "updated"):
+        return fields[name]
+    if name == "sprint":
+        return [str(sprint) for sprint in fields.get("sprint", [])]
+    if name in ("summary", "description"):
+        return fields.get(name)
+    if name == "text":
+        return f"{fields.get('summary') or ''} {fields.get('description') or ''}"
+    raise JQLError(f"Field '{name}' does not exist or you do not have permission")
+
+
+def _compare(field, actual, op, expected):
+    if field in ("key", "issuekey") and op in (">", ">=", "<", "<="):
+        actual, expected = _issue_key_order(actual), _issue_key_order(expected)
+        if actual[0] != expected[0]:
+            return False
+    elif field in ("created", "updated") and op in (">", ">=", "<", "<=", "="):
+        actual, expected = _wall_clock(actual), _wall_clock(expected)
+    if op == "=":
+        if isinstance(actual, list):
+            return expected in actual
+        return str(actual).lower() == str(expected).lower()
+    if op == "!=":
+        return str(actual).lower() != str(expected).lower()
+    if op == "in":
+        return str(actual).lower() in [str(e).lower() for e in expected]
+    if op == "not in":
+        return str(actual).lower() not in [str(e).lower() for e in expected]
+    if op == "~":
+        return expected.lower() in (actual or "").lower()
+    if actual is None:
+        return False
+    return {
+        ">": actual > expected,
+        ">=": actual >= expected,
+        "<": actual < expected,
+        "<=": actual <= expected,
+    }[op]
+
+
+def _matcher(expression):
+    expression = expression.strip()
+    clauses = _split_top_level(expression, "and")
+    if len(clauses) > 1:
+        matchers = [_matcher(clause) for clause in clauses]
+        return lambda issue: all(m(issue) for m in matchers)
+    alternatives = _split_top_level(expression, "or")
+    if len(alternatives) > 1:
+        matchers = [_matcher(alternative) for alternative in alternatives]
+        return lambda issue: any(m(issue) for m in matchers)
+    if expression.startswith("(") and expression.endswith(")"):
+        return _matcher(expression[1:-1])
+    if not expression:
+        return lambda issue: True
+    match = CLAUSE.match(expression)
+    if not match:
+        raise JQLError(f"Unable to parse the JQL clause {expression!r}")
+    field, op, value = match.group(1).lower(), match.group(2).lower(), match.group(3)
+    expected = _parse_value(value)
+    return lambda issue: _compare(field, _field_value(issue, field), op, expected)
+
+
+def run_jql(issues, jql):
+    """The issues matching ``jql``, in the order it asks for."""
+    where, order_by = _split_order_by(jql)
+    matcher = _matcher(where)
+    matches = [issue for issue in issues if matcher(issue)]
+    for clause in reversed([c.strip() for c in order_by.split(",") if c.strip()]):
+        field, _, direction = clause.partition(" ")
+        key = _issue_key_order if field.lower() in ("key", "issuekey") else None
+        matches.sort(
+            key=lambda issue: (key or str)(_field_value(issue, field) or ""),
+            reverse=direction.strip().lower() == "desc",
+        )
+    return matches
+
+
+def _split_order_by(jql):
+    parts = re.split(r"\border\s+by\b", jql, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) == 1:
+        return parts[0], "key"
+    return parts[0], parts[1]
+
+
+class FakeJira:
+    def __init__(self, latency=0.0, workflow=None, deployment="Server"):
+        self.latency = latency
+        self.deployment = deployment
+        self.workflow = workflow or DEFAULT_WORKFLOW
+        self.issues = {}
+        self.users = []
+        self.sprints = {}
+        self.requests = []
+        self.errors = deque()
+        self.lost_responses = []
+        self.response_headers = {}
+        self._lock = threading.Lock()
+        self._next_id = 10000
+        self.server = None
+
+    # Seeding
+
+    def add_issue(self, key, **fields):
+        now = datetime(2019, 5, 29, 10, 0) + timedelta(minutes=len(self.issues))
+        self._next_id += 1
+        issue_fields = {
+            "project": {"id": "100", "key": key.rpartition("-")[0]},
+            "issuetype": {"name": "Task"},
+            "status": {"name": "Backlog"},
+            "resolution": None,
+            "priority": {"name": "Medium"},
+            "assignee": {"accountId": CURRENT_USER, "displayName": "User 0"},
+            "reporter": {"accountId": CURRENT_USER, "displayName": "User 0"},
+            "summary": f"Summary of {key}",
+            "description": f"Description of {key}",
+            "created": jira_timestamp(now),
+            "updated": jira_timestamp(now),
+            EPIC_FIELD: None,
+            "comment": {"comments": [], "total": 0},
+        }
+        issue_fields.update(fields)
+        issue = {"id": str(self._next_id), "key": key, "fields": issue_fields}
+        self.issues[key] = issue
+        return issue
+
+    def add_user(self, account_id, display_name, email=None, name=None):
+        user = {
+            "self": f"{API}user?accountId={account_id}",
+            "accountId": account_id,
+            "displayName": display_name,
+            "emailAddress": email,
+            "name": name,
+            "key": name,
+            "active": True,
+        }
+        self.users.append(user)
+        return user
+
+    def add_sprint(self, board_id, sprint_id, name, state, start=None, end=None):
+        sprint = {
+            "id": sprint_id,
+            "name": name,
+            "state": state,
+            "originBoardId": board_id,
+        }
+        if start:
+            sprint["startDate"] = start
+        if end:
+            sprint["endDate"] = end
+        self.sprints.setdefault(board_id, []).append(sprint)
+        return sprint
+
+    def seed(self, issues=0, users=0, epics=0, sprints=0, project="DS", board_id=1):
+        statuses = list(self.workflow)
+        for i in range(1, epics + 1):
+            self.add_issue(
+                f"{project}-{i}", issuetype={"name": "Epic"}, summary=f"Epic {i}"
+            )
+        for i in range(epics + 1, epics + issues + 1):
+            self.add_issue(
+                f"{project}-{i}",
+                status={"name": statuses[i % len(statuses)]},
+                **{EPIC_FIELD: f"{project}-{i % epics + 1}" if epics else None},
+                sprint=[i % sprints + 1] if sprints else [],
+            )
+        for i in range(users):
+            self.add_user(
+                f"account-{i}", f"User {i}", f"user{i}@example.com", f"user{i}"
+            )
+        for i in range(1, sprints + 1):
+            state = "active" if i == sprints else "closed"
+            self.add_sprint(board_id, i, f"Sprint {i}", state)
+
+    def fail_next(self, count, status=429, headers=None):
+        """Answer the next ``count`` requests with an error, e.g. a rate limit."""
+        for _ in range(count):
+            self.errors.append((status, headers or {}))
+
+    def lose_response(self, method, path_fragment, status=502):
+        """Apply the next matching request but answer it with an error."""
+        self.lost_responses.append((method, path_fragment, status))
+
+    # Serving
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        fake = self
+
+        class Handler(FakeJiraHandler):
+            jira = fake
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def connect(self, **options):
+        from jira import JIRA
+
+        return JIRA(
+            options={"server": self.url, **options}, basic_auth=("user0", "token")
+        )
+
+    def write_config(self, home, section="Jira", **settings):
+        """Write a ~/.jira/config.ini under ``home`` that points at this server.
+
+        Any other ``section`` (a "Jira:NAME" profile) is added to the file.
+        """
+        config = {
+            "user": "user0",
+            "api_key": "token",
+            "server_url": self.url,
+            "default_project": "DS",
+            "default_issue_type": "Task",
+            "default_priority": "Medium",
+            "account_id": CURRENT_USER,
+            **settings,
+        }
+        os.makedirs(os.path.join(home, ".jira"), exist_ok=True)
+        mode = "w" if section == "Jira" else "a"
+        with open(os.path.join(home, ".jira", "config.ini"), mode) as f:
+            f.write(f"[{section}]\n")
+            f.writelines(f"{name} = {value}\n" for name, value in config.items())
+
+    def requests_to(self, path_fragment, method=None):
+        return [
+            r
+            for r in self.requests
+            if path_fragment in r["path"] and method in (None, r["method"])
+        ]
+
+    # Endpoints
+
+    def search(self, params):
+        jql = params.get("jql", "")
+        if str(params.get("validateQuery", "true")).lower() != "false":
+            self.check_keys(jql)
+        start_at = int(params.get("startAt", 0))
+        max_results = int(params.get("maxResults", 50))
+        with self._lock:
+            matches = run_jql(list(self.issues.values()), jql)
+        page = matches[start_at : start_at + max_results]
+        fields = params.get("fields")
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(matches),
+            "issues": [self.project_fields(issue, fields) for issue in page],
+        }
+
+    def check_keys(self, jql):
+        """Jira rejects a query naming a key that doesn't exist."""
+        for keys in KEY_LIST.findall(jql):
+            for key in keys.split(","):
+                key = key.strip().strip('"')
+                if key not in self.issues:
+                    raise JQLError(
+                        f"An issue with key '{key}' does not exist for field 'key'."
+                    )
+
+    def search_by_token(self, params):
+        """The Cloud search: no total, an opaque token for the next page."""
+        token = params.get("nextPageToken")
+        start_at = int(token.partition("-")[2]) if token else 0
+        page = self.search(dict(params, startAt=start_at))
+        end = start_at + len(page["issues"])
+        result = {"issues": page["issues"], "isLast": end >= page["total"]}
+        if not result["isLast"]:
+            result["nextPageToken"] = f"page-{end}"
+        return result
+
+    @staticmethod
+    def project_fields(issue, fields):
+        if not fields or "*all" in fields:
+            return issue
+        wanted = set(",".join(fields).split(","))
+        return {
+            "id": issue["id"],
+            "key": issue["key"],
+            "fields": {k: v for k, v in issue["fields"].items() if k in wanted},
+        }
+
+    def touch(self, issue):
+        issue["fields"]["updated"] = jira_timestamp(datetime.utcnow())
+
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    jira = None
+
+    def log_message(self, *args):
+        pass
+
+    def _route(self, method):
+        if self.jira.latency:
+            time.sleep(self.jira.latency)
+        url = urlparse(self.path)
+        params = {
+            k: v if k == "fields" else v[-1] for k, v in parse_qs(url.query).items()
+        }
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        headers = dict(self.jira.response_headers)
+        try:
+            status, extra_headers = self.jira.errors.popleft()
+            headers.update(extra_headers)
+            payload = {"errorMessages": ["Rate limit exceeded."], "errors": {}}
+        except IndexError:
+            try:
+                status, payload = self.handle_api(method, url.path, params, body)
+            except JQLError as e:
+                status, payload = 400, {"errorMessages": [str(e)], "errors": {}}
+            for lost in self.jira.lost_responses:
+                if lost[0] == method and lost[1] in url.path:
+                    self.jira.lost_responses.remove(lost)
+                    status, payload = lost[2], {"errorMessages": ["Lost"]}
+                    break
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.jira.requests.append(
+            {
+                "method": method,
+                "path": url.path,
+                "query": url.query,
+                "status": status,
+                "bytes": len(data),
+            }
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def handle_api(self, method, path, params, body):
+        jira = self.jira
+        if path == API + "serverInfo":
+            return 200, {
+                "baseUrl": jira.url,
+                "version": "8.20.0",
+                "versionNumbers": [8, 20, 0],
+                "deploymentType": jira.deployment,
+            }
+        if path == API + "field":
+            return 200, FIELDS
+        if path == API + "search/jql":
+            if method == "POST":
+                params = dict(params, **body)
+            return 200, jira.search_by_token(params)
+        if path == API + "search":
+            if method == "POST":
+                params = dict(params, **body)
+            return 200, jira.search(params)
+        if path == API + "user/search":
+            start_at = int(params.get("startAt", 0))
+            max_results = int(params.get("maxResults", 50))
+            return 200, jira.users[start_at : start_at + max_results]
+        match = re.match(rf"^{AGILE}board/(\d+)/sprint$", path)
+        if match:
+            states = params.get("state")
+            sprints = [
+                s
+                for s in jira.sprints.get(int(match.group(1)), [])
+                if not states or s["state"] in states.split(",")
+            ]
+            return 200, {
+                "startAt": 0,
+                "maxResults": 50,
+                "total": len(sprints),
+                "isLast": True,
+                "values": sprints,
+            }
+        match = re.match(rf"^{API}issue/([\w-]+)(/transitions)?$", path)
+        if match:
+            return self.handle_issue(method, match.group(1), match.group(2), body)
+        return 404, {"errorMessages": [f"No route for {method} {path}"]}
+
+    def handle_issue(self, method, key, transitions, body):
+        jira = self.jira
+        issue = jira.issues.get(key)
+        if issue is None:
+            return 404, {"errorMessages": ["Issue does not exist"], "errors": {}}
+        status = issue["fields"]["status"]["name"]
+        if transitions and method == "GET":
+            return 200, {"transitions": jira.workflow.get(status, [])}
+        if transitions and method == "POST":
+            wanted = str(body["transition"]["id"])
+            for transition in jira.workflow.get(status, []):
+                if transition["id"] == wanted:
+                    issue["fields"]["status"] = {"name": transition["to"]["name"]}
+                    jira.touch(issue)
+                    return 204, None
+            return 400, {"errorMessages": [f"Transition id '{wanted}' is not valid"]}
+        if method == "GET":
+            return 200, dict(issue, self=f"{jira.url}{API}issue/{key}")
+        if method == "PUT":
+            issue["fields"].update((body or {}).get("fields", {}))
+            jira.touch(issue)
+            return 204, None
+        if method == "DELETE":
+            del jira.issues[key]
+            return 204, None
+        return 405, None
@@ -1,4 +1,5 @@
 from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
 from pytest import fixture
@@ -7,6 +8,7 @@ from kujira.models.issue import (
     IssueModel,
     get_updates,
     make_new_issue_template,
+    parse_timestamp,
     serialize,
 )
 
@@ -148,11 +150,59 @@ description: |
         issue = IssueModel.from_api(mock_api_issue, None)
         assert issue == vader_issue
 
+    def test_it_reads_a_partially_populated_API_object(self):
+        api_issue = SimpleNamespace(
+            key="Death-Star-1610",
+            fields=SimpleNamespace(summary="Your lack: faith", updated="2019-05-29"),
+            permalink=lambda: "empire.jira.com/browse/Death-Star-1610",
+        )
+        issue = IssueModel.from_api(api_issue, None)
+        assert "Your lack  faith" == issue.summary
+        assert datetime(2019, 5, 29) == issue.updated_at
+        assert issue.description is None
+        assert issue.assignee is None
+        assert "description: |\n  \n" in str(issue)
+
+    def test_it_reads_raw_search_json(self, vader_issue):
+        raw = {
+            "key": "Death-Star-1610",
+            "fields": {
+                "project": {"id": "Death-Star"},
+                "assignee": {"accountId": "Motti"},
+                "reporter": {"accountId": "Vader"},
+                "summary": "Your lack of faith",
+                "description": "I find your lack of faith disturbing.",
+                "priority": {"name": "3"},
+                "issuetype": {"name": "Task"},
+                "updated": "2019-05-29",
+            },
+        }
+        issue = IssueModel.from_json(raw, server_url="empire.jira.com")
+        assert issue == vader_issue
+
+    def test_it_builds_its_url_lazily(self):
+        issue = IssueModel(issue_id="DS-1", server_url="https://empire.jira.com")
+        assert "https://empire.jira.com/browse/DS-1" == issue.url
+        issue.url = "elsewhere"
+        assert "elsewhere" == issue.url
+
+    def test_it_has_no_instance_dict(self, vader_issue):
+        assert not hasattr(vader_issue, "__dict__")
+
     def test_it_reads_yaml_file_and_returns_issue_model(self, vader_issue):
         issue = IssueModel.from_file(PATH_TO_VADER_FILE)
         assert issue == vader_issue
 
 
+class TestParseTimestamp:
+    def test_it_parses_jira_timestamps(self):
+        parsed = parse_timestamp("2019-05-29T10:11:12.345-0530")
+        assert "2019-05-29T10:11:12.345000-05:30" == parsed.isoformat()
+
+    def test_it_falls_back_for_other_formats(self):
+        assert datetime(2019, 5, 29) == parse_timestamp("2019-05-29")
+
+
 class TestSerializeIssue:
     def test_it_takes_issue_and_returns_a_string_representation(self, vader_issue):
         expected = """\
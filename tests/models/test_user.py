@@ -34,6 +34,15 @@ class TestUserModel:
         assert 'dvader' == user.key
         assert 'Darth Vader' == user.display_name
 
+    def test_it_keeps_the_cloud_account_id(self):
+        api_user = MagicMock(spec=['accountId', 'displayName'])
+        api_user.accountId = '5b10ac8d82e05b22cc7d4ef5'
+        api_user.displayName = 'Darth Vader'
+        user = UserModel.from_API(api_user)
+        assert '5b10ac8d82e05b22cc7d4ef5' == user.account_id
+        assert user.email is None
+        assert user == UserModel.from_dict(user.to_dict())
+
     def test_it_serializes_itself_to_string(self, vader_user):
         as_string = str(vader_user)
         assert '[dvader] [dvader] [Darth Vader] [dvader@empire.com]' == as_string
@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import aio, cli, kujira
+from kujira.aio import AsyncJira
+
+
+@pytest.fixture
+def fake():
+    with FakeJira() as fake:
+        fake.seed(issues=120, users=25, epics=3)
+        yield fake
+
+
+def collect(async_iterable):
+    async def run():
+        return [item async for item in async_iterable]
+
+    return asyncio.run(run())
+
+
+class TestAsyncJira:
+    def test_it_yields_every_issue_in_order(self, fake):
+        client = AsyncJira(fake.connect())
+        try:
+            issues = collect(client.search_issues("project = DS ORDER BY key"))
+        finally:
+            client.close()
+        assert [i.key for i in issues] == [f"DS-{n}" for n in range(1, 124)]
+        assert len(fake.requests_to("search")) == 3
+
+    def test_it_overlaps_page_requests(self):
+        with FakeJira(latency=0.1) as fake:
+            fake.seed(issues=500)
+            client = AsyncJira(fake.connect(), concurrency=4)
+            started = time.monotonic()
+            try:
+                issues = collect(client.search_issues("project = DS", json_result=True))
+            finally:
+                client.close()
+        # 10 pages one after the other would take at least a second
+        assert len(issues) == 500
+        assert time.monotonic() - started < 0.8
+
+    def test_it_pages_through_users(self, fake, monkeypatch):
+        monkeypatch.setattr(aio, "USER_PAGE_SIZE", 10)
+        client = AsyncJira(fake.connect())
+        try:
+            users = collect(client.users())
+        finally:
+            client.close()
+        assert [u.accountId for u in users] == [f"account-{i}" for i in range(25)]
+
+    def test_it_lists_epics_for_a_project(self, fake):
+        client = AsyncJira(fake.connect())
+        try:
+            epics = collect(client.epics("DS", fields="summary"))
+        finally:
+            client.close()
+        assert [e.fields.summary for e in epics] == ["Epic 1", "Epic 2", "Epic 3"]
+
+    @pytest.mark.parametrize("deployment", ["Server", "Cloud"])
+    def test_it_looks_up_issues_by_key_skipping_missing_ones(self, deployment):
+        with FakeJira(deployment=deployment) as fake:
+            fake.seed(issues=3)
+            client = AsyncJira(fake.connect())
+            try:
+                issues = collect(client.issues_by_keys(["DS-2", "DS-404", "DS-1"]))
+            finally:
+                client.close()
+        assert sorted(i.key for i in issues) == ["DS-1", "DS-2"]
+
+
+class TestSyncWrappers:
+    def test_get_issues_read_ahead_matches_sequential_paging(self, fake):
+        conn = fake.connect()
+        query = "project = DS ORDER BY key"
+        assert [i.key for i in kujira.get_issues(conn, query, read_ahead=True)] == [
+            i.key for i in kujira.get_issues(conn, query)
+        ]
+
+    def test_it_can_stop_reading_early(self, fake):
+        conn = fake.connect()
+        issues = kujira.get_issues(conn, "project = DS", read_ahead=True)
+        assert next(issues).key == "DS-1"
+        issues.close()
+
+    def test_get_users_wraps_the_async_client(self, fake):
+        users = list(kujira.get_users(fake.connect()))
+        assert len(users) == 25
+
+    def test_get_all_epics_wraps_the_async_client(self, fake):
+        epics = list(kujira.get_all_epics(fake.connect(), "DS"))
+        assert [e.key for e in epics] == ["DS-1", "DS-2", "DS-3"]
+
+
+class TestCursorPaging:
+    def test_keyset_query_continues_after_the_last_key(self):
+        assert aio.keyset_query("project = DS ORDER BY created") == (
+            "project = DS ORDER BY key ASC"
+        )
+        assert aio.keyset_query("status = Done", "DS-7", {"AB"}) == (
+            '(status = Done) AND ((project = "DS" AND key > "DS-7") '
+            'OR project not in ("AB", "DS")) ORDER BY key ASC'
+        )
+
+    def test_keyset_paging_walks_every_project_in_key_order(self, fake):
+        for n in range(1, 61):
+            fake.add_issue(f"AB-{n}")
+        issues = list(kujira.get_issues(fake.connect(), "", paging="keyset"))
+        expected = [f"AB-{n}" for n in range(1, 61)] + [
+            f"DS-{n}" for n in range(1, 124)
+        ]
+        assert [i.key for i in issues] == expected
+        assert all("startAt=0" in r["query"] for r in fake.requests_to("search"))
+
+    def test_token_paging_follows_next_page_tokens_on_cloud(self):
+        with FakeJira(deployment="Cloud") as fake:
+            fake.seed(issues=120)
+            conn = fake.connect()
+            issues = list(kujira.get_issues(conn, "project = DS", fields=["summary"]))
+            raw = list(kujira.get_issues(conn, "project = DS", json_result=True))
+        assert [i.key for i in issues] == [f"DS-{n}" for n in range(1, 121)]
+        assert issues[0].fields.summary == "Summary of DS-1"
+        assert [r["key"] for r in raw] == [f"DS-{n}" for n in range(1, 121)]
+        assert len(fake.requests_to("search/jql")) == 6
+
+    def test_cursor_paging_drops_repeated_issues(self):
+        issues = [{"key": "DS-1"}, {"key": "DS-2"}, {"key": "DS-1"}]
+        assert [i["key"] for i in kujira.unique_by_key(issues)] == ["DS-1", "DS-2"]
+
+    def test_repeats_are_dropped_however_late_they_come(self):
+        keys = [f"DS-{n}" for n in range(500)] + ["DS-0"]
+        unique = kujira.unique_by_key([{"key": key} for key in keys])
+        assert [i["key"] for i in unique] == keys[:-1]
+
+    def test_it_rejects_unknown_paging_modes(self, fake):
+        with pytest.raises(ValueError):
+            next(kujira.get_issues(fake.connect(), "", paging="sideways"))
+
+    def test_token_paging_is_rejected_off_cloud(self, fake, tmp_path, monkeypatch):
+        with pytest.raises(ValueError, match="Cloud"):
+            next(kujira.get_issues(fake.connect(), "", paging="token"))
+
+        monkeypatch.setenv("HOME", str(tmp_path))
+        fake.write_config(str(tmp_path))
+        result = CliRunner().invoke(
+            cli.main, ["export", "project = DS", "--paging", "token"]
+        )
+        assert result.exit_code == 2
+        assert "needs Jira Cloud" in result.output
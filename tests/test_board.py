@@ -0,0 +1,77 @@
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, kujira
+from kujira.results import ResultCache
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    with FakeJira() as fake:
+        statuses = ["Backlog", "In Progress", "In Review", "Done", "In Progress"]
+        for n, status in enumerate(statuses, 1):
+            fake.add_issue(f"DS-{n}", status={"name": status})
+        monkeypatch.setenv("HOME", str(tmp_path))
+        fake.write_config(str(tmp_path))
+        monkeypatch.setattr(kujira, "_results", ResultCache(":memory:"))
+        yield fake
+
+
+def invoke(*args):
+    result = CliRunner().invoke(cli.main, args)
+    assert 0 == result.exit_code, result.output
+    return result.output
+
+
+def test_status_query_keeps_the_single_status_form():
+    assert 'assignee=currentuser() and status="Done" ORDER BY created' == (
+        kujira.status_query("Done")
+    )
+    assert 'and status in ("In Progress", "In Review") ORDER' in (
+        kujira.status_query("In Progress", "In Review")
+    )
+
+
+def test_group_by_status_keeps_column_order_and_ignores_case():
+    raws = [
+        {"key": "DS-1", "fields": {"status": {"name": "in review"}}},
+        {"key": "DS-2", "fields": {"status": {"name": "Backlog"}}},
+    ]
+    columns = kujira.group_by_status(raws, ("In Review", "Backlog", "Done"))
+    assert list(columns) == ["In Review", "Backlog", "Done"]
+    assert [raw["key"] for raw in columns["In Review"]] == ["DS-1"]
+    assert columns["Done"] == []
+
+
+class TestBoard:
+    def test_every_column_comes_from_one_search(self, fake):
+        lines = invoke("board").splitlines()
+        assert len(fake.requests_to("search")) == 1
+        headings = [line for line in lines if not line.startswith("  ")]
+        assert headings == ["Backlog (1)", "In Progress (2)", "In Review (1)"]
+        assert lines[3].startswith("  DS-2 | Summary of DS-2")
+
+    def test_columns_come_from_options_or_config(self, fake, tmp_path):
+        assert invoke("board", "-s", "Done").splitlines()[0] == "Done (1)"
+        fake.write_config(str(tmp_path), board_statuses="In Review, Done")
+        headings = [line for line in invoke("board").splitlines() if "(" in line]
+        assert headings[0] == "In Review (1)"
+
+    def test_a_transition_evicts_the_board(self, fake, tmp_path, monkeypatch):
+        monkeypatch.setattr(kujira, "_workflow", None)
+        invoke("board")
+        invoke("advance", "DS-1")
+        assert "In Progress (3)" in invoke("board")
+        assert len(fake.requests_to("search")) == 2
+
+
+class TestListManyStatuses:
+    def test_it_lists_several_statuses_from_one_search(self, fake):
+        lines = invoke("ls", "In Progress", "In Review").splitlines()
+        assert [line.split(" |")[0] for line in lines] == ["DS-2", "DS-3", "DS-5"]
+        assert len(fake.requests_to("search")) == 1
+
+    def test_it_needs_a_status(self, fake):
+        result = CliRunner().invoke(cli.main, ["ls"])
+        assert result.exit_code == 2
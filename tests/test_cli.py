@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from kujira import cli
+
+
+class TestStartup:
+    def test_importing_the_cli_skips_the_api_stack(self):
+        code = (
+            "import sys, kujira.cli; "
+            "print(','.join(m for m in ('jira', 'yaml', 'dateutil') if m in sys.modules))"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        assert b"" == output.strip()
+
+
+class TestCurrent:
+    def test_it_prints_the_current_issue(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        (tmp_path / ".jira").mkdir()
+        (tmp_path / ".jira" / "current_issue").write_text(
+            "DS-1610 | Your lack of faith (2019-05-29)\n"
+        )
+        runner = CliRunner()
+        result = runner.invoke(cli.main, ["current"])
+        assert "DS-1610 | Your lack of faith (2019-05-29)\n" == result.output
+        result = runner.invoke(cli.main, ["current", "--key"])
+        assert "DS-1610\n" == result.output
+
+    def test_it_prints_nothing_without_a_current_issue(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        result = CliRunner().invoke(cli.main, ["current"])
+        assert 0 == result.exit_code
+        assert "" == result.output
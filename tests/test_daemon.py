@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import time
+
+import click
+from pytest import fixture, raises
+
+import kujira.daemon
+from kujira.daemon import DaemonServer, _command_name, call_daemon, run
+
+
+@click.group()
+def fake_main():
+    pass
+
+
+@fake_main.command()
+@click.argument("name")
+def hello(name):
+    click.echo(f"Hello {name}")
+    click.echo("to stderr", err=True)
+
+
+@fake_main.command()
+def boom():
+    raise ValueError("kaboom")
+
+
+def serve_fake_main(path):
+    with DaemonServer(path, fake_main) as server:
+        server.serve_forever()
+
+
+@fixture
+def socket_path(tmp_path):
+    # A separate process, since the daemon redirects its own sys.stdout.
+    path = str(tmp_path / "kujira.sock")
+    process = multiprocessing.get_context("fork").Process(
+        target=serve_fake_main, args=(path,), daemon=True
+    )
+    process.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    yield path
+    process.terminate()
+    process.join()
+
+
+class TestDaemon:
+    def test_it_streams_output_and_the_exit_code(self, socket_path, capsys):
+        assert 0 == call_daemon(["hello", "Vader"], socket_path)
+        captured = capsys.readouterr()
+        assert "Hello Vader\n" == captured.out
+        assert "to stderr\n" == captured.err
+
+    def test_it_reports_usage_errors(self, socket_path, capsys):
+        assert 2 == call_daemon(["hello"], socket_path)
+        assert "Missing argument" in capsys.readouterr().err
+
+    def test_it_survives_a_failing_command(self, socket_path, capsys):
+        assert 1 == call_daemon(["boom"], socket_path)
+        assert "kaboom" in capsys.readouterr().err
+        assert 0 == call_daemon(["hello", "Tarkin"], socket_path)
+
+    def test_it_returns_none_when_no_daemon_is_running(self, tmp_path):
+        assert call_daemon(["hello", "Vader"], str(tmp_path / "nope.sock")) is None
+
+    def test_it_removes_its_socket_on_close(self, tmp_path):
+        path = tmp_path / "kujira.sock"
+        DaemonServer(str(path), fake_main).server_close()
+        assert not path.exists()
+
+
+class TestRouting:
+    def test_it_skips_option_values_when_finding_the_command(self):
+        assert "edit" == _command_name(["--server", "work", "edit", "DS-1"])
+        assert "edit" == _command_name(["--server=work", "edit", "DS-1"])
+        assert "mine" == _command_name(["--trace-json", "t.json", "mine"])
+        assert _command_name(["--server", "work"]) is None
+
+    def test_it_forwards_the_clients_server_profile(self, monkeypatch):
+        sent = []
+        monkeypatch.setattr(
+            kujira.daemon, "call_daemon", lambda argv: sent.append(argv) or 0
+        )
+        monkeypatch.delenv("KUJIRA_NO_DAEMON", raising=False)
+        monkeypatch.setenv("KUJIRA_SERVER", "work")
+        with raises(SystemExit):
+            run(["mine"])
+        with raises(SystemExit):
+            run(["--server", "home", "mine"])
+        assert [["--server", "work", "mine"], ["--server", "home", "mine"]] == sent
@@ -0,0 +1,68 @@
+import io
+import json
+
+from kujira.export import export_issues, flatten_field
+
+
+def make_raw_issues(n):
+    for i in range(n):
+        yield {
+            "key": f"DS-{i}",
+            "fields": {
+                "summary": f"Summary, with a comma {i}",
+                "status": {"name": "In Progress"},
+                "assignee": {"accountId": "a-1", "displayName": "Darth Vader"},
+                "labels": ["empire", "death-star"],
+            },
+        }
+
+
+class ChunkCountingIO(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestExportIssues:
+    def test_it_writes_one_json_object_per_line(self):
+        out = io.StringIO()
+        assert 3 == export_issues(make_raw_issues(3), out, "ndjson", ())
+        lines = out.getvalue().splitlines()
+        assert "DS-2" == json.loads(lines[2])["key"]
+        assert "In Progress" == json.loads(lines[0])["fields"]["status"]["name"]
+
+    def test_it_writes_flattened_csv(self):
+        out = io.StringIO()
+        fields = ("summary", "status", "assignee", "labels", "missing")
+        export_issues(make_raw_issues(2), out, "csv", fields)
+        lines = out.getvalue().splitlines()
+        assert "key,summary,status,assignee,labels,missing" == lines[0]
+        assert (
+            'DS-1,"Summary, with a comma 1",In Progress,Darth Vader,empire; death-star,'
+            == lines[2]
+        )
+
+    def test_it_flushes_in_chunks(self):
+        out = ChunkCountingIO()
+        export_issues(make_raw_issues(120), out, "ndjson", (), chunk_size=50)
+        assert 3 == out.flushes
+
+    def test_it_writes_before_reading_the_whole_input(self):
+        out = io.StringIO()
+
+        def raw_issues():
+            for i, raw in enumerate(make_raw_issues(100)):
+                written = out.getvalue().count("\n")
+                assert written >= i - 10
+                yield raw
+
+        assert 100 == export_issues(raw_issues(), out, "ndjson", (), chunk_size=10)
+
+
+def test_flatten_field_prefers_readable_names():
+    assert "DS" == flatten_field({"key": "DS", "name": "Death Star"})
+    assert "" == flatten_field(None)
+    assert "3" == flatten_field(3)
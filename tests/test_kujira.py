@@ -3,12 +3,20 @@
 
 """Tests for `kujira` package."""
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
 import pytest
+from pytest import fixture
 
 from click.testing import CliRunner
 
 from kujira import kujira
 from kujira import cli
+from kujira.results import ResultCache
+from kujira.workflow import WorkflowCache
 
 
 @pytest.fixture
@@ -36,3 +44,320 @@ def test_content(response):
 #     help_result = runner.invoke(cli.main, ['--help'])
 #     assert help_result.exit_code == 0
 #     assert '--help  Show this message and exit.' in help_result.output
+
+
+class ResultList(list):
+    def __init__(self, items, total):
+        super().__init__(items)
+        self.total = total
+
+
+class FakeSearchConn:
+    def __init__(self, n_issues):
+        self.keys = [f"DS-{i}" for i in range(n_issues)]
+        self.calls = []
+
+    def search_issues(self, query, startAt=0, maxResults=50, **kwargs):
+        self.calls.append(startAt)
+        self.kwargs = kwargs
+        page = self.keys[startAt : startAt + maxResults]
+        return ResultList(page, total=len(self.keys))
+
+
+class TestGetIssues:
+    def test_it_pages_until_an_empty_page(self):
+        conn = FakeSearchConn(120)
+        assert conn.keys == list(kujira.get_issues(conn, "project = DS"))
+        assert [0, 50, 100, 150] == conn.calls
+
+    def test_read_ahead_yields_issues_in_order(self):
+        conn = FakeSearchConn(1234)
+        issues = list(kujira.get_issues(conn, "project = DS", read_ahead=True))
+        assert conn.keys == issues
+
+    def test_read_ahead_skips_the_trailing_empty_page(self):
+        conn = FakeSearchConn(120)
+        list(kujira.get_issues(conn, "project = DS", read_ahead=True))
+        assert [0, 50, 100] == sorted(conn.calls)
+
+    def test_read_ahead_bounds_pages_in_flight(self):
+        conn = FakeSearchConn(5000)
+        issues = kujira.get_issues_read_ahead(conn, "project = DS", max_pages=3)
+        next(issues)
+        issues.close()
+        assert len(conn.calls) <= 4
+
+    def test_it_only_asks_for_the_requested_fields(self):
+        conn = FakeSearchConn(3)
+        list(kujira.get_issues(conn, "project = DS", fields=("summary", "updated")))
+        assert {"fields": "summary,updated"} == conn.kwargs
+
+    def test_it_asks_for_every_field_by_default(self):
+        conn = FakeSearchConn(3)
+        list(kujira.get_issues(conn, "project = DS", read_ahead=True))
+        assert {} == conn.kwargs
+
+    def test_listings_declare_their_fields(self):
+        conn = FakeSearchConn(3)
+        list(kujira.get_open_issues(conn))
+        assert {"fields": "summary,updated"} == conn.kwargs
+        list(kujira.get_all_epics(conn, "DS"))
+        assert {"fields": "summary"} == conn.kwargs
+
+    def test_it_can_yield_raw_json(self):
+        conn = MagicMock()
+        conn.search_issues.side_effect = lambda query, startAt, **kwargs: {
+            "total": 60,
+            "issues": [
+                {"key": f"DS-{i}"} for i in range(startAt, min(startAt + 50, 60))
+            ],
+        }
+        issues = list(kujira.get_issues(conn, "project = DS", json_result=True))
+        assert [f"DS-{i}" for i in range(60)] == [raw["key"] for raw in issues]
+        assert conn.search_issues.call_args.kwargs["json_result"]
+
+    def test_read_ahead_handles_a_single_page(self):
+        conn = FakeSearchConn(7)
+        assert conn.keys == list(kujira.get_issues_read_ahead(conn, "project = DS"))
+        assert [0] == conn.calls
+
+
+def make_api_issue(key, epic_key=None, summary="Your lack of faith"):
+    api_issue = MagicMock(key=key)
+    api_issue.fields.summary = summary
+    api_issue.fields.description = "I find your lack of faith disturbing."
+    api_issue.fields.updated = "2019-05-29"
+    setattr(api_issue.fields, kujira.EPIC_FIELD, epic_key)
+    return api_issue
+
+
+class FakeEpicConn:
+    def __init__(self, epic_keys):
+        self.epics = {k: make_api_issue(k, summary=f"Epic {k}") for k in epic_keys}
+        self.queries = []
+
+    def search_issues(self, query, **kwargs):
+        self.queries.append(query)
+        return [self.epics[k] for k in sorted(self.epics) if k in query]
+
+
+class TestResolveEpicTags:
+    @fixture(autouse=True)
+    def clear_epic_tags(self):
+        kujira._epic_tags.clear()
+        yield
+        kujira._epic_tags.clear()
+
+    def test_it_fetches_all_epics_with_one_search(self):
+        conn = FakeEpicConn(["DS-1", "DS-2"])
+        issues = [
+            make_api_issue(f"DS-{i}", epic_key=f"DS-{i % 2 + 1}") for i in range(10)
+        ]
+        tags = kujira.resolve_epic_tags(conn, issues)
+        assert {"DS-1": "Epic DS-1 (DS-1)", "DS-2": "Epic DS-2 (DS-2)"} == tags
+        assert ["key in (DS-1, DS-2)"] == conn.queries
+
+    def test_it_fetches_each_epic_once_per_process(self):
+        conn = FakeEpicConn(["DS-1"])
+        kujira.resolve_epic_tags(conn, [make_api_issue("DS-5", epic_key="DS-1")])
+        kujira.resolve_epic_tags(conn, [make_api_issue("DS-6", epic_key="DS-1")])
+        assert 1 == len(conn.queries)
+
+    def test_it_remembers_missing_epics(self):
+        conn = FakeEpicConn([])
+        issue = make_api_issue("DS-5", epic_key="DS-404")
+        assert {"DS-404": None} == kujira.resolve_epic_tags(conn, [issue])
+        kujira.resolve_epic_tags(conn, [issue])
+        assert 1 == len(conn.queries)
+
+    def test_get_printable_issues_tags_every_issue(self):
+        conn = FakeEpicConn(["DS-1"])
+        issues = [make_api_issue(f"DS-{i}", epic_key="DS-1") for i in range(2, 5)]
+        models = list(kujira.get_printable_issues(issues, conn))
+        assert ["Epic DS-1 (DS-1)"] * 3 == [m.epic for m in models]
+        assert 1 == len(conn.queries)
+
+
+class FakeIssueConn:
+    server_url = "https://empire.atlassian.net"
+
+    def __init__(self, fail=0):
+        self.fetched = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def issue(self, key):
+        self.fetched.append(key)
+        self.release.wait(5)
+        if self.fail:
+            self.fail -= 1
+            raise kujira.JIRAError(status_code=502, text="Bad Gateway")
+        return make_api_issue(key.upper(), summary=f"Epic {key.upper()}")
+
+
+class TestIssueIdentityMap:
+    @fixture(autouse=True)
+    def clear_issues(self, monkeypatch):
+        monkeypatch.setattr(kujira, "_results", ResultCache(":memory:"))
+        kujira.clear_caches()
+        yield
+        kujira.clear_caches()
+
+    def test_each_key_is_fetched_once_and_shared(self):
+        conn = FakeIssueConn()
+        issue = kujira.get_issue_by_key(conn, "DS-1")
+        assert kujira.get_issue_by_key(conn, "ds-1") is issue
+        assert kujira.get_issue_by_key(conn, "DS-1", refresh=True) is not issue
+        assert ["DS-1", "DS-1"] == conn.fetched
+
+    def test_concurrent_callers_share_one_request(self):
+        conn = FakeIssueConn()
+        conn.release.clear()
+        with ThreadPoolExecutor(5) as pool:
+            fetches = [pool.submit(kujira.get_issue_by_key, conn, "DS-1")]
+            while not conn.fetched:
+                time.sleep(0.001)
+            fetches += [
+                pool.submit(kujira.get_issue_by_key, conn, "DS-1") for _ in range(4)
+            ]
+            conn.release.set()
+            issues = [fetch.result() for fetch in fetches]
+        assert ["DS-1"] == conn.fetched
+        assert all(issue is issues[0] for issue in issues)
+
+    def test_failures_are_not_remembered(self):
+        conn = FakeIssueConn(fail=1)
+        with pytest.raises(kujira.JIRAError):
+            kujira.get_issue_by_key(conn, "DS-1")
+        assert kujira.get_issue_by_key(conn, "DS-1").key == "DS-1"
+        assert 2 == len(conn.fetched)
+
+    def test_mutations_forget_the_issues_they_change(self):
+        conn = FakeIssueConn()
+        issue = kujira.get_issue_by_key(conn, "DS-1")
+        epic = kujira.get_issue_by_key(conn, "DS-9")
+        kujira.evict_results(["DS-1"], ("description",))
+        assert kujira.get_issue_by_key(conn, "DS-1") is not issue
+        assert kujira.get_issue_by_key(conn, "DS-9") is epic
+
+    def test_fetched_epics_tag_issues_without_a_search(self):
+        conn = FakeIssueConn()
+        kujira.get_issue_by_key(conn, "DS-9")
+        tags = kujira.resolve_epic_tags(conn, [make_api_issue("DS-1", "DS-9")])
+        assert {"DS-9": "Epic DS-9 (DS-9)"} == tags
+
+
+class FakeWorkflowConn:
+    """Backlog -> In Progress -> In Review -> Done, one transition each."""
+
+    WORKFLOW = {
+        "Backlog": [{"id": "11", "name": "In Progress", "to": {"name": "In Progress"}}],
+        "In Progress": [{"id": "21", "name": "In Review", "to": {"name": "In Review"}}],
+        "In Review": [{"id": "31", "name": "Done", "to": {"name": "Done"}}],
+        "Done": [],
+    }
+
+    server_url = "https://jira.example.com"
+
+    def __init__(self, status):
+        self.status = status
+        self.calls = []
+
+    def transitions(self, issue):
+        self.calls.append("GET")
+        return self.WORKFLOW[self.status]
+
+    def transition_issue(self, issue, transition_id):
+        self.calls.append("POST")
+        for transition in self.WORKFLOW[self.status]:
+            if transition["id"] == transition_id:
+                self.status = transition["to"]["name"]
+                return
+        raise kujira.JIRAError(status_code=400, text="Invalid transition")
+
+
+def make_workflow_issue(status):
+    issue = MagicMock(key="DS-1")
+    issue.fields.project.key = "DS"
+    issue.fields.issuetype.name = "Task"
+    issue.fields.status.name = status
+    return issue
+
+
+class TestTransitions:
+    @fixture(autouse=True)
+    def workflow(self, tmp_path, monkeypatch):
+        workflow = WorkflowCache(str(tmp_path / "workflow.json"))
+        monkeypatch.setattr(kujira, "_workflow", workflow)
+        monkeypatch.setattr(kujira, "_results", ResultCache(":memory:"))
+        return workflow
+
+    def test_a_cached_transition_only_posts(self):
+        conn = FakeWorkflowConn("Backlog")
+        kujira.transition_issue(conn, make_workflow_issue("Backlog"), "In Progress")
+        assert ["GET", "POST"] == conn.calls
+
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        assert "In Progress" == kujira.transition_issue(conn, issue, "In Progress")
+        assert ["POST"] == conn.calls
+        assert "In Progress" == issue.fields.status.name
+
+    def test_an_unavailable_transition_returns_false(self):
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        assert not kujira.transition_issue(conn, issue, "Deployed")
+
+    def test_a_transition_missing_from_the_cache_is_asked_for(self, workflow):
+        workflow.learn(FakeWorkflowConn.server_url, "DS", "Task", "Backlog", [])
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        assert "In Progress" == kujira.transition_issue(conn, issue, "In Progress")
+        assert ["GET", "POST"] == conn.calls
+
+        conn = FakeWorkflowConn("Done")
+        assert not kujira.transition_issue(conn, make_workflow_issue("Done"), "Reopen")
+        assert ["GET"] == conn.calls
+
+    def test_a_rejected_transition_id_refreshes_the_cache(self, workflow):
+        workflow.learn(
+            FakeWorkflowConn.server_url,
+            "DS",
+            "Task",
+            "Backlog",
+            [{"id": "99", "name": "In Progress", "to": {"name": "In Progress"}}],
+        )
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        assert "In Progress" == kujira.transition_issue(conn, issue, "In Progress")
+        assert ["POST", "GET", "POST"] == conn.calls
+        transitions = workflow.transitions(
+            FakeWorkflowConn.server_url, "DS", "Task", "Backlog"
+        )
+        assert "11" == transitions["In Progress"]["id"]
+
+    def test_threads_share_one_workflow_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.setattr(kujira, "_workflow", None)
+        monkeypatch.setattr(kujira, "_results", None)
+        with ThreadPoolExecutor(8) as pool:
+            workflows = list(pool.map(lambda _: kujira.get_workflow(), range(8)))
+            results = list(pool.map(lambda _: kujira.get_result_cache(), range(8)))
+        assert len({id(workflow) for workflow in workflows}) == 1
+        assert len({id(cache) for cache in results}) == 1
+
+    def test_move_follows_next_action_then_the_learned_graph(self):
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        moved = kujira.move_issue(conn, issue, "Done")
+        assert ["In Progress", "In Review", "Done"] == moved
+
+        conn = FakeWorkflowConn("Backlog")
+        issue = make_workflow_issue("Backlog")
+        kujira.move_issue(conn, issue, "Done")
+        assert ["POST", "POST", "POST"] == conn.calls
+
+    def test_move_gives_up_when_the_target_is_unreachable(self):
+        conn = FakeWorkflowConn("Done")
+        assert kujira.move_issue(conn, make_workflow_issue("Done"), "Backlog") is None
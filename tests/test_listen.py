@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from kujira.listen import WebhookServer, apply_event, signature
+from kujira.mirror import IssueMirror
+from kujira.sprints import Sprint, SprintCache
+
+WEBHOOKS = "tests/fixtures/webhooks"
+
+
+def recorded(name):
+    with open(f"{WEBHOOKS}/{name}.json", "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def server(tmp_path):
+    events = []
+    server = WebhookServer(
+        ("127.0.0.1", 0),
+        mirror_path=str(tmp_path / "mirror.db"),
+        sprints_path=str(tmp_path / "sprints.json"),
+        secret="s3cret",
+        on_event=events.append,
+    )
+    server.events = events
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def post(server, body, secret="s3cret"):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}/", data=body, method="POST"
+    )
+    if secret:
+        request.add_header("X-Hub-Signature", signature(secret, body))
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+class TestWebhookServer:
+    def test_it_applies_recorded_issue_events_to_the_mirror(self, server, tmp_path):
+        for name in ("issue_created", "issue_updated", "epic_updated"):
+            assert post(server, recorded(name)) == 204
+        mirror = IssueMirror(str(tmp_path / "mirror.db"))
+        issue = mirror.issue("DS-42")
+        assert issue["fields"]["status"]["name"] == "In Progress"
+        assert [epic["fields"]["summary"] for epic in mirror.epics("DS")] == [
+            "Second Death Star"
+        ]
+
+        post(server, recorded("issue_deleted"))
+        assert mirror.issue("DS-42") is None
+        assert server.events[-1] == "deleted DS-42"
+
+    def test_a_sprint_event_drops_the_boards_cached_sprints(self, server, tmp_path):
+        path = str(tmp_path / "sprints.json")
+        cache = SprintCache(path)
+        cache.store(1, [Sprint(6, "DS Sprint 6", "active", None, None)])
+        cache.store(2, [])
+
+        post(server, recorded("sprint_started"))
+        assert set(SprintCache(path).boards) == {"2"}
+
+    def test_it_rejects_unsigned_and_malformed_requests(self, server, tmp_path):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            post(server, recorded("issue_created"), secret="wrong")
+        assert e.value.code == 401
+        with pytest.raises(urllib.error.HTTPError) as e:
+            post(server, b'{"webhookEvent": "jira:issue_created"}')
+        assert e.value.code == 400
+        assert IssueMirror(str(tmp_path / "mirror.db")).issue("DS-42") is None
+
+
+class TestApplyEvent:
+    def test_an_older_update_does_not_overwrite_a_newer_one(self):
+        mirror = IssueMirror(":memory:")
+        apply_event(json.loads(recorded("issue_updated")), mirror, None)
+        result = apply_event(json.loads(recorded("issue_created")), mirror, None)
+        assert result == "stale jira:issue_created DS-42"
+        assert mirror.issue("DS-42")["fields"]["status"]["name"] == "In Progress"
+
+    def test_it_ignores_projects_that_are_not_mirrored(self):
+        mirror = IssueMirror(":memory:")
+        payload = json.loads(recorded("issue_created"))
+        assert apply_event(payload, mirror, None, projects=("AB",)).startswith(
+            "ignored"
+        )
+        assert mirror.issue("DS-42") is None
+
+    def test_an_event_keeps_a_synced_project_fresh(self):
+        mirror = IssueMirror(":memory:")
+        payload = json.loads(recorded("issue_updated"))
+        apply_event(payload, mirror, None, listening_since=time.time())
+        assert mirror.age(["DS"]) is None
+
+        an_hour_ago = time.time() - 3600
+        with mirror.db:
+            mirror.db.execute(
+                "INSERT INTO sync_state VALUES ('DS', '2019-05-29T10:00', ?)",
+                (an_hour_ago,),
+            )
+        apply_event(payload, mirror, None, listening_since=an_hour_ago - 60)
+        assert mirror.age(["DS"]) < 60
+        assert mirror.high_water("DS") == "2019-05-29T10:00"
+
+    def test_a_project_synced_before_the_listener_started_stays_stale(self):
+        mirror = IssueMirror(":memory:")
+        an_hour_ago = time.time() - 3600
+        with mirror.db:
+            mirror.db.execute(
+                "INSERT INTO sync_state VALUES ('DS', '2019-05-29T10:00', ?)",
+                (an_hour_ago,),
+            )
+        payload = json.loads(recorded("issue_updated"))
+        apply_event(payload, mirror, None, listening_since=time.time() - 60)
+        assert mirror.age(["DS"]) >= 3600
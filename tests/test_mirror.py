@@ -0,0 +1,176 @@
+from unittest.mock import MagicMock
+
+from pytest import fixture, raises
+
+from fake_jira import FakeJira
+from kujira.mirror import IssueMirror, issue_text, jql_timestamp
+
+
+def make_raw(key, updated, status="In Progress", assignee="vader", issue_type="Task"):
+    return {
+        "key": key,
+        "fields": {
+            "project": {"key": "DS"},
+            "issuetype": {"name": issue_type},
+            "status": {"name": status},
+            "resolution": None,
+            "assignee": {"accountId": assignee},
+            "created": "2019-05-01T09:00:00.000+0000",
+            "updated": updated,
+            "summary": f"Summary of {key}",
+        },
+    }
+
+
+class FakeSearchConn:
+    def __init__(self, raws):
+        self.raws = raws
+        self.queries = []
+
+    def search_issues(self, query, startAt=0, maxResults=50, **kwargs):
+        self.queries.append(query)
+        page = [MagicMock(raw=raw) for raw in self.raws[startAt : startAt + maxResults]]
+        result = MagicMock()
+        result.__iter__.return_value = iter(page)
+        result.__len__.return_value = len(page)
+        result.total = len(self.raws)
+        return result
+
+
+@fixture
+def mirror():
+    return IssueMirror(":memory:")
+
+
+class TestIssueMirror:
+    def test_it_round_trips_raw_issues(self, mirror):
+        raw = make_raw("DS-1", "2019-05-29T10:11:12.000+0000")
+        mirror.upsert([raw])
+        assert raw == mirror.issue("DS-1")
+        assert mirror.issue("DS-2") is None
+
+    def test_it_filters_like_the_list_commands(self, mirror):
+        mirror.upsert(
+            [
+                make_raw("DS-1", "2019-05-29T10:00:00.000+0000"),
+                make_raw("DS-2", "2019-05-29T10:00:00.000+0000", status="Done"),
+                make_raw("DS-3", "2019-05-29T10:00:00.000+0000", assignee="tarkin"),
+                make_raw("DS-4", "2019-05-29T10:00:00.000+0000", issue_type="Epic"),
+            ]
+        )
+        in_progress = mirror.issues_for_status("vader", "In Progress")
+        assert ["DS-1", "DS-4"] == [raw["key"] for raw in in_progress]
+        either = mirror.issues_for_status("vader", "in progress", "DONE")
+        assert {"DS-1", "DS-2", "DS-4"} == {raw["key"] for raw in either}
+        assert ["DS-4"] == [raw["key"] for raw in mirror.epics("DS")]
+        assert 3 == len(list(mirror.open_issues("vader")))
+
+    def test_a_failed_full_sync_leaves_the_mirror_stale(self, mirror):
+        conn = FakeSearchConn([make_raw("DS-1", "2019-05-29T10:11:12.000+0000")])
+        mirror.sync(conn, "DS")
+        conn.search_issues = MagicMock(side_effect=ConnectionError("VPN down"))
+        with raises(ConnectionError):
+            mirror.sync(conn, "DS", full=True)
+        assert mirror.age(["DS"]) is None
+        assert mirror.high_water("DS") is None
+
+    def test_sync_only_asks_for_issues_past_the_high_water_mark(self, mirror):
+        conn = FakeSearchConn([make_raw("DS-1", "2019-05-29T10:11:12.000+0000")])
+        assert 1 == mirror.sync(conn, "DS")
+        assert 'project = "DS" ORDER BY updated ASC' == conn.queries[0]
+
+        conn = FakeSearchConn([make_raw("DS-2", "2019-05-30T08:00:00.000+0000")])
+        assert 1 == mirror.sync(conn, "DS")
+        assert 'updated >= "2019/05/29 10:11"' in conn.queries[0]
+        assert "2019-05-30T08:00:00.000+0000" == mirror.high_water("DS")
+
+    def test_age_is_none_until_every_project_is_synced(self, mirror):
+        mirror.sync(FakeSearchConn([]), "DS")
+        assert mirror.age(["DS"]) < 5
+        assert mirror.age(["DS", "TIE"]) is None
+
+
+def test_jql_timestamp_keeps_the_wall_clock_minutes():
+    assert "2019/05/29 10:11" == jql_timestamp("2019-05-29T10:11:12.000+0000")
+
+
+def with_comments(*bodies):
+    return {"comments": [{"body": body} for body in bodies], "total": len(bodies)}
+
+
+@fixture
+def fake():
+    with FakeJira() as fake:
+        fake.seed(issues=20)
+        fake.issues["DS-3"]["fields"]["description"] = "Reroute the exhaust ports."
+        fake.issues["DS-4"]["fields"]["comment"] = with_comments(
+            "A small thermal exhaust port, right below the main port."
+        )
+        fake.issues["DS-5"]["fields"]["summary"] = "Cover the exhaust port"
+        yield fake
+
+
+def keys(results):
+    return [raw["key"] for raw, snippet in results]
+
+
+class TestTextSearch:
+    def test_sync_indexes_summary_description_and_comments(self, fake):
+        mirror = IssueMirror(":memory:")
+        mirror.sync(fake.connect(), "DS")
+        results = list(mirror.search("exhaust port"))
+        assert keys(results) == ["DS-5", "DS-3", "DS-4"]
+        assert "[exhaust port]" in results[-1][1]
+
+    def test_it_follows_updates_and_deletes(self, fake):
+        mirror = IssueMirror(":memory:")
+        mirror.sync(fake.connect(), "DS")
+        fake.issues["DS-5"]["fields"]["summary"] = "Shield generator"
+        fake.touch(fake.issues["DS-5"])
+        mirror.sync(fake.connect(), "DS")
+        mirror.delete("DS-4")
+        assert keys(mirror.search("exhaust port")) == ["DS-3"]
+        assert keys(mirror.search("shield generator")) == ["DS-5"]
+
+    def test_raw_queries_and_project_filter(self):
+        mirror = IssueMirror(":memory:")
+        mirror.upsert(
+            [
+                {
+                    "key": "DS-1",
+                    "fields": {"project": {"key": "DS"}, "summary": "Tractor beam"},
+                },
+                {
+                    "key": "AB-1",
+                    "fields": {"project": {"key": "AB"}, "summary": "Tractor repair"},
+                },
+            ]
+        )
+        assert keys(mirror.search("tract*", raw_query=True)) == ["DS-1", "AB-1"]
+        assert keys(mirror.search("tractor", project=None, limit=1)) == ["DS-1"]
+        assert keys(mirror.search("beam OR repair", "AB", raw_query=True)) == ["AB-1"]
+
+    def test_an_existing_mirror_is_indexed_on_open(self, tmp_path):
+        path = str(tmp_path / "mirror.db")
+        mirror = IssueMirror(path)
+        mirror.upsert([{"key": "DS-1", "fields": {"summary": "Superlaser"}}])
+        mirror.db.execute("DROP TABLE issue_text")
+        mirror.close()
+        assert keys(IssueMirror(path).search("superlaser")) == ["DS-1"]
+
+    def test_it_reads_atlassian_document_format(self):
+        raw = {
+            "fields": {
+                "summary": "Plans",
+                "description": {
+                    "type": "doc",
+                    "content": [
+                        {
+                            "type": "paragraph",
+                            "content": [{"type": "text", "text": "Stolen plans"}],
+                        }
+                    ],
+                },
+            }
+        }
+        assert issue_text(raw) == ("Plans", "Stolen plans", "")
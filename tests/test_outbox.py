@@ -0,0 +1,163 @@
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, kujira, outbox
+from kujira.outbox import MAX_ATTEMPTS, Outbox, flush
+from kujira.results import ResultCache
+from kujira.workflow import WorkflowCache
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return Outbox(str(tmp_path / "outbox.db"))
+
+
+class TestOutbox:
+    def test_pending_edits_to_an_issue_collapse(self, queue):
+        first = queue.enqueue(None, "DS-1", "edit", {"fields": {"summary": "A"}})
+        queue.enqueue(None, "DS-2", "edit", {"fields": {"summary": "B"}})
+        again = queue.enqueue(
+            None, "DS-1", "edit", {"fields": {"summary": "C", "description": "D"}}
+        )
+        assert again == first
+        assert queue.operations()[0].payload == {
+            "fields": {"summary": "C", "description": "D"}
+        }
+
+        queue.enqueue(None, "DS-1", "advance")
+        after_advance = queue.enqueue(None, "DS-1", "edit", {"fields": {}})
+        assert after_advance != first
+        assert len(queue.operations()) == 4
+
+    def test_rm_drops_what_is_pending_for_the_issue(self, queue):
+        queue.enqueue(None, "DS-1", "advance")
+        queue.enqueue(None, "DS-1", "edit", {"fields": {"summary": "A"}})
+        queue.enqueue("partner", "DS-1", "advance")
+        queue.enqueue(None, "DS-1", "rm")
+        assert [(op.profile, op.kind) for op in queue.operations()] == [
+            ("partner", "advance"),
+            (None, "rm"),
+        ]
+
+    def test_failed_attempts_end_in_the_failed_state(self, queue):
+        retried = queue.enqueue(None, "DS-1", "advance")
+        hopeless = queue.enqueue(None, "DS-2", "epic", {"epic_key": "DS-9"})
+        for _ in range(MAX_ATTEMPTS - 1):
+            queue.attempt_failed(retried, "502 Bad Gateway")
+        queue.attempt_failed(hopeless, "No epic DS-9", permanent=True)
+        assert [op.state for op in queue.operations()] == ["pending", "failed"]
+        queue.attempt_failed(retried, "502 Bad Gateway")
+        assert [op.state for op in queue.operations()] == ["failed", "failed"]
+        assert queue.retry_failed() == 2
+
+
+class TestFlush:
+    @pytest.fixture
+    def fake(self, tmp_path, monkeypatch):
+        with FakeJira() as fake:
+            for n in range(1, 5):
+                fake.add_issue(f"DS-{n}")
+            fake.add_issue("DS-9", issuetype={"name": "Epic"})
+            monkeypatch.setenv("HOME", str(tmp_path))
+            fake.write_config(str(tmp_path), write_behind="yes")
+            monkeypatch.setattr(kujira, "_results", ResultCache(":memory:"))
+            monkeypatch.setattr(
+                kujira, "_workflow", WorkflowCache(str(tmp_path / "workflow.json"))
+            )
+            monkeypatch.setattr(
+                outbox, "flush_in_background", lambda path: self.flushes.append(path)
+            )
+            self.flushes = []
+            yield fake
+
+    def invoke(self, *args):
+        result = CliRunner().invoke(cli.main, args)
+        assert 0 == result.exit_code, result.output
+        return result.output
+
+    def test_mutations_are_queued_without_asking_the_server(self, fake):
+        assert self.invoke("advance", "DS-1").startswith("Queued advance of DS-1")
+        self.invoke("add-epic-to-issue", "DS-2", "DS-9")
+        self.invoke("rm", "DS-3")
+        assert fake.requests == []
+        assert len(self.flushes) == 3
+        assert self.invoke("queue", "status").splitlines() == [
+            "#1 pending advance DS-1",
+            "#2 pending epic DS-2 DS-9",
+            "#3 pending rm DS-3",
+        ]
+
+    def test_flush_applies_every_operation(self, fake):
+        self.invoke("advance", "DS-1")
+        self.invoke("add-epic-to-issue", "DS-2", "DS-9")
+        self.invoke("rm", "DS-3")
+
+        output = self.invoke("queue", "flush")
+        assert "DS-1 transitioned from Backlog to In Progress" in output
+        assert fake.issues["DS-1"]["fields"]["status"]["name"] == "In Progress"
+        parent = fake.issues["DS-2"]["fields"]["parent"]
+        assert parent == {"id": fake.issues["DS-9"]["id"]}
+        assert "DS-3" not in fake.issues
+        assert self.invoke("queue", "status") == "Nothing queued\n"
+
+    def test_operations_that_already_took_effect_are_not_repeated(self, fake, queue):
+        first = queue.enqueue(None, "DS-1", "advance")
+        # A previous flush saw Backlog, then lost the transition's response.
+        queue.remember(first, {"from": "Backlog"})
+        fake.issues["DS-1"]["fields"]["status"] = {"name": "In Progress"}
+        queue.enqueue(None, "DS-2", "rm")
+        del fake.issues["DS-2"]
+
+        outcomes = [outcome for _, outcome in flush(queue.path)]
+        assert sorted(outcomes) == [
+            "DS-1 already moved from Backlog to In Progress",
+            "DS-2 is already deleted",
+        ]
+        assert fake.requests_to("transitions") == []
+        assert queue.operations() == []
+
+    def test_a_lost_transition_response_is_not_advanced_again(self, fake, queue):
+        queue.enqueue(None, "DS-1", "advance")
+        fake.lose_response("POST", "transitions")
+        [(_, outcome)] = flush(queue.path, sleep=lambda delay: None)
+        assert outcome == "DS-1 already moved from Backlog to In Progress"
+        assert fake.issues["DS-1"]["fields"]["status"]["name"] == "In Progress"
+        assert len(fake.requests_to("transitions", "POST")) == 1
+
+    def test_transient_errors_are_retried_and_keep_an_issue_in_order(self, fake, queue):
+        kujira.get_conn(kujira.read_config())
+        queue.enqueue(None, "DS-1", "advance")
+        fake.fail_next(1, status=502)
+        assert "transitioned" in flush(queue.path, sleep=lambda delay: None)[0][1]
+
+        queue.enqueue(None, "DS-1", "advance")
+        queue.enqueue(None, "DS-1", "edit", {"fields": {"summary": "Later"}})
+        fake.fail_next(10, status=502)
+        outcomes = flush(queue.path, sleep=lambda delay: None)
+        assert len(outcomes) == 1
+        advance, edit = queue.operations()
+        assert (advance.state, advance.attempts) == ("pending", 1)
+        assert "502" in advance.last_error
+        assert (edit.state, edit.attempts) == ("pending", 0)
+        assert fake.issues["DS-1"]["fields"]["summary"] == "Summary of DS-1"
+
+    def test_a_missing_epic_fails_for_good(self, fake, queue):
+        queue.enqueue(None, "DS-1", "epic", {"epic_key": "DS-404"})
+        queue.enqueue(None, "DS-2", "advance")
+        flush(queue.path)
+        [failed] = queue.operations()
+        assert failed.state == "failed"
+        assert "DS-404" in failed.last_error
+        assert fake.issues["DS-2"]["fields"]["status"]["name"] == "In Progress"
+
+    def test_operations_share_one_fetch_of_their_epic(self, fake, queue):
+        for n in range(1, 5):
+            queue.enqueue(None, f"DS-{n}", "epic", {"epic_key": "DS-9"})
+        flush(queue.path)
+        epic_id = fake.issues["DS-9"]["id"]
+        parents = {
+            fake.issues[f"DS-{n}"]["fields"]["parent"]["id"] for n in range(1, 5)
+        }
+        assert parents == {epic_id}
+        assert len(fake.requests_to("issue/DS-9", "GET")) == 1
@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+
+import pytest
+import requests
+
+from fake_jira import FakeJira
+from kujira import kujira
+from kujira.ratelimit import (
+    RateLimitedAdapter,
+    RateLimiter,
+    TokenBucket,
+    install,
+    parse_reset,
+    parse_retry_after,
+)
+
+NOW = datetime(2019, 5, 29, 10, 0, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestTokenBucket:
+    def test_it_allows_a_burst_then_spaces_requests_out(self, clock):
+        bucket = TokenBucket(4, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            bucket.acquire()
+        assert clock.slept == []
+        bucket.acquire()
+        assert clock.slept == [pytest.approx(0.25)]
+
+    def test_pause_holds_requests_back(self, clock):
+        bucket = TokenBucket(4, clock=clock, sleep=clock.sleep)
+        bucket.pause(3)
+        bucket.acquire()
+        assert clock.now == pytest.approx(103.25)
+
+
+class TestParsing:
+    def test_retry_after_accepts_seconds_and_dates(self):
+        assert parse_retry_after("7") == 7
+        assert parse_retry_after("Wed, 29 May 2019 10:00:30 GMT", now=NOW) == 30
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+    def test_reset_is_an_iso_timestamp(self):
+        assert parse_reset("2019-05-29T10:01:00Z", now=NOW) == 60
+        assert parse_reset("2019-05-29T09:00:00Z", now=NOW) == 0
+        assert parse_reset("whenever", now=NOW) is None
+
+
+class TestRateLimiter:
+    def make_limiter(self, clock, rate=10.0):
+        return RateLimiter(
+            rate, max_rate=20.0, clock=clock, sleep=clock.sleep, jitter=lambda: 0.5
+        )
+
+    def test_it_speeds_up_while_responses_are_clean(self, clock):
+        limiter = self.make_limiter(clock)
+        for _ in range(10):
+            assert limiter.observe(200, {}) is None
+        assert 10.9 < limiter.rate < 11.0
+
+    def test_it_halves_the_rate_and_pauses_on_429(self, clock):
+        limiter = self.make_limiter(clock)
+        delay = limiter.observe(429, {"Retry-After": "5"})
+        assert limiter.rate == 5.0
+        assert delay == pytest.approx(5.3)
+        limiter.acquire()
+        assert clock.now >= 105.3
+
+    def test_it_backs_off_exponentially_without_retry_after(self, clock):
+        limiter = self.make_limiter(clock)
+        assert limiter.observe(429, {}, attempt=0) == 0.5
+        assert limiter.observe(429, {}, attempt=3) == 4.0
+
+    def test_it_slows_down_near_the_limit(self, clock):
+        limiter = self.make_limiter(clock)
+        limiter.observe(200, {"X-RateLimit-NearLimit": "true"})
+        assert limiter.rate == 5.0
+        limiter.observe(200, {"X-RateLimit-Remaining": "0"})
+        assert limiter.rate == 2.5
+
+    def test_it_never_goes_below_the_minimum_rate(self, clock):
+        limiter = self.make_limiter(clock)
+        for _ in range(20):
+            limiter.observe(429, {"Retry-After": "0"})
+        assert limiter.rate == limiter.min_rate
+
+
+class TestRateLimitedAdapter:
+    def test_it_retries_rate_limited_requests(self):
+        limiter = RateLimiter(100.0, jitter=lambda: 0)
+        with FakeJira() as fake:
+            fake.seed(issues=3)
+            conn = fake.connect()
+            install(conn._session, fake.url, limiter)
+            fake.fail_next(2, headers={"Retry-After": "0"})
+            issues = conn.search_issues("project = DS")
+        assert [i.key for i in issues] == ["DS-1", "DS-2", "DS-3"]
+        assert [r["status"] for r in fake.requests].count(429) == 2
+        assert limiter.rate < 100.0
+
+    def test_it_gives_up_after_its_retries(self):
+        limiter = RateLimiter(100.0, jitter=lambda: 0)
+        with FakeJira() as fake:
+            session = requests.Session()
+            adapter = install(session, fake.url, limiter)
+            adapter.retries = 1
+            fake.fail_next(3, headers={"Retry-After": "0"})
+            response = session.get(fake.url + "/rest/api/2/serverInfo")
+        assert response.status_code == 429
+        assert len(fake.errors) == 1
+
+    def test_connections_share_one_limiter_per_server(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        with FakeJira() as fake:
+            fake.write_config(str(tmp_path), rate_limit=3)
+            config = kujira.read_config()
+            conn = kujira.get_conn(config)
+            adapter = conn._session.get_adapter(fake.url + "/rest/api/2/search")
+        assert isinstance(adapter, RateLimitedAdapter)
+        assert adapter.limiter is kujira.get_rate_limiter(config)
+        # Started at 3 and sped up once for the clean serverInfo response.
+        assert adapter.limiter.rate == pytest.approx(3 + 1 / 3)
+
+    def test_connecting_is_rate_limited_and_retried_once_per_429(
+        self, tmp_path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        with FakeJira() as fake:
+            fake.write_config(str(tmp_path))
+            fake.fail_next(2, headers={"Retry-After": "0"})
+            kujira.get_conn(kujira.read_config())
+            statuses = [r["status"] for r in fake.requests]
+        assert statuses == [429, 429, 200]
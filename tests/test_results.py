@@ -0,0 +1,133 @@
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, kujira
+from kujira.results import ResultCache, normalize_jql, refresh
+
+SERVER = "https://empire.atlassian.net"
+
+
+def raw(key):
+    return {"key": key, "fields": {"summary": f"Summary of {key}"}}
+
+
+@pytest.fixture
+def cache():
+    return ResultCache(":memory:")
+
+
+def test_normalize_jql_ignores_spacing_and_case_outside_quotes():
+    assert normalize_jql(
+        'assignee=currentUser()  AND status = "In Review" ORDER BY created'
+    ) == normalize_jql(
+        'assignee = currentuser() and status="In Review" order by created'
+    )
+    assert '"In Review"' in normalize_jql('status = "In Review"')
+
+
+class TestResultCache:
+    def test_entries_are_keyed_by_server_jql_and_fields(self, cache):
+        cache.store(SERVER, "project = DS", ("summary",), [raw("DS-1")])
+        assert cache.get(SERVER, "PROJECT=DS", ["summary"]).raws == [raw("DS-1")]
+        assert cache.get(SERVER, "project = DS", ("summary", "updated")) is None
+        assert cache.get("http://other", "project = DS", ("summary",)) is None
+
+    def test_only_one_caller_claims_a_refresh(self, cache):
+        cache.store(SERVER, "project = DS", (), [])
+        assert cache.claim_refresh(SERVER, "project = DS", (), now=1000)
+        assert not cache.claim_refresh(SERVER, "project = DS", (), now=1001)
+        assert cache.claim_refresh(SERVER, "project = DS", (), now=1200)
+
+    def test_eviction_follows_listed_issues_and_filtered_fields(self, cache):
+        mine = "resolution = unresolved and assignee = currentuser()"
+        in_review = 'assignee = currentuser() and status = "In Review"'
+        cache.store(SERVER, mine, (), [raw("DS-1"), raw("DS-2")])
+        cache.store(SERVER, in_review, (), [raw("DS-2")])
+
+        assert cache.evict(["DS-3"], ["description"]) == 0
+        assert cache.evict(["DS-1"], ["description"]) == 1
+        assert cache.get(SERVER, in_review, ()) is not None
+        assert cache.evict(["DS-3"], ["status"]) == 1
+        cache.store(SERVER, mine, (), [])
+        assert cache.evict() == 1
+
+    def test_quoted_and_custom_field_names_are_evicted(self, cache):
+        by_link = 'project = DS and "Epic Link" = DS-9'
+        by_cf = "project = DS and cf[10910] is empty"
+        cache.store(SERVER, by_link, (), [])
+        cache.store(SERVER, by_cf, (), [])
+        assert cache.evict([], ["epic link"]) == 1
+        assert cache.evict([], ["customfield_10910"]) == 1
+
+    def test_a_refresh_that_raced_an_eviction_is_dropped(self, cache):
+        cache.store(SERVER, "project = DS", (), [raw("DS-1")])
+        claimed_at = cache.claim_refresh(SERVER, "project = DS", (), now=1000)
+        cache.evict(["DS-1"], ["status"])
+        assert not cache.store(
+            SERVER, "project = DS", (), [raw("DS-1")], claimed_at=claimed_at
+        )
+        assert cache.get(SERVER, "project = DS", ()) is None
+
+        cache.store(SERVER, "project = DS", (), [])
+        claimed_at = cache.claim_refresh(SERVER, "project = DS", (), now=1000)
+        assert cache.store(
+            SERVER, "project = DS", (), [raw("DS-2")], claimed_at=claimed_at
+        )
+        assert cache.get(SERVER, "project = DS", ()).raws == [raw("DS-2")]
+
+
+class TestListCommands:
+    @pytest.fixture
+    def fake(self, tmp_path, monkeypatch):
+        with FakeJira() as fake:
+            fake.seed(issues=8)
+            monkeypatch.setenv("HOME", str(tmp_path))
+            fake.write_config(str(tmp_path), result_ttls="mine=0")
+            monkeypatch.setattr(kujira, "_results", ResultCache(":memory:"))
+            monkeypatch.setattr(
+                kujira,
+                "refresh_in_background",
+                lambda *args: self.refreshes.append(args),
+            )
+            self.refreshes = []
+            yield fake
+
+    def test_a_stale_result_is_printed_then_refreshed(self, fake):
+        first = CliRunner().invoke(cli.main, ["mine"])
+        assert 0 == first.exit_code, first.output
+        assert len(fake.requests_to("search")) == 1
+
+        fake.issues["DS-1"]["fields"]["resolution"] = {"name": "Done"}
+        second = CliRunner().invoke(cli.main, ["mine"])
+        assert second.output == first.output
+        assert len(fake.requests_to("search")) == 1
+        assert len(self.refreshes) == 1
+
+        fresh = CliRunner().invoke(cli.main, ["mine", "--refresh"])
+        assert "DS-1 |" not in fresh.output
+        assert len(fake.requests_to("search")) == 2
+
+    def test_a_fresh_result_is_not_refreshed(self, fake):
+        CliRunner().invoke(cli.main, ["ls", "In Review"])
+        CliRunner().invoke(cli.main, ["ls", "In Review"])
+        assert len(fake.requests_to("search")) == 1
+        assert self.refreshes == []
+
+    def test_a_transition_evicts_the_lists_it_changes(
+        self, fake, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(kujira, "_workflow", None)
+        CliRunner().invoke(cli.main, ["ls", "In Review"])
+        result = CliRunner().invoke(cli.main, ["advance", "DS-1"])
+        assert "Transitioned" in result.output
+        CliRunner().invoke(cli.main, ["ls", "In Review"])
+        assert len(fake.requests_to("search")) == 2
+
+    def test_the_background_refresh_stores_a_new_result(self, fake, tmp_path):
+        path = str(tmp_path / "results.db")
+        refresh(path, kujira.OPEN_ISSUES_QUERY, kujira.BRIEF_FIELDS)
+        cached = ResultCache(path).get(
+            f"user0@{fake.url}", kujira.OPEN_ISSUES_QUERY, kujira.BRIEF_FIELDS
+        )
+        assert len(cached.raws) == 8
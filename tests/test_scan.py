@@ -0,0 +1,130 @@
+import json
+from itertools import islice
+
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, scan
+from kujira.scan import ScanCheckpoint, count_issues, key_order, scan_issues
+
+
+@pytest.fixture
+def fake():
+    with FakeJira() as fake:
+        fake.seed(issues=300)
+        for n in range(1, 31):
+            fake.add_issue(f"AB-{n}")
+        yield fake
+
+
+def all_keys(fake):
+    return sorted(fake.issues, key=key_order)
+
+
+class TestScanIssues:
+    def test_count_issues_fetches_no_issues(self, fake):
+        assert count_issues(fake.connect(), "project = DS") == 300
+        assert fake.requests[-1]["bytes"] < 200
+
+    def test_it_merges_created_date_shards_in_key_order(self, fake):
+        issues = list(scan_issues(fake.connect(), "", shard_size=40))
+        assert [i.key for i in issues] == all_keys(fake)
+        shard_searches = [
+            r for r in fake.requests_to("search") if "created+%3E%3D" in r["query"]
+        ]
+        assert len(shard_searches) > 8
+
+    def test_it_can_shard_one_project_by_key(self, fake):
+        raws = list(
+            scan_issues(
+                fake.connect(),
+                "project = DS ORDER BY created",
+                by="key",
+                shard_size=64,
+                json_result=True,
+            )
+        )
+        assert [r["key"] for r in raws] == [f"DS-{n}" for n in range(1, 301)]
+
+    def test_approximate_zero_counts_do_not_drop_ranges(self, monkeypatch):
+        with FakeJira(deployment="Cloud") as fake:
+            fake.seed(issues=120)
+            monkeypatch.setattr(scan, "count_issues", lambda conn, jql: 0)
+            issues = list(scan_issues(fake.connect(), "project = DS"))
+        assert [i.key for i in issues] == all_keys(fake)
+
+    def test_key_shards_need_a_single_project(self, fake):
+        with pytest.raises(ValueError):
+            list(scan_issues(fake.connect(), "", by="key"))
+
+    def test_it_resumes_by_skipping_finished_shards(self, fake, tmp_path):
+        path = str(tmp_path / "scan.json")
+        conn = fake.connect()
+        issues = scan_issues(conn, "project = DS", shard_size=50, checkpoint_path=path)
+        first_run = [i.key for i in islice(issues, 120)]
+        issues.close()
+
+        checkpoint = ScanCheckpoint(path, "project = DS")
+        assert len(checkpoint.shards) == 6
+        assert len(checkpoint.finished) == 2
+
+        second_run = [
+            i.key for i in scan_issues(conn, "project = DS", checkpoint_path=path)
+        ]
+        assert first_run[:100] + second_run == [f"DS-{n}" for n in range(1, 301)]
+        with open(path) as f:
+            assert len(json.load(f)["finished"]) == 6
+
+    def test_a_checkpoint_for_another_query_is_ignored(self, tmp_path):
+        path = str(tmp_path / "scan.json")
+        checkpoint = ScanCheckpoint(path, "project = DS")
+        checkpoint.set_plan([])
+        assert ScanCheckpoint(path, "project = AB").shards is None
+        assert ScanCheckpoint(path, "project = DS").shards == []
+
+
+class TestResumedExport:
+    def export(self, *args):
+        return CliRunner().invoke(
+            cli.main, ("export", "project = DS", "--shard-size", "50") + args
+        )
+
+    def test_it_appends_after_the_rows_already_flushed(
+        self, fake, tmp_path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        fake.write_config(str(tmp_path))
+        output, path = str(tmp_path / "out.csv"), str(tmp_path / "scan.json")
+        options = ("--format", "csv", "--fields", "summary", "-o", output)
+        track = ScanCheckpoint.track
+
+        def dies_after_130(self, issues):
+            try:
+                yield from islice(track(self, issues), 130)
+            finally:
+                issues.close()
+            raise RuntimeError("killed")
+
+        monkeypatch.setattr(ScanCheckpoint, "track", dies_after_130)
+        assert isinstance(
+            self.export("--checkpoint", path, *options).exception, RuntimeError
+        )
+        with open(output, "a") as f:
+            f.write("DS-101,half a chu")
+        assert ScanCheckpoint(path, "project = DS").output["key"] == "DS-100"
+
+        monkeypatch.setattr(ScanCheckpoint, "track", track)
+        result = self.export("--checkpoint", path, *options)
+        assert result.exit_code == 0, result.output
+        with open(output) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == "key,summary"
+        assert [line.split(",")[0] for line in lines[1:]] == [
+            f"DS-{n}" for n in range(1, 301)
+        ]
+        assert len(ScanCheckpoint(path, "project = DS").finished) == 6
+
+    def test_it_needs_an_output_file(self, fake, tmp_path):
+        result = self.export("--checkpoint", str(tmp_path / "scan.json"))
+        assert result.exit_code == 2
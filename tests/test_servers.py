@@ -0,0 +1,117 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, kujira
+from kujira.servers import ordered_query, search_all_servers
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    """A prod server (DS, UTC) and a slower partner server (PS, UTC+2)."""
+    with FakeJira() as prod, FakeJira() as partner:
+        for n in range(1, 6):
+            prod.add_issue(f"DS-{n}", created=f"2019-05-29T10:{2 * n:02d}:00.000+0000")
+            partner.add_issue(
+                f"PS-{n}", created=f"2019-05-29T12:{2 * n + 1:02d}:00.000+0200"
+            )
+        partner.latency = 0.05
+        monkeypatch.setenv("HOME", str(tmp_path))
+        prod.write_config(str(tmp_path))
+        partner.write_config(
+            str(tmp_path), section="Jira:partner", default_project="PS"
+        )
+        yield prod, partner
+
+
+class TestProfiles:
+    def test_a_profile_falls_back_to_the_jira_section(self, servers):
+        prod, partner = servers
+        config = kujira.read_config(profile="partner")
+        assert config.server_url == partner.url
+        assert config.default_project == "PS"
+        assert config.profile == "partner"
+        assert kujira.read_config().server_url == prod.url
+        urls = [config.server_url for config in kujira.read_all_configs()]
+        assert urls == [prod.url, partner.url]
+
+    def test_the_server_option_picks_a_profile(self, servers):
+        prod, partner = servers
+        result = CliRunner().invoke(cli.main, ["--server", "partner", "mine"])
+        assert 0 == result.exit_code, result.output
+        assert result.output.startswith("PS-1 |")
+        assert kujira.read_config().server_url == prod.url
+
+        result = CliRunner().invoke(cli.main, ["--server", "staging", "mine"])
+        assert result.exit_code == 1
+        assert "Jira:staging" in result.output
+
+    def test_threads_share_one_connection_per_server(self, servers):
+        prod, partner = servers
+        configs = kujira.read_all_configs() * 4
+        with ThreadPoolExecutor(len(configs)) as pool:
+            conns = list(pool.map(kujira.get_conn, configs))
+        assert len({id(conn) for conn in conns}) == 2
+        assert len(prod.requests_to("serverInfo")) == 1
+        assert len(partner.requests_to("serverInfo")) == 1
+
+    def test_each_server_has_its_own_caches(self, servers):
+        prod, partner = servers
+        prod.add_user("a-1", "Darth Vader")
+        partner.add_user("p-1", "Lando Calrissian")
+        runner = CliRunner()
+        assert "Darth Vader" in runner.invoke(cli.main, ["get-all-users"]).output
+        result = runner.invoke(cli.main, ["--server", "partner", "get-all-users"])
+        assert "Lando Calrissian" in result.output
+        assert "Darth Vader" not in result.output
+        prod_config, partner_config = kujira.read_all_configs()
+        assert prod_config.mirror_path != partner_config.mirror_path
+
+
+class TestAllServers:
+    def test_it_merges_servers_by_created_time(self, servers):
+        issues = search_all_servers(
+            kujira.read_all_configs(), "project in (DS, PS)", fields=("summary",)
+        )
+        keys = [raw["key"] for config, raw in issues]
+        assert keys == [f"{p}-{n}" for n in range(1, 6) for p in ("DS", "PS")]
+
+    def test_the_first_issues_arrive_before_the_slow_server_finishes(self, servers):
+        prod, partner = servers
+        for n in range(6, 1001):
+            partner.add_issue(f"PS-{n}", created="2019-05-30T12:00:00.000+0200")
+        issues = search_all_servers(kujira.read_all_configs(), "", fields=())
+        next(issues)
+        assert len(partner.requests_to("search")) < 10
+        assert len(list(issues)) == 1004
+        assert len(partner.requests_to("search")) == 20
+
+    def test_mine_and_export_take_all_servers(self, servers):
+        result = CliRunner().invoke(cli.main, ["mine", "--all-servers"])
+        assert 0 == result.exit_code, result.output
+        lines = result.output.splitlines()
+        assert lines[:2] == [
+            "default: DS-1 | Summary of DS-1 (2019-05-29)",
+            "partner: PS-1 | Summary of PS-1 (2019-05-29)",
+        ]
+
+        result = CliRunner().invoke(
+            cli.main,
+            ["export", "--all-servers", "--format", "csv", "--fields", "summary", ""],
+        )
+        rows = list(csv.reader(io.StringIO(result.stdout)))
+        assert rows[0] == ["server", "key", "summary"]
+        assert [row[:2] for row in rows[1:3]] == [
+            ["default", "DS-1"],
+            ["partner", "PS-1"],
+        ]
+
+
+def test_ordered_query_replaces_the_order():
+    assert "project = DS ORDER BY updated ASC, key ASC" == ordered_query(
+        "project = DS order by created DESC", "updated"
+    )
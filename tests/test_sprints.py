@@ -0,0 +1,81 @@
+import pytest
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli
+from kujira.sprints import Sprint, SprintCache, pick_current_sprint
+
+FETCHED_AT = 1559124000.0  # 2019-05-29T10:00:00Z
+ACTIVE = Sprint(7, "Data 7", "active", "2019-05-20T10:00:00Z", "2019-06-03T10:00:00Z")
+FUTURE = Sprint(8, "Data 8", "future", "2019-06-03T10:00:00Z", None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SprintCache(str(tmp_path / "sprints.json"))
+    cache.store(137, [ACTIVE, FUTURE], fetched_at=FETCHED_AT)
+    return cache
+
+
+class TestSprintCache:
+    def test_it_round_trips_through_disk(self, cache):
+        assert SprintCache(cache.path).sprints(137) == [ACTIVE, FUTURE]
+        assert SprintCache(cache.path).sprints(138) is None
+
+    def test_it_is_fresh_until_a_sprint_should_change_state(self, cache):
+        assert not cache.is_stale(137, now=FETCHED_AT + 60)
+        assert cache.is_stale(137, now=FETCHED_AT + 6 * 24 * 60 * 60)
+
+    def test_it_expires_after_its_ttl(self, cache):
+        assert cache.is_stale(137, ttl=60, now=FETCHED_AT + 61)
+        assert cache.is_stale(138, now=FETCHED_AT)
+
+    def test_invalidate_forgets_the_board(self, cache):
+        cache.invalidate(137)
+        assert SprintCache(cache.path).sprints(137) is None
+
+
+def test_pick_current_sprint_applies_the_name_filters():
+    icebox = Sprint(1, "Icebox", "active", None, None)
+    other = Sprint(2, "Platform 7", "active", None, None)
+    sprints = [ACTIVE, icebox, other, FUTURE]
+    assert pick_current_sprint(sprints, "", ("Icebox", "Platform 7")) == ACTIVE
+    assert pick_current_sprint(sprints, "Data", ()) == ACTIVE
+    assert pick_current_sprint([FUTURE], "Data", ()) is None
+
+
+class TestSprintCommand:
+    @pytest.fixture
+    def fake(self, tmp_path, monkeypatch):
+        with FakeJira() as fake:
+            fake.seed(issues=9, sprints=3)
+            fake.add_sprint(1, 4, "Icebox", "active")
+            fake.add_sprint(1, 5, "Sprint 5", "future")
+            monkeypatch.setenv("HOME", str(tmp_path))
+            fake.write_config(
+                str(tmp_path), sprint_board=1, sprint_excludes="Icebox, Parking lot"
+            )
+            yield fake
+
+    def test_it_lists_the_current_sprint_with_one_search(self, fake):
+        result = CliRunner().invoke(cli.main, ["sprint"])
+        assert 0 == result.exit_code, result.output
+        lines = result.output.splitlines()
+        assert lines[0] == "Sprint 3"
+        assert [line.split(" | ")[0] for line in lines[1:]] == ["DS-2", "DS-5", "DS-8"]
+        assert len(fake.requests_to("search")) == 1
+        sprint_requests = fake.requests_to("/sprint")
+        assert "state=active%2Cfuture" in sprint_requests[0]["query"]
+
+    def test_it_reuses_the_cached_sprint_list(self, fake):
+        CliRunner().invoke(cli.main, ["sprint"])
+        CliRunner().invoke(cli.main, ["sprint", "--mine"])
+        assert len(fake.requests_to("/sprint")) == 1
+        CliRunner().invoke(cli.main, ["sprint", "--refresh"])
+        assert len(fake.requests_to("/sprint")) == 2
+
+    def test_it_needs_a_board(self, fake, tmp_path):
+        fake.write_config(str(tmp_path))
+        result = CliRunner().invoke(cli.main, ["sprint"])
+        assert result.exit_code == 1
+        assert "sprint_board" in result.output
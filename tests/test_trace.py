@@ -0,0 +1,81 @@
+import json
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from fake_jira import FakeJira
+from kujira import cli, kujira
+from kujira.trace import Tracer, endpoint
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    with FakeJira() as fake:
+        fake.seed(issues=60, epics=2)
+        monkeypatch.setenv("HOME", str(tmp_path))
+        fake.write_config(str(tmp_path))
+        yield fake
+
+
+def test_endpoint_hides_issue_keys():
+    assert "/rest/api/2/issue/{key}/transitions" == endpoint(
+        "https://empire.atlassian.net/rest/api/2/issue/DS-1610/transitions?x=1"
+    )
+    assert "/rest/api/2/search" == endpoint("http://127.0.0.1:80/rest/api/2/search")
+
+
+class TestTracer:
+    def test_it_records_requests_and_counts_calls(self, fake):
+        conn = fake.connect()
+        tracer = Tracer().install()
+        try:
+            issues = list(kujira.get_open_issues(conn))
+            kujira.get_issue_by_key(conn, "DS-3")
+        finally:
+            tracer.uninstall()
+
+        report = tracer.report()
+        searches = [r for r in tracer.requests if r["endpoint"] == "/rest/api/2/search"]
+        assert len(searches) == 2
+        assert all(r["status"] == 200 and r["bytes"] > 0 for r in searches)
+        assert report["calls"]["get_open_issues"] == 1
+        assert report["calls"]["get_issues"] == 1
+        assert report["calls"]["get_issue_by_key"] == 1
+        assert len(issues) == 62
+        endpoints = {(g["method"], g["endpoint"]) for g in report["endpoints"]}
+        assert ("GET", "/rest/api/2/issue/{key}") in endpoints
+
+    def test_uninstall_restores_the_originals(self):
+        send, get_issues = requests.Session.send, kujira.get_issues
+        Tracer().install().uninstall()
+        assert requests.Session.send is send
+        assert kujira.get_issues is get_issues
+
+
+class TestTraceOption:
+    def test_it_prints_a_summary_table(self, fake):
+        result = CliRunner().invoke(cli.main, ["--trace", "get-issue", "DS-3"])
+        assert 0 == result.exit_code, result.output
+        assert "GET /rest/api/2/issue/{key}" in result.stderr
+        assert "get_issue_by_key 1" in result.stderr
+
+    def test_it_writes_json_and_a_profile(self, fake, tmp_path):
+        trace_path, profile_path = tmp_path / "trace.json", tmp_path / "kujira.prof"
+        result = CliRunner().invoke(
+            cli.main,
+            [
+                "--trace-json",
+                str(trace_path),
+                "--profile",
+                str(profile_path),
+                "epics-for-project",
+                "DS",
+            ],
+        )
+        assert 0 == result.exit_code, result.output
+        assert "" == result.stderr
+        report = json.loads(trace_path.read_text())
+        assert report["calls"]["get_all_epics"] == 1
+        assert any(r["endpoint"] == "/rest/api/2/search" for r in report["requests"])
+        assert profile_path.stat().st_size > 0
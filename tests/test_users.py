@@ -0,0 +1,76 @@
+from pytest import fixture, raises
+
+from fake_jira import FakeJira
+from kujira import kujira
+from kujira.models.user import UserModel
+from kujira.users import UserDirectory
+
+
+def make_user(account_id, display_name, email=None, name=None):
+    return UserModel(
+        name=name,
+        key=name,
+        email=email,
+        display_name=display_name,
+        account_id=account_id,
+    )
+
+
+@fixture
+def directory():
+    return UserDirectory(
+        [
+            make_user("a-1", "Darth Vader", "dvader@empire.com", "dvader"),
+            make_user("a-2", "Darth Sidious", "palpatine@empire.com"),
+            make_user("a-3", "Grand Moff Tarkin", "tarkin@empire.com"),
+            make_user("a-4", "Director Krennic"),
+        ]
+    )
+
+
+class TestUserDirectory:
+    def test_it_looks_up_exact_identifiers(self, directory):
+        assert "Darth Vader" == directory.get("a-1").display_name
+        assert "Darth Vader" == directory.get("DVader@Empire.com").display_name
+        assert "Darth Vader" == directory.get("dvader").display_name
+        assert directory.get("Darth") is None
+
+    def test_it_finds_display_name_prefixes(self, directory):
+        matches = directory.find("darth")
+        assert ["Darth Sidious", "Darth Vader"] == [u.display_name for u in matches]
+        assert [] == directory.find("Emperor")
+
+    def test_it_resolves_one_user_or_explains_why_not(self, directory):
+        assert "a-3" == directory.resolve("grand").account_id
+        with raises(LookupError, match="ambiguous"):
+            directory.resolve("Darth")
+        with raises(LookupError, match="No user"):
+            directory.resolve("Emperor")
+
+    def test_it_round_trips_through_disk(self, directory, tmp_path):
+        path = str(tmp_path / "users.json")
+        directory.save(path)
+        loaded = UserDirectory.load(path)
+        assert directory.users == loaded.users
+        assert "a-4" == loaded.resolve("dir").account_id
+        assert not loaded.is_stale(ttl=60)
+        assert loaded.is_stale(ttl=-1)
+
+    def test_it_shows_display_names_for_account_ids(self, directory):
+        assert "Darth Vader" == directory.display_name("a-1")
+        assert "unknown" == directory.display_name("unknown")
+
+
+class TestAssigneeField:
+    def test_it_resolves_the_templates_assignee(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        with FakeJira() as fake:
+            fake.add_user("a-1", "Darth Vader", "dvader@empire.com")
+            fake.add_user("a-2", "Darth Sidious")
+            fake.write_config(str(tmp_path))
+            config = kujira.read_config()
+            own = {"accountId": config.account_id}
+            assert own == kujira.assignee_field(config, config.account_id)
+            assert {"accountId": "a-1"} == kujira.assignee_field(config, "darth v")
+            with raises(LookupError, match="ambiguous"):
+                kujira.assignee_field(config, "Darth")
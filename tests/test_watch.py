@@ -0,0 +1,96 @@
+import pytest
+
+from fake_jira import FakeJira
+from kujira.kujira import OPEN_ISSUES_QUERY
+from kujira.watch import AdaptiveInterval, Watcher, format_change, watch
+
+
+@pytest.fixture
+def fake():
+    with FakeJira() as fake:
+        fake.seed(issues=5)
+        yield fake
+
+
+def kinds(changes):
+    return sorted((change.kind, change.key) for change in changes)
+
+
+class TestWatcher:
+    def test_it_reports_only_what_changed(self, fake):
+        watcher = Watcher(fake.connect(), OPEN_ISSUES_QUERY)
+        assert len(watcher.fetch_all()) == 5
+        assert watcher.poll() == []
+
+        fake.issues["DS-2"]["fields"]["status"] = {"name": "Done"}
+        fake.touch(fake.issues["DS-2"])
+        fake.issues["DS-3"]["fields"]["resolution"] = {"name": "Fixed"}
+        fake.touch(fake.issues["DS-3"])
+        fake.touch(fake.add_issue("DS-6"))
+        changes = watcher.poll()
+
+        assert kinds(changes) == [
+            ("added", "DS-6"),
+            ("changed", "DS-2"),
+            ("removed", "DS-3"),
+        ]
+        assert sorted(watcher.rows) == ["DS-1", "DS-2", "DS-4", "DS-5", "DS-6"]
+        changed = next(c for c in changes if c.kind == "changed")
+        assert format_change(changed).endswith("(status: In Review -> Done)")
+
+    def test_polls_ask_for_recent_updates_and_few_fields(self, fake):
+        watcher = Watcher(fake.connect(), OPEN_ISSUES_QUERY)
+        watcher.fetch_all()
+        del fake.requests[:]
+        watcher.poll()
+        search, leavers = fake.requests_to("search")
+        assert "updated+%3E%3D" in search["query"]
+        assert "fields=summary&fields=status&fields=assignee" in search["query"]
+        assert "fields=updated" in leavers["query"]
+
+    def test_it_catches_deletions_with_a_full_fetch(self, fake, monkeypatch):
+        monkeypatch.setattr("kujira.watch.FULL_FETCH_EVERY", 2)
+        watcher = Watcher(fake.connect(), OPEN_ISSUES_QUERY)
+        watcher.fetch_all()
+        del fake.issues["DS-4"]
+        assert watcher.poll() == []
+        assert kinds(watcher.poll()) == [("removed", "DS-4")]
+
+    def test_a_deleted_issue_does_not_hide_the_others_on_cloud(self):
+        with FakeJira(deployment="Cloud") as fake:
+            fake.seed(issues=5)
+            watcher = Watcher(fake.connect(), OPEN_ISSUES_QUERY)
+            watcher.fetch_all()
+            del fake.issues["DS-4"]
+            fake.issues["DS-3"]["fields"]["resolution"] = {"name": "Fixed"}
+            fake.touch(fake.issues["DS-3"])
+            assert kinds(watcher.poll()) == [("removed", "DS-3")]
+
+
+def test_the_interval_backs_off_until_something_changes():
+    interval = AdaptiveInterval(10, 30)
+    assert [interval.next(False) for _ in range(4)] == [15, 22.5, 30, 30]
+    assert interval.next(True) == 10
+
+
+def test_watch_prints_the_initial_set_then_diffs(fake):
+    lines, sleeps = [], []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            fake.issues["DS-1"]["fields"]["summary"] = "Renamed"
+            fake.touch(fake.issues["DS-1"])
+
+    watch(
+        fake.connect(),
+        OPEN_ISSUES_QUERY,
+        interval=1,
+        max_interval=4,
+        echo=lines.append,
+        sleep=sleep,
+        max_polls=3,
+    )
+    assert len(lines) == 6
+    assert lines[-1].startswith("~ DS-1 | Renamed")
+    assert sleeps == [1, 1.5, 1]
@@ -0,0 +1,56 @@
+from pytest import fixture
+
+from kujira.workflow import WorkflowCache
+
+SERVER = "https://jira.example.com"
+
+
+def api_transition(id, name, to):
+    return {"id": id, "name": name, "to": {"name": to}}
+
+
+@fixture
+def workflow(tmp_path):
+    workflow = WorkflowCache(str(tmp_path / "workflow.json"))
+    workflow.learn(
+        SERVER, "DS", "Task", "Backlog", [api_transition(11, "Start", "In Progress")]
+    )
+    workflow.learn(
+        SERVER,
+        "DS",
+        "Task",
+        "In Progress",
+        [
+            api_transition(21, "Review", "In Review"),
+            api_transition(31, "Ship it", "Done"),
+            api_transition(41, "Shelve", "Backlog"),
+        ],
+    )
+    workflow.learn(
+        SERVER, "DS", "Task", "In Review", [api_transition(51, "Approve", "Done")]
+    )
+    return workflow
+
+
+class TestWorkflowCache:
+    def test_it_remembers_transitions_by_status(self, workflow):
+        assert {"id": "11", "to": "In Progress"} == workflow.transitions(
+            SERVER, "DS", "Task", "Backlog"
+        )["Start"]
+        assert workflow.transitions(SERVER, "DS", "Bug", "Backlog") is None
+
+    def test_it_persists_between_instances(self, workflow):
+        reloaded = WorkflowCache(workflow.path)
+        assert workflow.graphs == reloaded.graphs
+
+    def test_it_finds_the_shortest_path(self, workflow):
+        assert ["Start", "Ship it"] == workflow.path_to(
+            SERVER, "DS", "Task", "Backlog", "Done"
+        )
+        assert [] == workflow.path_to(SERVER, "DS", "Task", "Done", "Done")
+
+    def test_it_returns_none_when_the_target_is_unknown(self, workflow):
+        assert workflow.path_to(SERVER, "DS", "Task", "Backlog", "Closed") is None
+
+    def test_servers_do_not_share_transition_ids(self, workflow):
+        assert workflow.transitions("https://other", "DS", "Task", "Backlog") is None